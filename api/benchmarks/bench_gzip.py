@@ -0,0 +1,34 @@
+"""
+Stored and served size of a retailer envelope with and without gzip, and the
+one-off cost of compressing it (paid once per data version: at publish for
+the stored envelope, on first request for the served body).
+
+    cd api && python -m benchmarks.bench_gzip
+"""
+
+import gzip
+import json
+import random
+
+from benchmarks.bench_msgpack import PRODUCTS, best_ms, synthetic_envelope
+from services.envelope_cache import compress_envelope
+from services.public_envelope import GZIP_LEVEL, EncodedEnvelope
+
+
+def main():
+    data = synthetic_envelope(random.Random(7))
+    stored_plain = json.dumps(data).encode("utf-8")
+    stored_gzip = compress_envelope(data)
+    encoded = EncodedEnvelope(data)
+    served_gzip, _ = encoded.gzip()
+
+    print(f"{PRODUCTS} products")
+    print(f"  stored    plain {len(stored_plain) / 1024:8.1f} KiB   gzip {len(stored_gzip) / 1024:8.1f} KiB")
+    print(f"  served    plain {len(encoded.body) / 1024:8.1f} KiB   gzip {len(served_gzip) / 1024:8.1f} KiB")
+    print(f"  compress  {best_ms(lambda: gzip.compress(encoded.body, compresslevel=GZIP_LEVEL, mtime=0)):8.2f} ms (once per version)")
+    print(f"  load      {best_ms(lambda: json.loads(gzip.decompress(stored_gzip))):8.2f} ms gzip   "
+          f"{best_ms(lambda: json.loads(stored_plain)):8.2f} ms plain")
+
+
+if __name__ == "__main__":
+    main()
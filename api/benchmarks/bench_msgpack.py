@@ -0,0 +1,64 @@
+"""
+Payload size and client decode time of a retailer envelope as JSON vs
+MessagePack (the two representations the data endpoints negotiate), on a
+synthetic Priceline-sized feed shaped like real products.
+
+    cd api && python -m benchmarks.bench_msgpack
+"""
+
+import json
+import random
+import time
+
+import msgspec
+
+from services.public_envelope import EncodedEnvelope
+
+PRODUCTS = 3871
+ROUNDS = 50
+
+
+def synthetic_envelope(rng: random.Random) -> dict:
+    data = []
+    for i in range(PRODUCTS):
+        was = round(rng.uniform(2, 80), 2)
+        price = round(was * rng.uniform(0.3, 0.9), 2)
+        data.append({
+            "name": f"Brand {rng.randint(1, 400)} Product Name Variant {i} {rng.randint(10, 999)}g",
+            "price": price,
+            "price_per_unit": f"${rng.uniform(0.1, 9):.2f}/ 100g",
+            "price_was": was,
+            "product_link": f"https://www.priceline.com.au/en/product-{i}-{rng.randint(10**6, 10**7)}",
+            "image": f"https://www.priceline.com.au/medias/{rng.randint(10**8, 10**9)}-{i}.jpg?context=bWFzdGVy",
+            "discount": f"Save ${was - price:.2f}",
+            "discount_type": rng.choice(["half_price", "beyond_half", "discount"]),
+            "retailer": "Priceline",
+        })
+    return {"synced_at": "2026-10-14T00:00:00+00:00", "count": len(data), "data": data}
+
+
+def best_ms(fn) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    encoded = EncodedEnvelope(synthetic_envelope(random.Random(7)))
+    json_body = encoded.body
+    msgpack_body, _ = encoded.msgpack()
+
+    print(f"{PRODUCTS} products")
+    print(f"  size      json {len(json_body) / 1024:8.1f} KiB   msgpack {len(msgpack_body) / 1024:8.1f} KiB")
+    print(f"  encode    json {best_ms(lambda: msgspec.json.encode(encoded.source)):8.2f} ms    "
+          f"msgpack {best_ms(lambda: msgspec.msgpack.encode(encoded.source)):8.2f} ms")
+    print(f"  decode    json {best_ms(lambda: msgspec.json.decode(json_body)):8.2f} ms    "
+          f"msgpack {best_ms(lambda: msgspec.msgpack.decode(msgpack_body)):8.2f} ms   (msgspec)")
+    print(f"  decode    json {best_ms(lambda: json.loads(json_body)):8.2f} ms                        (stdlib json)")
+
+
+if __name__ == "__main__":
+    main()
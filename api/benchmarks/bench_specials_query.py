@@ -0,0 +1,74 @@
+"""
+Latency of /specials/query's table operations on a synthetic 10k-product
+catalogue (table build once, then random filter/sort/page queries).
+
+    cd api && python -m benchmarks.bench_specials_query
+"""
+
+import random
+import time
+
+from services.product_table import ProductTable, SORT_KEYS, DISCOUNT_TYPES
+
+RETAILERS = ("coles", "woolies", "chemist_warehouse", "priceline")
+PRODUCTS = 10_000
+QUERIES = 5_000
+
+
+def synthetic_envelopes(rng: random.Random) -> dict[str, dict]:
+    envelopes = {}
+    per_retailer = PRODUCTS // len(RETAILERS)
+    for name in RETAILERS:
+        data = []
+        for i in range(per_retailer):
+            was = round(rng.uniform(1, 80), 2)
+            price = round(was * rng.uniform(0.3, 1.0), 2)
+            data.append({"name": f"{name} product {i}", "price": price, "price_was": was,
+                         "discount_type": rng.choice(DISCOUNT_TYPES + (None,)), "retailer": name})
+        envelopes[name] = {"synced_at": "2026-10-14T00:00:00+00:00", "count": len(data), "data": data}
+    return envelopes
+
+
+def random_query(rng: random.Random) -> dict:
+    low = rng.uniform(0, 20)
+    return {
+        "retailers": rng.choice([None, list(rng.sample(RETAILERS, 2))]),
+        "discount_types": rng.choice([None, ["half_price"], ["half_price", "beyond_half"]]),
+        "min_price": rng.choice([None, low]),
+        "max_price": rng.choice([None, low + rng.uniform(5, 40)]),
+        "min_fraction": rng.choice([None, 0.3, 0.5]),
+        "sort": rng.choice(SORT_KEYS),
+        "descending": rng.random() < 0.5,
+        "offset": rng.choice([0, 50, 200]),
+        "limit": 50,
+    }
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    rng = random.Random(7)
+    envelopes = synthetic_envelopes(rng)
+
+    started = time.perf_counter()
+    table = ProductTable(envelopes)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(QUERIES):
+        query = random_query(rng)
+        started = time.perf_counter()
+        page, _ = table.query(**query)
+        table.rows(page)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(f"{len(table)} products, table build {build_ms:.1f}ms")
+    print(f"{QUERIES} queries: p50 {percentile(timings, 50):.3f}ms  "
+          f"p99 {percentile(timings, 99):.3f}ms  max {max(timings):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Lookup latency of the /specials/search index over a synthetic catalogue of
+tens of thousands of products (index build once, then random queries).
+
+    cd api && python -m benchmarks.bench_specials_search
+"""
+
+import random
+import time
+
+from services.search_index import SearchIndex
+
+RETAILERS = ("coles", "woolies", "chemist_warehouse", "priceline")
+PRODUCTS = 40_000
+QUERIES = 5_000
+WORDS = (
+    "milk chocolate block biscuits coffee beans pods tea bags shampoo conditioner vitamin tablets "
+    "capsules crackers cheese butter bread brioche yoghurt greek natural organic protein bar powder "
+    "toothpaste brush razor blades nappies wipes dog cat food chicken beef pasta sauce rice noodles "
+    "chips corn salsa cereal oats honey jam peanut almond spread juice orange apple soft drink cola"
+).split()
+BRANDS = [f"brand{i}" for i in range(300)]
+
+
+def synthetic_envelopes(rng: random.Random) -> dict[str, dict]:
+    envelopes = {}
+    for name in RETAILERS:
+        data = []
+        for _ in range(PRODUCTS // len(RETAILERS)):
+            was = round(rng.uniform(1, 80), 2)
+            title = " ".join([rng.choice(BRANDS)] + rng.sample(WORDS, 3) + [f"{rng.randint(1, 999)}g"])
+            data.append({"name": title, "price": round(was * rng.uniform(0.3, 1.0), 2), "price_was": was})
+        envelopes[name] = {"synced_at": "2026-10-14T00:00:00+00:00", "data": data}
+    return envelopes
+
+
+def random_query(rng: random.Random) -> str:
+    terms = rng.sample(WORDS, rng.choice([1, 2]))
+    terms[-1] = terms[-1][:rng.randint(3, len(terms[-1]))]  # typing in progress
+    return " ".join(terms)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    rng = random.Random(7)
+    envelopes = synthetic_envelopes(rng)
+    index = SearchIndex()
+
+    started = time.perf_counter()
+    index.sync(envelopes)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(QUERIES):
+        query = random_query(rng)
+        started = time.perf_counter()
+        index.search(query)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(f"{PRODUCTS} products, index build {build_ms:.1f}ms")
+    print(f"{QUERIES} queries: p50 {percentile(timings, 50):.3f}ms  "
+          f"p99 {percentile(timings, 99):.3f}ms  max {max(timings):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
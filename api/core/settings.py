@@ -8,6 +8,18 @@ class Settings(BaseSettings):
     R2_BUCKET_NAME: str
     R2_REGION: str = "auto"
 
+    # Local-disk snapshot tier under the in-memory envelope cache. Point this
+    # at a Fly volume mount for snapshots to survive machine restarts; an empty
+    # value disables the tier.
+    LOCAL_SNAPSHOT_DIR: str = "/tmp/lazi-snapshots"
+    LOCAL_SNAPSHOT_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Public bucket (exposed on an R2 public domain) that receives a static
+    # copy of each retailer's feed plus a freshness beacon on every publish,
+    # so reads needn't wake the machine. Empty disables publishing.
+    R2_PUBLIC_BUCKET_NAME: str = ""
+    R2_PUBLIC_PREFIX: str = ""
+
     model_config = SettingsConfigDict(
         env_file='.env',
         env_file_encoding='utf-8',
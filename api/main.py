@@ -1,10 +1,9 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from services.service import Service
 from services.special_crawler.oz_crawler import OzCrawler
 from services.registry import (
-    coles_crawler_service,
-    coles_v2_crawler_service,
     coles_v2_5_crawler_service,
     woolies_crawler_service,
     chemist_warehouse_crawler_service,
@@ -14,18 +13,46 @@ from services.registry import (
     chemist_warehouse_refresh,
     priceline_refresh,
 )
-from services.freshness import is_stale, freshness_report
+from services.freshness import is_stale, freshness_report, cache_control, cache_control_for
+from services.public_envelope import (
+    public_envelopes, etag_matches, wants_msgpack, EncodedEnvelope, CombinedEncoding, MSGPACK_MEDIA_TYPE,
+    PRODUCT_FIELDS, accepts_gzip, PublicBody,
+)
+from services.product_table import product_tables, CursorError, SORT_KEYS, DISCOUNT_TYPES
+from services.search_index import search_index
+from services.ndjson_stream import iter_ndjson, ndjson_headers, NDJSON_MEDIA_TYPE
+from services.ndjson_snapshot import lines_to_json_array
+from services.envelope_diff import empty_diff
+from services.refresh_events import refresh_events
+from services.timing import begin_request, route_timings
+from services.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS
 from typing import Annotated
 from scheduler import scheduler, setup_scheduler
 from pydantic import BaseModel
+import asyncio
 import logging
+import time
+import msgspec
 
 service = Service()
 oz_crawler_service = OzCrawler()
 
-# Internal metadata fields added by the V2.5 crawler that must be stripped
-# before returning to callers — the frozen API shape must not change.
-_INTERNAL_FIELDS = {"crawl_status", "pages_attempted", "pages_succeeded", "pages_blocked", "crawler_version"}
+# /health is polled by monitoring; its freshness block is recomputed at most
+# this often (refresh-manager status is always live).
+HEALTH_MEMO_SECONDS = 15
+_health_memo: dict = {"at": 0.0, "reports": None}
+
+# Wake-up diagnostics for /health: how long the startup prefetch took and how
+# quickly the first data request after wake was answered.
+_PROCESS_STARTED = time.monotonic()
+_wake_metrics: dict = {
+    "prefetch_ms": None,
+    "first_data_path": None,
+    "first_data_response_ms": None,
+    "first_data_since_start_ms": None,
+}
+_prefetch_task: asyncio.Task | None = None
+
 app = FastAPI()
 
 logger = logging.getLogger(__name__)
@@ -44,6 +71,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _encoded_response(
+    request: Request, encoded: EncodedEnvelope | CombinedEncoding | PublicBody, cache_control_header: str,
+) -> Response:
+    """Serve a pre-encoded body — MessagePack when the Accept header asks for
+    it, JSON otherwise (gzip-compressed when Accept-Encoding allows) — or a
+    bodyless 304 when the caller already holds this version."""
+    headers = {"Cache-Control": cache_control_header, "Vary": "Accept, Accept-Encoding"}
+    if wants_msgpack(request.headers.get("accept")):
+        (body, etag), media_type = encoded.msgpack(), MSGPACK_MEDIA_TYPE
+    elif accepts_gzip(request.headers.get("accept-encoding")):
+        (body, etag), media_type = encoded.gzip(), "application/json"
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body, etag, media_type = encoded.body, encoded.etag, "application/json"
+    headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def _envelope_response(request: Request, name: str, data: dict) -> Response:
+    """Serve the pre-encoded public envelope (internal fields stripped)."""
+    return _encoded_response(request, public_envelopes.get(name, data), cache_control(data))
+
+async def _retailer_response(request: Request, name: str) -> Response:
+    """Serve a retailer's feed from its stored public projection (the stored
+    bytes, never decoded), or from the parsed envelope until one is published."""
+    crawler, refresh = _RETAILERS[name]
+    public = await crawler.fetch_public()
+    if public is not None:
+        refresh.trigger_if_needed(is_stale(public.summary))
+        return _encoded_response(request, public, cache_control(public.summary))
+    data = await crawler.fetch_data()
+    refresh.trigger_if_needed(is_stale(data))
+    if not data:
+        raise HTTPException(status_code=404, detail="No data available")
+    return _envelope_response(request, name, data)
+
+
+def _parse_fields(fields: str) -> tuple[str, ...]:
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in PRODUCT_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(PRODUCT_FIELDS)}",
+        )
+    return names
+
+def _projected_response(request: Request, name: str, data: dict, fields: str) -> Response:
+    """Serve the public envelope with products cut down to `fields`."""
+    encoded = public_envelopes.projected(name, data, _parse_fields(fields))
+    return _encoded_response(request, encoded, cache_control(data))
+
 @app.on_event("startup")
 async def start_scheduler():
     try:
@@ -53,6 +133,117 @@ async def start_scheduler():
     except Exception as e:
         logger.error(f"Failed to start scheduler: {e}")
 
+# name -> (crawler, refresh manager) for each retailer the frontend reads.
+# The names match /health's data_freshness keys and the frozen endpoints'
+# public_envelopes names, so the combined views share their encodings.
+_RETAILERS = {
+    "coles": (coles_v2_5_crawler_service, coles_refresh),
+    "woolies": (woolies_crawler_service, woolies_refresh),
+    "chemist_warehouse": (chemist_warehouse_crawler_service, chemist_warehouse_refresh),
+    "priceline": (priceline_crawler_service, priceline_refresh),
+}
+
+# Refresh state is read at scrape time rather than pushed on every change.
+metrics.gauge_collector(
+    "refresh_in_progress", "1 while the retailer's background crawl is running.",
+    lambda: (({"retailer": name}, float(refresh.is_running)) for name, (_, refresh) in _RETAILERS.items()),
+)
+metrics.gauge_collector(
+    "refresh_queued", "1 while the retailer's refresh waits for the global crawl slot.",
+    lambda: (({"retailer": name}, float(refresh.status()["refresh_queued"])) for name, (_, refresh) in _RETAILERS.items()),
+)
+metrics.gauge_collector(
+    "refresh_cooldown_remaining_seconds", "Seconds until a stale read may trigger another refresh.",
+    lambda: (({"retailer": name}, refresh.cooldown_remaining()) for name, (_, refresh) in _RETAILERS.items()),
+)
+metrics.gauge_collector(
+    "event_subscribers", "Open GET /events streams.",
+    lambda: [({}, float(len(refresh_events)))],
+)
+
+_DATA_PATHS = {
+    "/coles-data", "/coles-data-v2", "/coles-data-v2-5",
+    "/woolies-data", "/chemist-warehouse-data", "/priceline-data",
+}
+
+async def prefetch_envelopes():
+    """Load every retailer's envelope and public projection into the read
+    caches and queue refreshes for the stale ones in one pass. The data
+    endpoints serve the projection first, so warming only the envelope would
+    leave the first request a cold R2 read. Requests that arrive meanwhile
+    coalesce onto these same reads (see storage_io.SingleFlight)."""
+    started = time.perf_counter()
+    crawlers = [crawler for crawler, _ in _RETAILERS.values()]
+    results = await asyncio.gather(
+        *(crawler.fetch_data() for crawler in crawlers),
+        *(crawler.fetch_public() for crawler in crawlers),
+        return_exceptions=True,
+    )
+    results = results[:len(crawlers)]
+    for (_, refresh), data in zip(_RETAILERS.values(), results):
+        if isinstance(data, BaseException):
+            logger.warning(f"Prefetch for {refresh.name} failed: {data}")
+            continue
+        refresh.trigger_if_needed(is_stale(data), queue=True)
+    envelopes = {name: data for name, data in zip(_RETAILERS, results) if not isinstance(data, BaseException)}
+    try:
+        await search_index.fetch(envelopes)
+    except Exception as e:
+        logger.warning(f"Search index warm-up failed: {e}")
+    _wake_metrics["prefetch_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Prefetched retailer envelopes in {_wake_metrics['prefetch_ms']}ms")
+
+@app.on_event("startup")
+async def start_prefetch():
+    # Background task: startup must not wait on R2 before accepting requests.
+    global _prefetch_task
+    _prefetch_task = asyncio.create_task(prefetch_envelopes(), name="prefetch-envelopes")
+
+class RequestTimingMiddleware:
+    """Per-phase durations (services/timing.py) in a Server-Timing header, and
+    into the per-route window /health summarises and the /metrics histograms;
+    also records the first data response after wake for /health.
+
+    A plain ASGI middleware rather than @app.middleware("http"): that wraps
+    every response in an extra task and queue, and the timings need only the
+    response start."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = begin_request()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = timing.elapsed_ms()
+                message["headers"] = [
+                    *message.get("headers", []), (b"server-timing", timing.header(total_ms).encode("latin-1")),
+                ]
+                self._record(scope, message["status"], total_ms, timing)
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+    @staticmethod
+    def _record(scope, status: int, total_ms: float, timing):
+        route = scope.get("route")
+        if route is not None:
+            route_timings.record(route.path, total_ms, timing)
+        # unmatched paths share one label so scanners can't grow the series count
+        route_path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_DURATION.observe(total_ms / 1000, method=scope["method"], route=route_path)
+        HTTP_REQUESTS.inc(method=scope["method"], route=route_path, status=str(status))
+        if _wake_metrics["first_data_response_ms"] is None and scope["path"] in _DATA_PATHS:
+            _wake_metrics["first_data_path"] = scope["path"]
+            _wake_metrics["first_data_response_ms"] = round(total_ms, 1)
+            _wake_metrics["first_data_since_start_ms"] = round((time.monotonic() - _PROCESS_STARTED) * 1000, 1)
+
+app.add_middleware(RequestTimingMiddleware)
+
 @app.on_event("shutdown")
 async def shutdown_services():
     try:
@@ -60,6 +251,8 @@ async def shutdown_services():
             scheduler.shutdown(wait=False)
     except Exception as e:
         logger.warning(f"Scheduler shutdown error: {e}")
+    if _prefetch_task is not None and not _prefetch_task.done():
+        _prefetch_task.cancel()
     try:
         await coles_refresh.shutdown()
         await woolies_refresh.shutdown()
@@ -72,22 +265,65 @@ async def shutdown_services():
 def read_root():
     return {"message": "This is Vince API server."}
 
+@app.get("/livez")
+def read_liveness():
+    """Platform liveness probe (Fly http check) — touches no storage."""
+    return {"status": "ok"}
+
+async def _freshness_reports() -> dict:
+    """Per-retailer freshness, memoised for HEALTH_MEMO_SECONDS. Reads only
+    the snapshot manifest (object metadata before a retailer's first entry),
+    all four concurrently."""
+    now = time.monotonic()
+    if _health_memo["reports"] is not None and now - _health_memo["at"] < HEALTH_MEMO_SECONDS:
+        return _health_memo["reports"]
+    coles, woolies, cw, priceline = await asyncio.gather(
+        coles_v2_5_crawler_service.fetch_summary(),
+        woolies_crawler_service.fetch_summary(),
+        chemist_warehouse_crawler_service.fetch_summary(),
+        priceline_crawler_service.fetch_summary(),
+    )
+    reports = {
+        "coles": freshness_report(coles),
+        "woolies": freshness_report(woolies),
+        "chemist_warehouse": freshness_report(cw),
+        "priceline": freshness_report(priceline),
+    }
+    _health_memo.update(at=now, reports=reports)
+    return reports
+
 @app.get("/health")
 async def read_health():
     """Freshness diagnostics live here ONLY — data endpoints' shape is frozen."""
-    coles_data = await coles_v2_5_crawler_service.fetch_data()
-    woolies_data = await woolies_crawler_service.fetch_data()
-    cw_data = await chemist_warehouse_crawler_service.fetch_data()
+    reports = await _freshness_reports()
     return {
         "status": "ok",
         "data_freshness": {
-            "coles": freshness_report(coles_data) | coles_refresh.status(),
-            "woolies": freshness_report(woolies_data) | woolies_refresh.status(),
-            "chemist_warehouse": freshness_report(cw_data) | chemist_warehouse_refresh.status(),
-            "priceline": freshness_report(await priceline_crawler_service.fetch_data()) | priceline_refresh.status(),
+            "coles": reports["coles"] | coles_refresh.status(),
+            "woolies": reports["woolies"] | woolies_refresh.status(),
+            "chemist_warehouse": reports["chemist_warehouse"] | chemist_warehouse_refresh.status(),
+            "priceline": reports["priceline"] | priceline_refresh.status(),
         },
+        "wake": dict(_wake_metrics),
+        "event_subscribers": len(refresh_events),
+        "timings": route_timings.summary(),
     }
 
+@app.get("/metrics")
+def read_metrics():
+    """Prometheus text exposition of request, cache, R2 and crawl metrics."""
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/events")
+async def stream_refresh_events():
+    """SSE stream: an `event: refresh` with {"retailer", "synced_at"} each
+    time a background refresh lands new data."""
+    return StreamingResponse(
+        refresh_events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/calculate/{input}")
 def read_calculate(input: int):
     return service.calculate(input)
@@ -97,14 +333,17 @@ def read_oz_data(page: int = 20, wish: Annotated[list[str] | None, Query()] = No
     data = oz_crawler_service.oz_crawl_pipeline(page, wish)
     return data
 
+# The legacy Coles endpoints serve the V2.5 crawl's stored object and share
+# its cached encodings: the bodies (and ETags) are identical to /coles-data-v2-5.
 @app.get("/coles-data")
-async def read_coles_data():
-    """Read from saved JSON file; trigger background re-crawl when stale."""
-    data = await coles_crawler_service.fetch_data()
-    coles_refresh.trigger_if_needed(is_stale(data))
-    if not data:
-        raise HTTPException(status_code=404, detail="No data available")
-    return {k: v for k, v in data.items() if k not in _INTERNAL_FIELDS}
+async def read_coles_data(request: Request):
+    """Coles specials (legacy alias of /coles-data-v2-5)."""
+    return await _retailer_response(request, "coles")
+
+@app.get("/coles-data/fields")
+async def read_coles_data_fields(request: Request, fields: str):
+    """Coles products projected to the comma-separated `fields`."""
+    return await read_coles_data_v2_5_fields(request, fields)
 
 @app.post("/coles-data/sync")
 async def force_sync_coles_data():
@@ -115,13 +354,14 @@ async def force_sync_coles_data():
     return {"status": "success", "message": "Data synced successfully"}
 
 @app.get("/coles-data-v2")
-async def read_coles_data_v2():
-    """Read from saved JSON file; trigger background re-crawl when stale."""
-    data = await coles_v2_crawler_service.fetch_data()
-    coles_refresh.trigger_if_needed(is_stale(data))
-    if not data:
-        raise HTTPException(status_code=404, detail="No data available")
-    return {k: v for k, v in data.items() if k not in _INTERNAL_FIELDS}
+async def read_coles_data_v2(request: Request):
+    """Coles specials (legacy alias of /coles-data-v2-5)."""
+    return await _retailer_response(request, "coles")
+
+@app.get("/coles-data-v2/fields")
+async def read_coles_data_v2_fields(request: Request, fields: str):
+    """Coles products projected to the comma-separated `fields`."""
+    return await read_coles_data_v2_5_fields(request, fields)
 
 @app.post("/coles-data-v2/sync")
 async def force_sync_coles_data_v2():
@@ -132,13 +372,103 @@ async def force_sync_coles_data_v2():
     return {"status": "success", "message": "Data synced successfully"}
 
 @app.get("/coles-data-v2-5")
-async def read_coles_data_v2_5():
+async def read_coles_data_v2_5(request: Request):
     """Read Coles half-price specials from R2; trigger background re-crawl when stale."""
+    return await _retailer_response(request, "coles")
+
+PAGE_MAX_LIMIT = 500
+
+async def _retailer_ndjson(name: str) -> StreamingResponse:
+    """Stream a retailer's products as NDJSON, straight from its mapped
+    snapshot when there is one, otherwise encoded from the envelope."""
+    crawler, refresh = _RETAILERS[name]
+    snapshot = await crawler.fetch_snapshot()
+    if snapshot is not None:
+        summary, chunks = snapshot.summary, snapshot.iter_chunks()
+    else:
+        summary = await crawler.fetch_data()
+        if not summary:
+            refresh.trigger_if_needed(True)
+            raise HTTPException(status_code=404, detail="No data available")
+        chunks = iter_ndjson(summary.get("data") or [])
+    refresh.trigger_if_needed(is_stale(summary))
+    headers = {"Cache-Control": cache_control(summary), **ndjson_headers(summary)}
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+async def _retailer_page(name: str, offset: int, limit: int) -> Response:
+    """Products [offset, offset + limit) of a retailer's feed. Served as byte
+    slices of the mapped snapshot when there is one, so only the page is read."""
+    crawler, refresh = _RETAILERS[name]
+    snapshot = await crawler.fetch_snapshot()
+    if snapshot is not None:
+        summary = snapshot.summary
+        products = lines_to_json_array(snapshot.lines(offset, limit))
+    else:
+        data = await crawler.fetch_data()
+        if not data:
+            refresh.trigger_if_needed(True)
+            raise HTTPException(status_code=404, detail="No data available")
+        items = data.get("data") or []
+        summary = {"synced_at": data.get("synced_at"), "count": len(items)}
+        products = msgspec.json.encode(items[offset:offset + limit])
+    refresh.trigger_if_needed(is_stale(summary))
+    head = msgspec.json.encode({"synced_at": summary.get("synced_at"), "count": summary.get("count"), "offset": offset})
+    return Response(content=head[:-1] + b',"data":' + products + b"}", media_type="application/json",
+                    headers={"Cache-Control": cache_control(summary)})
+
+async def _retailer_diff(name: str, since: str) -> Response:
+    """What changed in a retailer's feed since the client's `since` sync.
+    Only the latest step is stored, so an older `since` gets 410 and the
+    client refetches the full feed."""
+    crawler, refresh = _RETAILERS[name]
+    summary = await crawler.fetch_summary()
+    if not summary:
+        refresh.trigger_if_needed(True)
+        raise HTTPException(status_code=404, detail="No data available")
+    refresh.trigger_if_needed(is_stale(summary))
+    synced_at = summary.get("synced_at")
+    # re-crawls that found the same products move synced_at on without a
+    # new snapshot, so the stored diff ends at the snapshot's own sync
+    published = summary.get("snapshot_synced_at") or synced_at
+    if since in (synced_at, published):
+        diff = empty_diff(synced_at)
+    else:
+        diff = await crawler.fetch_diff()
+        if not diff or diff.get("since") != since or diff.get("synced_at") != published:
+            raise HTTPException(
+                status_code=410,
+                detail=f"No diff from {since} to the current sync ({synced_at}); refetch the full feed",
+            )
+        diff = {**diff, "synced_at": synced_at}
+    return Response(content=msgspec.json.encode(diff), media_type="application/json",
+                    headers={"Cache-Control": cache_control(summary)})
+
+@app.get("/coles-data-v2-5/ndjson")
+async def stream_coles_data_v2_5():
+    """Stream Coles half-price specials as NDJSON (one product per line)."""
+    return await _retailer_ndjson("coles")
+
+@app.get("/coles-data-v2-5/page")
+async def read_coles_data_v2_5_page(
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=PAGE_MAX_LIMIT)] = 100,
+):
+    """One page of Coles half-price specials: {"synced_at", "count", "offset", "data"}."""
+    return await _retailer_page("coles", offset, limit)
+
+@app.get("/coles-data-v2-5/diff")
+async def read_coles_data_v2_5_diff(since: str):
+    """Coles half-price specials added, removed and re-priced since the `since` sync."""
+    return await _retailer_diff("coles", since)
+
+@app.get("/coles-data-v2-5/fields")
+async def read_coles_data_v2_5_fields(request: Request, fields: str):
+    """Coles (V2.5) products projected to the comma-separated `fields`."""
     data = await coles_v2_5_crawler_service.fetch_data()
     coles_refresh.trigger_if_needed(is_stale(data))
     if not data:
         raise HTTPException(status_code=404, detail="No data available")
-    return {k: v for k, v in data.items() if k not in _INTERNAL_FIELDS}
+    return _projected_response(request, "coles", data, fields)
 
 @app.post("/coles-data-v2-5/sync")
 async def force_sync_coles_data_v2_5():
@@ -149,13 +479,36 @@ async def force_sync_coles_data_v2_5():
     return {"status": "success", "message": "Data synced successfully"}
 
 @app.get("/woolies-data")
-async def read_woolies_data():
+async def read_woolies_data(request: Request):
     """Read from saved JSON file; trigger background re-crawl when stale."""
+    return await _retailer_response(request, "woolies")
+
+@app.get("/woolies-data/ndjson")
+async def stream_woolies_data():
+    """Stream Woolworths specials as NDJSON (one product per line)."""
+    return await _retailer_ndjson("woolies")
+
+@app.get("/woolies-data/page")
+async def read_woolies_data_page(
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=PAGE_MAX_LIMIT)] = 100,
+):
+    """One page of Woolworths specials: {"synced_at", "count", "offset", "data"}."""
+    return await _retailer_page("woolies", offset, limit)
+
+@app.get("/woolies-data/diff")
+async def read_woolies_data_diff(since: str):
+    """Woolworths specials added, removed and re-priced since the `since` sync."""
+    return await _retailer_diff("woolies", since)
+
+@app.get("/woolies-data/fields")
+async def read_woolies_data_fields(request: Request, fields: str):
+    """Woolworths products projected to the comma-separated `fields`."""
     data = await woolies_crawler_service.fetch_data()
     woolies_refresh.trigger_if_needed(is_stale(data))
     if not data:
         raise HTTPException(status_code=404, detail="No data available")
-    return {k: v for k, v in data.items() if k not in _INTERNAL_FIELDS}
+    return _projected_response(request, "woolies", data, fields)
 
 @app.post("/woolies-data/sync")
 async def force_sync_woolies_data():
@@ -166,13 +519,36 @@ async def force_sync_woolies_data():
     return {"status": "success", "message": "Data synced successfully"}
 
 @app.get("/chemist-warehouse-data")
-async def read_chemist_warehouse_data():
+async def read_chemist_warehouse_data(request: Request):
     """Read from saved JSON file; trigger background re-crawl when stale."""
+    return await _retailer_response(request, "chemist_warehouse")
+
+@app.get("/chemist-warehouse-data/ndjson")
+async def stream_chemist_warehouse_data():
+    """Stream Chemist Warehouse specials as NDJSON (one product per line)."""
+    return await _retailer_ndjson("chemist_warehouse")
+
+@app.get("/chemist-warehouse-data/page")
+async def read_chemist_warehouse_data_page(
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=PAGE_MAX_LIMIT)] = 100,
+):
+    """One page of Chemist Warehouse specials: {"synced_at", "count", "offset", "data"}."""
+    return await _retailer_page("chemist_warehouse", offset, limit)
+
+@app.get("/chemist-warehouse-data/diff")
+async def read_chemist_warehouse_data_diff(since: str):
+    """Chemist Warehouse specials added, removed and re-priced since the `since` sync."""
+    return await _retailer_diff("chemist_warehouse", since)
+
+@app.get("/chemist-warehouse-data/fields")
+async def read_chemist_warehouse_data_fields(request: Request, fields: str):
+    """Chemist Warehouse products projected to the comma-separated `fields`."""
     data = await chemist_warehouse_crawler_service.fetch_data()
     chemist_warehouse_refresh.trigger_if_needed(is_stale(data))
     if not data:
         raise HTTPException(status_code=404, detail="No data available")
-    return {k: v for k, v in data.items() if k not in _INTERNAL_FIELDS}
+    return _projected_response(request, "chemist_warehouse", data, fields)
 
 @app.post("/chemist-warehouse-data/sync")
 async def force_sync_chemist_warehouse_data():
@@ -183,13 +559,36 @@ async def force_sync_chemist_warehouse_data():
     return {"status": "success", "message": "Data synced successfully"}
 
 @app.get("/priceline-data")
-async def read_priceline_data():
+async def read_priceline_data(request: Request):
     """Read from saved JSON file; trigger background re-crawl when stale."""
+    return await _retailer_response(request, "priceline")
+
+@app.get("/priceline-data/ndjson")
+async def stream_priceline_data():
+    """Stream Priceline specials as NDJSON (one product per line)."""
+    return await _retailer_ndjson("priceline")
+
+@app.get("/priceline-data/page")
+async def read_priceline_data_page(
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=PAGE_MAX_LIMIT)] = 100,
+):
+    """One page of Priceline specials: {"synced_at", "count", "offset", "data"}."""
+    return await _retailer_page("priceline", offset, limit)
+
+@app.get("/priceline-data/diff")
+async def read_priceline_data_diff(since: str):
+    """Priceline specials added, removed and re-priced since the `since` sync."""
+    return await _retailer_diff("priceline", since)
+
+@app.get("/priceline-data/fields")
+async def read_priceline_data_fields(request: Request, fields: str):
+    """Priceline products projected to the comma-separated `fields`."""
     data = await priceline_crawler_service.fetch_data()
     priceline_refresh.trigger_if_needed(is_stale(data))
     if not data:
         raise HTTPException(status_code=404, detail="No data available")
-    return {k: v for k, v in data.items() if k not in _INTERNAL_FIELDS}
+    return _projected_response(request, "priceline", data, fields)
 
 @app.post("/priceline-data/sync")
 async def force_sync_priceline_data():
@@ -199,6 +598,119 @@ async def force_sync_priceline_data():
         raise HTTPException(status_code=500, detail="Failed to sync data")
     return {"status": "success", "message": "Data synced successfully"}
 
+def _parse_retailers(retailers: str | None) -> list[str]:
+    if not retailers:
+        return list(_RETAILERS)
+    names = [name.strip() for name in retailers.split(",") if name.strip()]
+    unknown = [name for name in names if name not in _RETAILERS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown retailer(s): {', '.join(unknown)}. Choose from: {', '.join(_RETAILERS)}",
+        )
+    return list(dict.fromkeys(names))
+
+async def _fetch_retailers(names: list[str]) -> dict[str, dict | None]:
+    """Envelopes for the named retailers, read concurrently. Stale retailers
+    are queued for refresh in one pass (crawls still run one at a time)."""
+    envelopes = await asyncio.gather(*(_RETAILERS[name][0].fetch_data() for name in names))
+    for name, data in zip(names, envelopes):
+        _RETAILERS[name][1].trigger_if_needed(is_stale(data), queue=True)
+    return dict(zip(names, envelopes))
+
+@app.get("/specials")
+async def read_specials(request: Request, retailers: str | None = None):
+    """All (or the selected, comma-separated) retailers' public envelopes in
+    one response: {"retailers": {"coles": {"synced_at", "count", "data"}, ...}}.
+    A retailer with no stored data is null."""
+    envelopes = await _fetch_retailers(_parse_retailers(retailers))
+    combined = public_envelopes.combined(envelopes)
+    stale = any(is_stale(data) for data in envelopes.values())
+    return _encoded_response(request, combined, cache_control_for(stale))
+
+QUERY_MAX_LIMIT = 200
+
+def _parse_choices(value: str | None, choices: tuple[str, ...], label: str) -> list[str] | None:
+    if not value:
+        return None
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in choices]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {label}(s): {', '.join(unknown)}. Choose from: {', '.join(choices)}",
+        )
+    return names
+
+@app.get("/specials/query")
+async def query_specials(
+    retailers: str | None = None,
+    discount_type: str | None = None,
+    min_price: Annotated[float | None, Query(ge=0)] = None,
+    max_price: Annotated[float | None, Query(ge=0)] = None,
+    min_fraction: Annotated[float | None, Query(ge=0, le=1)] = None,
+    max_fraction: Annotated[float | None, Query(ge=0, le=1)] = None,
+    sort: str = "price",
+    order: str = "asc",
+    limit: Annotated[int, Query(ge=1, le=QUERY_MAX_LIMIT)] = 50,
+    cursor: str | None = None,
+):
+    """Filter, sort and page across every retailer's products server-side.
+    Returns {"count": total matches, "data": [products], "next_cursor"}."""
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORT_KEYS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    selected = _parse_choices(retailers, tuple(_RETAILERS), "retailer")
+    discount_types = _parse_choices(discount_type, DISCOUNT_TYPES, "discount_type")
+
+    envelopes = await _fetch_retailers(list(_RETAILERS))
+    table = await product_tables.fetch(envelopes)
+    try:
+        offset = table.decode_cursor(cursor) if cursor else 0
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page, total = table.query(
+        retailers=selected,
+        discount_types=discount_types,
+        min_price=min_price,
+        max_price=max_price,
+        min_fraction=min_fraction,
+        max_fraction=max_fraction,
+        sort=sort,
+        descending=order == "desc",
+        offset=offset,
+        limit=limit,
+    )
+    end = offset + len(page)
+    body = msgspec.json.encode({
+        "count": total,
+        "data": table.rows(page),
+        "next_cursor": table.encode_cursor(end) if end < total else None,
+    })
+    stale = any(is_stale(data) for data in envelopes.values())
+    return Response(content=body, media_type="application/json",
+                    headers={"Cache-Control": cache_control_for(stale)})
+
+SEARCH_MAX_LIMIT = 100
+
+@app.get("/specials/search")
+async def search_specials(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    retailers: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=SEARCH_MAX_LIMIT)] = 20,
+):
+    """Search product names across retailers; best term match first, then
+    biggest fraction off. Returns {"count": total matches, "data": [products]}."""
+    selected = _parse_choices(retailers, tuple(_RETAILERS), "retailer")
+    envelopes = await _fetch_retailers(list(_RETAILERS))
+    await search_index.fetch(envelopes)
+    products, total = search_index.search(q, retailers=selected, limit=limit)
+    stale = any(is_stale(data) for data in envelopes.values())
+    return Response(content=msgspec.json.encode({"count": total, "data": products}),
+                    media_type="application/json", headers={"Cache-Control": cache_control_for(stale)})
+
 class PasswordRequest(BaseModel):
     say: str
 
@@ -0,0 +1,144 @@
+"""
+Static public copies of each retailer's feed, served by R2/CDN without the API.
+
+The Fly machine auto-stops when idle, so after a quiet spell every frontend
+fetch cold-starts FastAPI, boto3 and scrapling only to proxy a JSON file that
+changes once a week. So each publish also writes the frozen public body
+(public_envelope.EncodedEnvelope, the same bytes /<retailer>-data returns)
+to a bucket exposed through a public R2 domain, together with a small
+freshness beacon. The copies are stored gzip-compressed with
+ContentEncoding gzip, and Cloudflare decompresses them for the rare client
+that doesn't accept gzip:
+
+    <prefix>coles.json  woolies.json  chemist_warehouse.json  priceline.json
+    <prefix>freshness.json
+
+    {"updated_at": "...",
+     "retailers": {"woolies": {"path": "woolies.json", "synced_at": "...",
+                               "fresh_until": "...", "count": 812}, ...}}
+
+A static object can't compute a max-age at request time, and a max-age set
+at publish would let a browser hold the copy past the next reset. So each
+copy gets an absolute Expires at the specials reset after its sync, plus
+"must-revalidate". After that moment caches check back with R2, which
+answers with a cheap 304 on the object's own ETag until a new crawl lands.
+The beacon is cached for only BEACON_MAX_AGE_SECONDS.
+
+The frontend reads the beacon first. A retailer whose fresh_until is still
+ahead is read from its static copy. Only one that has passed needs the API,
+whose read wakes the machine and triggers the refresh.
+
+The beacon is shared by every retailer, and crawls on different machines
+publish it independently. Its read-modify-write is a conditional put
+(IfMatch on the ETag read, IfNoneMatch="*" before the first publish),
+retried on a 412 as SnapshotManifest._update does. A lock within the process
+saves most retries.
+
+Publishing is off unless R2_PUBLIC_BUCKET_NAME names the public bucket
+(configured in services/registry.py). It is never fatal to a crawl.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from services.envelope_cache import is_missing, is_precondition_failed
+from services.freshness import next_specials_reset, parse_synced_at
+from services.public_envelope import EncodedEnvelope, JSON_MEDIA_TYPE
+
+logger = logging.getLogger(__name__)
+
+BEACON_NAME = "freshness.json"
+BEACON_MAX_AGE_SECONDS = 60
+BEACON_WRITE_ATTEMPTS = 5
+
+
+def fresh_until(synced_at: str | None) -> datetime | None:
+    """The specials reset after `synced_at`, when its data goes stale."""
+    synced = parse_synced_at(synced_at)
+    return next_specials_reset(synced).astimezone(timezone.utc) if synced else None
+
+
+class CdnPublisher:
+    def __init__(self):
+        self.bucket: str | None = None
+        self.prefix = ""
+        # serialises the beacon's read-modify-write across crawls
+        self._beacon_lock = threading.Lock()
+
+    def configure(self, bucket: str, prefix: str = ""):
+        self.bucket = bucket or None
+        self.prefix = prefix
+
+    @property
+    def enabled(self) -> bool:
+        return self.bucket is not None
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def publish(self, s3_client, retailer: str, data: dict):
+        """Write `retailer`'s public copy, then point the beacon at it."""
+        if not self.enabled:
+            return
+        encoded = EncodedEnvelope(data)
+        path = f"{retailer}.json"
+        expires = fresh_until(data.get("synced_at"))
+        extra = {"Expires": expires} if expires else {}
+        s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self.key(path),
+            Body=encoded.gzip()[0],
+            ContentEncoding="gzip",
+            ContentType=JSON_MEDIA_TYPE,
+            CacheControl="public, must-revalidate",
+            **extra,
+        )
+        logger.info(f"Public copy saved to R2: {self.key(path)}")
+        self._update_beacon(s3_client, retailer, {
+            "path": path,
+            "synced_at": data.get("synced_at"),
+            "fresh_until": expires.isoformat() if expires else None,
+            "count": len(data.get("data") or []),
+        })
+
+    def _update_beacon(self, s3_client, retailer: str, entry: dict):
+        key = self.key(BEACON_NAME)
+        with self._beacon_lock:
+            for attempt in range(1, BEACON_WRITE_ATTEMPTS + 1):
+                beacon, etag = self._read_beacon(s3_client, key)
+                beacon["retailers"][retailer] = entry
+                beacon["updated_at"] = datetime.now(timezone.utc).isoformat()
+                condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+                try:
+                    s3_client.put_object(
+                        Bucket=self.bucket,
+                        Key=key,
+                        Body=json.dumps(beacon),
+                        ContentType=JSON_MEDIA_TYPE,
+                        CacheControl=f"public, max-age={BEACON_MAX_AGE_SECONDS}",
+                        **condition,
+                    )
+                    return
+                except ClientError as e:
+                    if not is_precondition_failed(e) or attempt == BEACON_WRITE_ATTEMPTS:
+                        raise
+                    logger.info(f"Beacon changed while updating {retailer}; retrying ({attempt}/{BEACON_WRITE_ATTEMPTS})")
+
+    def _read_beacon(self, s3_client, key: str) -> tuple[dict, str | None]:
+        """(beacon, ETag), with no ETag before the first publish."""
+        try:
+            response = s3_client.get_object(Bucket=self.bucket, Key=key)
+            beacon, etag = json.loads(response["Body"].read()), response.get("ETag")
+        except ClientError as e:
+            if not is_missing(e):
+                raise
+            beacon, etag = {}, None
+        beacon.setdefault("retailers", {})
+        return beacon, etag
+
+
+cdn_publisher = CdnPublisher()
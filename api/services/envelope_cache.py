@@ -0,0 +1,313 @@
+"""
+In-process read-through cache for stored crawl envelopes.
+
+Every data endpoint used to download and json-parse the whole R2 object on
+every request, even though the data changes once a week. EnvelopeCache keeps
+the parsed envelope per R2 key and, once it is older than
+REVALIDATE_SECONDS, revalidates it with a conditional
+get_object(IfNoneMatch=etag). A 304 keeps the parsed copy, so steady-state
+reads are a dict lookup and the periodic check costs no body transfer or parse.
+
+  - NoSuchKey is cached negatively (for NEGATIVE_TTL_SECONDS) so a retailer
+    with no stored data doesn't cost an R2 GET per request
+  - save_to_file() invalidates the key as soon as its put_object returns, so
+    this process never serves data it has itself superseded
+  - cached envelopes are shared between requests — callers must not mutate them
+  - load(..., immutable=True) is for keys whose content never changes once
+    written (the content-addressed snapshots, services/snapshot_manifest.py).
+    Their entries are never revalidated; they stay until invalidate() drops them
+
+An optional local-disk tier (services/snapshot_store.py) sits underneath:
+every body fetched from R2 is also written to disk with its ETag, and a
+process whose memory is cold serves the disk copy straight away while a
+background revalidation against R2 runs behind it (stale-while-revalidate).
+When R2 errors, the last known envelope — memory or disk — keeps being
+served rather than turning into a 404.
+
+Publishers also store the envelope's synced_at / crawl_status / count as
+object metadata (envelope_metadata), so summary() can answer freshness
+questions for /health with a HEAD instead of a full download and parse.
+
+Envelopes are stored gzip-compressed (compress_envelope, ContentEncoding
+gzip). That is roughly a tenth of the R2 storage and egress. Loads recognise
+a compressed body by its magic bytes rather than the header, so objects
+written before the change keep loading, and so does a body some layer has
+already decompressed. The disk tier keeps the decompressed JSON.
+
+The same machinery caches other stored objects by passing a `decode`
+callable, which turns a fetched body (and its get_object response) into the
+cached value in place of the JSON parse. The public projection
+(services/public_object.py) is cached this way as its stored bytes. A cache
+with a custom decoder has no disk tier, since the disk keeps parsed JSON.
+
+Loads report to the request's Server-Timing (services/timing.py). The R2
+round trip is recorded as "r2" and the JSON parse as "decode". A "cache"
+mark records how the load was answered: hit, disk, revalidated (a 304),
+miss, or stale (served through an R2 error). The same outcome is counted in
+/metrics' envelope_cache_lookups_total.
+"""
+
+import gzip
+import json
+import logging
+import threading
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from services.snapshot_store import LocalSnapshotStore
+from services.storage_io import submit_storage_io
+from services.timing import phase, mark
+from services.metrics import ENVELOPE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Data only changes on publish (which invalidates locally) or on another
+# machine's publish, so a short revalidation window is plenty.
+REVALIDATE_SECONDS = 60
+NEGATIVE_TTL_SECONDS = 60
+
+ENVELOPE_CONTENT_ENCODING = "gzip"
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_not_modified(exc: ClientError) -> bool:
+    """boto3 surfaces a conditional GET's 304 as a ClientError."""
+    code = exc.response.get("Error", {}).get("Code")
+    status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("304", "NotModified") or status == 304
+
+
+def envelope_metadata(data: dict) -> dict[str, str]:
+    """S3 user metadata to store with an envelope (values must be strings)."""
+    meta = {"synced-at": data.get("synced_at") or "", "count": str(data.get("count", 0))}
+    if data.get("crawl_status"):
+        meta["crawl-status"] = data["crawl_status"]
+    return meta
+
+
+def compress_envelope(data: dict) -> bytes:
+    """The stored form of an envelope. mtime is pinned so identical data
+    always compresses to identical bytes (and so an identical ETag)."""
+    return gzip.compress(json.dumps(data).encode("utf-8"), mtime=0)
+
+
+def envelope_summary(data: dict) -> dict:
+    return {
+        "synced_at": data.get("synced_at"),
+        "crawl_status": data.get("crawl_status"),
+        "count": data.get("count"),
+    }
+
+
+def record_lookup(result: str):
+    """Report how a stored object was answered (see module docstring)."""
+    mark("cache", result)
+    ENVELOPE_CACHE_LOOKUPS.inc(result=result)
+
+
+def is_missing(exc: ClientError) -> bool:
+    """404 / NoSuchKey from get_object or head_object."""
+    code = exc.response.get("Error", {}).get("Code")
+    status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("404", "NoSuchKey", "NotFound") or status == 404
+
+
+def is_precondition_failed(exc: ClientError) -> bool:
+    """412 from a conditional put_object, or 409 when another conditional
+    write to the key was in flight."""
+    code = exc.response.get("Error", {}).get("Code")
+    status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("PreconditionFailed", "ConditionalRequestConflict") or status in (409, 412)
+
+
+class _Entry:
+    __slots__ = ("data", "etag", "checked_at")
+
+    def __init__(self, data: dict | None, etag: str | None, checked_at: float):
+        self.data = data
+        self.etag = etag
+        self.checked_at = checked_at
+
+
+class EnvelopeCache:
+    def __init__(
+        self,
+        revalidate_seconds: float = REVALIDATE_SECONDS,
+        negative_ttl_seconds: float = NEGATIVE_TTL_SECONDS,
+        clock=time.monotonic,
+        background=None,
+        decode=None,
+    ):
+        self._revalidate = revalidate_seconds
+        self._negative_ttl = negative_ttl_seconds
+        self._clock = clock
+        # Runs a zero-arg callable off the caller's thread; None disables
+        # background revalidation of disk-served snapshots.
+        self._background = background
+        # (body, get_object response) -> cached value; None parses an envelope
+        self._decode = decode
+        self._disk: LocalSnapshotStore | None = None
+        self._revalidating: set[str] = set()
+        self._entries: dict[str, _Entry] = {}
+        # Bumped by invalidate(); a fetch that started before an invalidation
+        # must not store its (now superseded) result.
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def attach_disk(self, store: LocalSnapshotStore | None):
+        if store is not None and self._decode is not None:
+            raise ValueError("a cache with a custom decoder has no disk tier")
+        self._disk = store
+
+    def load(self, s3_client, bucket: str, key: str, immutable: bool = False) -> dict | None:
+        """The parsed envelope stored at `key`, or None when it doesn't exist.
+        Storage errors other than NoSuchKey propagate to the caller unless a
+        previously seen copy can be served instead. An `immutable` key is
+        never revalidated once it has been read."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generations.get(key, 0)
+        if entry is not None:
+            ttl = self._negative_ttl if entry.data is None else self._revalidate
+            if (immutable and entry.data is not None) or now - entry.checked_at < ttl:
+                record_lookup("hit")
+                return entry.data
+        elif self._disk is not None:
+            snapshot = self._disk.read(key)
+            if snapshot is not None:
+                data, etag = snapshot
+                logger.info(f"Serving local snapshot of {key}; revalidating against R2")
+                record_lookup("disk")
+                self._store(key, generation, _Entry(data, etag, now))
+                if not immutable:
+                    self._revalidate_later(s3_client, bucket, key)
+                return data
+        return self._fetch(s3_client, bucket, key, entry, generation, now)
+
+    def _fetch(self, s3_client, bucket: str, key: str, entry: _Entry | None, generation: int, now: float) -> dict | None:
+        kwargs = {"Bucket": bucket, "Key": key}
+        if entry is not None and entry.etag:
+            kwargs["IfNoneMatch"] = entry.etag
+        try:
+            with phase("r2"):
+                response = s3_client.get_object(**kwargs)
+        except s3_client.exceptions.NoSuchKey:
+            record_lookup("miss")
+            if self._store(key, generation, _Entry(None, None, now)) and self._disk is not None:
+                self._disk.remove(key)
+            return None
+        except (ClientError, BotoCoreError) as e:
+            if entry is not None and entry.etag and isinstance(e, ClientError) and is_not_modified(e):
+                logger.debug(f"{key} not modified — reusing cached envelope")
+                record_lookup("revalidated")
+                self._store(key, generation, _Entry(entry.data, entry.etag, now))
+                return entry.data
+            if entry is not None and entry.data is not None:
+                # Brownout: keep serving the last known copy; retry after the
+                # normal revalidation window rather than on every request.
+                logger.warning(f"R2 read of {key} failed ({e}); serving cached copy")
+                record_lookup("stale")
+                self._store(key, generation, _Entry(entry.data, entry.etag, now))
+                return entry.data
+            raise
+
+        record_lookup("miss")
+        with phase("r2"):
+            body = response["Body"].read()
+        if self._decode is not None:
+            data = self._decode(body, response)
+        else:
+            with phase("decode"):
+                if body[:2] == _GZIP_MAGIC:
+                    body = gzip.decompress(body)
+                data = json.loads(body)
+        etag = response.get("ETag")
+        if self._store(key, generation, _Entry(data, etag, now)) and self._disk is not None and etag:
+            self._write_disk(key, generation, body, etag)
+        return data
+
+    def _write_disk(self, key: str, generation: int, body: bytes, etag: str):
+        try:
+            self._disk.write(key, body, etag)
+        except OSError as e:
+            logger.warning(f"Could not write local snapshot of {key}: {e}")
+            return
+        with self._lock:
+            superseded = self._generations.get(key, 0) != generation
+        if superseded:
+            # a publish invalidated the key while this body was being written
+            self._disk.remove(key)
+
+    def _revalidate_later(self, s3_client, bucket: str, key: str):
+        if self._background is None:
+            return
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    generation = self._generations.get(key, 0)
+                self._fetch(s3_client, bucket, key, entry, generation, self._clock())
+            except Exception as e:
+                logger.warning(f"Background revalidation of {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+        self._background(revalidate)
+
+    def summary(self, s3_client, bucket: str, key: str) -> dict | None:
+        """synced_at / crawl_status / count for `key` without downloading it:
+        from the cached envelope when it's current, otherwise from the
+        object's metadata. Objects published before the metadata existed fall
+        back to a full load."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry.data is not None and self._clock() - entry.checked_at < self._revalidate:
+            return envelope_summary(entry.data)
+
+        try:
+            head = s3_client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if is_missing(e):
+                return None
+            raise
+        meta = head.get("Metadata") or {}
+        if "synced-at" not in meta:
+            data = self.load(s3_client, bucket, key)
+            return envelope_summary(data) if data is not None else None
+        return {
+            "synced_at": meta["synced-at"] or None,
+            "crawl_status": meta.get("crawl-status"),
+            "count": int(meta.get("count") or 0),
+        }
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+        if self._disk is not None:
+            self._disk.remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+
+    def _store(self, key: str, generation: int, entry: _Entry) -> bool:
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return False
+            self._entries[key] = entry
+            return True
+
+
+# Shared by every crawler instance so the legacy Coles crawlers and the V2.5
+# crawler see one cache entry per R2 key.
+envelope_cache = EnvelopeCache(background=submit_storage_io)
@@ -0,0 +1,80 @@
+"""
+Publish-time diffs between consecutive envelopes, for `?since=` reads.
+
+Most of a returning client's interest is in what changed since its last
+visit (new deals, price drops), yet it re-downloads every product each week.
+So each publish also compares the new envelope with the one it replaces and
+stores the delta next to it in R2:
+
+    priceline_specials.json          the envelope (unchanged)
+    priceline_specials.diff.json     {"since", "synced_at", "added", "removed", "changed"}
+
+Products are matched on product_key (the product link, which every crawler
+fills and which is unique within a retailer's feed). The comparison is a
+hash join: index the previous products by key once, then probe it with each
+current product, so it is linear in catalogue size. It runs once per crawl.
+
+The delta is kept compact. `added` holds whole products because the client
+has never seen them. `removed` is just keys. `changed` holds the key plus
+the PRICE_FIELDS, since those are what changes from week to week; any other
+edit to a product shows up only in the full feed.
+
+Only one step is kept: a diff from the previous sync to the current one. A
+client whose `since` is older than that has missed at least one publish and
+must refetch the whole feed.
+"""
+
+import logging
+
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ("price", "price_was", "discount", "discount_type", "price_per_unit")
+
+
+def diff_key(file_key: str) -> str:
+    """The diff object stored next to the envelope at `file_key`."""
+    return file_key.removesuffix(".json") + ".diff.json"
+
+
+def product_key(product: dict) -> str:
+    return product.get("product_link") or f"{product.get('retailer')}:{product.get('name')}"
+
+
+def compute_diff(previous: dict, current: dict) -> dict:
+    """Products added, removed and re-priced between two envelopes."""
+    remaining = {product_key(product): product for product in previous.get("data") or []}
+    added, changed = [], []
+    for product in current.get("data") or []:
+        key = product_key(product)
+        before = remaining.pop(key, None)
+        if before is None:
+            added.append(product)
+        elif any(before.get(field) != product.get(field) for field in PRICE_FIELDS):
+            changed.append({"key": key, **{field: product.get(field) for field in PRICE_FIELDS}})
+    return {
+        "since": previous.get("synced_at"),
+        "synced_at": current.get("synced_at"),
+        "added": added,
+        "removed": list(remaining),
+        "changed": changed,
+    }
+
+
+def empty_diff(synced_at: str | None) -> dict:
+    """The delta for a client that already has the current sync."""
+    return {"since": synced_at, "synced_at": synced_at, "added": [], "removed": [], "changed": []}
+
+
+def publish_diff(s3_client, bucket: str, file_key: str, previous: dict | None, current: dict):
+    """Store the delta from `previous` to `current`. Without a previous
+    envelope there is nothing to diff against and no object is written."""
+    if not previous or previous.get("synced_at") == current.get("synced_at"):
+        return
+    diff = compute_diff(previous, current)
+    key = diff_key(file_key)
+    s3_client.put_object(Bucket=bucket, Key=key, Body=msgspec.json.encode(diff), ContentType="application/json")
+    logger.info(
+        f"Diff saved to R2: {key} (+{len(diff['added'])} -{len(diff['removed'])} ~{len(diff['changed'])})"
+    )
@@ -4,7 +4,8 @@ Staleness detection for weekly specials data.
 Australian retail specials (Coles, Woolworths) reset Wednesday 00:00 AEST/AEDT.
 Stored data is stale when it was synced before the most recent Wednesday
 midnight (Sydney time). Freshness info is exposed only via GET /health —
-the product data endpoints' response shape is frozen.
+the product data endpoints' response shape is frozen; they reflect it solely
+in their Cache-Control header (see cache_control).
 """
 
 from datetime import datetime, timedelta, timezone
@@ -13,6 +14,11 @@ from zoneinfo import ZoneInfo
 SYDNEY_TZ = ZoneInfo("Australia/Sydney")
 SPECIALS_WEEKDAY = 2  # Wednesday (Monday=0)
 
+# Stale data is about to be replaced by a background refresh, so clients may
+# only hold it briefly — but can keep showing it while they revalidate.
+STALE_MAX_AGE_SECONDS = 60
+STALE_WHILE_REVALIDATE_SECONDS = 300
+
 
 def last_specials_reset(now: datetime | None = None) -> datetime:
     """The most recent Wednesday 00:00 Sydney time."""
@@ -24,6 +30,21 @@ def last_specials_reset(now: datetime | None = None) -> datetime:
     return now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_since)
 
 
+def next_specials_reset(now: datetime | None = None) -> datetime:
+    """The upcoming Wednesday 00:00 Sydney time."""
+    # Wall-clock arithmetic: stays at local midnight across a DST change.
+    return last_specials_reset(now) + timedelta(days=7)
+
+
+def seconds_until_next_reset(now: datetime | None = None) -> int:
+    if now is None:
+        now = datetime.now(SYDNEY_TZ)
+    # Subtract in UTC — aware datetimes sharing a tzinfo subtract as naive
+    # wall times, which is an hour out across a DST change.
+    delta = next_specials_reset(now).astimezone(timezone.utc) - now.astimezone(timezone.utc)
+    return max(0, int(delta.total_seconds()))
+
+
 def parse_synced_at(synced_at: str | None) -> datetime | None:
     """Parse an ISO timestamp; naive values are treated as UTC
     (older crawlers wrote naive UTC timestamps)."""
@@ -87,3 +108,18 @@ def freshness_report(data: dict | None, now: datetime | None = None) -> dict:
             f"on {reset.strftime('%A %d %b %H:%M %Z')}"
         )
     return report
+
+
+def cache_control(data: dict | None, now: datetime | None = None) -> str:
+    """Cache-Control for a data response: fresh data can't change before the
+    next specials reset, so it's cacheable until then; stale data is about to
+    be refreshed, so it gets a short max-age plus stale-while-revalidate."""
+    return cache_control_for(is_stale(data, now), now)
+
+
+def cache_control_for(stale: bool, now: datetime | None = None) -> str:
+    """cache_control() for a response built from several envelopes — stale
+    when any of them is."""
+    if stale:
+        return f"public, max-age={STALE_MAX_AGE_SECONDS}, stale-while-revalidate={STALE_WHILE_REVALIDATE_SECONDS}"
+    return f"public, max-age={seconds_until_next_reset(now)}"
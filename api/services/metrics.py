@@ -0,0 +1,241 @@
+"""
+Prometheus text-format metrics with no client library.
+
+/health answers "is it fresh right now"; /metrics is for trends — request
+latency per route, how often the envelope cache hits, R2 latency and errors,
+crawl outcomes. The exposition format (version 0.0.4) is simple enough that
+a few small classes cover it, which keeps prometheus_client out of the image.
+
+Updating a metric is one lock and a dict update (plus a short bucket scan for
+histograms), so instrumenting the request path costs microseconds. Metrics
+that describe current state rather than events (refresh in progress,
+cooldown remaining) are produced by collector callbacks at scrape time
+instead of being kept up to date on every change.
+
+R2 calls are measured through botocore's event hooks (instrument_s3_client),
+so every get/head/put made by any crawler is covered without touching the
+call sites. The duration ends when the response headers are parsed; a
+streamed body download isn't included. Statuses the storage layer asks for
+in normal operation are not errors: 304 from a conditional GET, 404 behind
+the negative caches, 412 from a conditional put that lost a race and
+retries.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. Request buckets span a memory hit (<1ms) to a cold R2 parse.
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+R2_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CRAWL_BUCKETS = (30.0, 60.0, 120.0, 300.0, 600.0, 900.0, 1800.0)
+# R2 answers the storage layer expects (see the module docstring).
+EXPECTED_R2_STATUSES = frozenset({304, 404, 412})
+
+Sample = tuple[str, dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = REQUEST_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (non-cumulative, + overflow), sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._series.items()]
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class GaugeCollector:
+    """A gauge whose samples are produced at scrape time by `collect`."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Iterable[tuple[dict, float]]]):
+        self.name = name
+        self.help = help_text
+        self._collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self._collect():
+            yield self.name, labels, value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = REQUEST_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_collector(self, name: str, help_text: str,
+                        collect: Callable[[], Iterable[tuple[dict, float]]]) -> GaugeCollector:
+        """Register (or replace) a scrape-time gauge."""
+        metric = GaugeCollector(name, help_text, collect)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Request handling time by route.", ("method", "route"))
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "Requests by route and status code.", ("method", "route", "status"))
+ENVELOPE_CACHE_LOOKUPS = metrics.counter(
+    "envelope_cache_lookups_total",
+    "Envelope loads by outcome: hit, disk, revalidated (304), miss, stale (served through an R2 error).",
+    ("result",))
+R2_REQUEST_DURATION = metrics.histogram(
+    "r2_request_duration_seconds", "R2 API call latency (to parsed response headers).", ("operation",), R2_BUCKETS)
+R2_REQUEST_ERRORS = metrics.counter(
+    "r2_request_errors_total", "R2 API calls that failed, by HTTP status or exception type.", ("operation", "code"))
+REFRESH_TRIGGERS = metrics.counter(
+    "refresh_triggers_total", "Background refreshes started.", ("retailer",))
+REFRESH_REJECTED = metrics.counter(
+    "refresh_rejected_total",
+    "Stale-data triggers that did not start a refresh, by reason (running, global_slot, cooldown).",
+    ("retailer", "reason"))
+CRAWL_RUNS = metrics.counter(
+    "crawl_runs_total", "Finished background crawls by outcome (success, no_data, error).", ("retailer", "outcome"))
+CRAWL_DURATION = metrics.histogram(
+    "crawl_duration_seconds", "Background crawl duration.", ("retailer",), CRAWL_BUCKETS)
+CRAWL_PAGES = metrics.counter(
+    "crawl_pages_total", "Crawl pages by result (attempted, succeeded, blocked).", ("retailer", "result"))
+CRAWL_PRODUCTS = metrics.counter(
+    "crawl_products_total", "Products extracted by successful crawls.", ("retailer",))
+
+
+def instrument_s3_client(client):
+    """Time every call `client` makes and count its failures, leaving out
+    EXPECTED_R2_STATUSES."""
+    events = client.meta.events
+
+    def before_call(model, context, **kwargs):
+        context["metrics_operation"] = model.name
+        context["metrics_started"] = time.perf_counter()
+
+    def after_call(http_response, model, context, **kwargs):
+        started = context.pop("metrics_started", None)
+        if started is not None:
+            R2_REQUEST_DURATION.observe(time.perf_counter() - started, operation=model.name)
+        status = http_response.status_code
+        if status >= 400 and status not in EXPECTED_R2_STATUSES:
+            R2_REQUEST_ERRORS.inc(operation=model.name, code=str(status))
+
+    def after_call_error(exception, context, **kwargs):
+        context.pop("metrics_started", None)
+        R2_REQUEST_ERRORS.inc(operation=context.get("metrics_operation", "unknown"), code=type(exception).__name__)
+
+    events.register("before-call.s3", before_call)
+    events.register("after-call.s3", after_call)
+    events.register("after-call-error.s3", after_call_error)
+    return client
@@ -0,0 +1,335 @@
+"""
+Publish-time NDJSON snapshots with an offset index, for paginated reads.
+
+A paginated read of a parsed envelope still holds the whole catalogue as
+Python dicts, and on a 4 GB machine shared with Chromium that is real RAM
+(Priceline's full sale is ~3.9k products). So each publish also writes the
+products as NDJSON — one frozen-shape product per line — plus an index of
+line start offsets (array('Q'), n + 1 entries, the last being the body
+length), next to the envelope in R2:
+
+    priceline_specials.json          the envelope (unchanged)
+    priceline_specials.ndjson        products, one per line
+    priceline_specials.ndjson.idx    uint64 line offsets (native order; little-endian on every host we run)
+
+Both are mirrored into a local directory and read through mmap: a page is one
+slice of the mapping between two index entries, so the serving path touches
+only the page's bytes and never parses the document. Pages are assembled into
+JSON by splicing (a JSON-encoded line never contains a raw newline, so
+newline -> comma turns a run of lines into array elements).
+
+The NDJSON object also records the content hash of the products it was
+built from (snapshot_manifest.content_hash), which lands in the summary as
+"hash". A re-crawl that finds the same products leaves the snapshot valid,
+and the caller serves it with_summary() the manifest's crawl fields.
+
+A mirror left on a persistent volume by an earlier process is checked against
+the R2 object's ETag before it is trusted; a missing or stale mirror is
+downloaded. An open mapping is re-checked the same way (one HEAD) once it is
+older than REVALIDATE_SECONDS, following EnvelopeCache, so a snapshot
+published by another machine replaces it within that window. One that has
+been deleted is dropped, and an R2 error keeps serving the mapping already
+open. Each retailer's opens and revalidations are serialised by a lock of
+its own, so a multi-megabyte download for one retailer never holds up
+another's reads. Without a local directory (or before a retailer's first
+snapshot exists) callers fall back to the parsed envelope.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+from array import array
+from collections.abc import Iterator
+
+import msgspec
+from botocore.exceptions import BotoCoreError, ClientError
+
+from services.envelope_cache import REVALIDATE_SECONDS, envelope_metadata, is_missing
+
+logger = logging.getLogger(__name__)
+
+OFFSET_TYPECODE = "Q"
+OFFSET_SIZE = array(OFFSET_TYPECODE).itemsize
+# Lines per chunk when streaming a whole snapshot (see ndjson_stream.STREAM_BATCH).
+STREAM_LINES = 64
+# A retailer with no snapshot in R2 yet is re-checked at most this often.
+NEGATIVE_TTL_SECONDS = 60
+
+
+def snapshot_keys(file_key: str) -> tuple[str, str]:
+    """(NDJSON key, index key) stored next to the envelope at `file_key`."""
+    ndjson_key = file_key.removesuffix(".json") + ".ndjson"
+    return ndjson_key, ndjson_key + ".idx"
+
+
+def encode_snapshot(data: dict) -> tuple[bytes, array]:
+    encoder = msgspec.json.Encoder()
+    body = bytearray()
+    offsets = array(OFFSET_TYPECODE, [0])
+    for product in data.get("data") or []:
+        encoder.encode_into(product, body, -1)
+        body.extend(b"\n")
+        offsets.append(len(body))
+    return bytes(body), offsets
+
+
+def lines_to_json_array(lines: bytes) -> bytes:
+    if not lines:
+        return b"[]"
+    return b"[" + lines[:-1].replace(b"\n", b",") + b"]"
+
+
+class MappedSnapshot:
+    """One retailer's NDJSON snapshot, mapped read-only with its index."""
+
+    def __init__(self, ndjson_path: str, index_path: str, summary: dict):
+        self.summary = summary
+        self._body = self._map(ndjson_path)
+        self._index = self._map(index_path)
+        self.offsets = memoryview(self._index).cast(OFFSET_TYPECODE) if len(self._index) else array(OFFSET_TYPECODE, [0])
+        if len(self.offsets) - 1 != summary.get("count") or self.offsets[-1] != len(self._body):
+            raise ValueError("NDJSON snapshot and index do not match")
+
+    @staticmethod
+    def _map(path: str):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def lines(self, offset: int, limit: int) -> bytes:
+        """The NDJSON lines for products [offset, offset + limit)."""
+        n = len(self)
+        start, end = min(offset, n), min(offset + limit, n)
+        return self._body[self.offsets[start]:self.offsets[end]]
+
+    def with_summary(self, summary: dict) -> "MappedSnapshot":
+        """This snapshot's mappings under a different summary."""
+        view = copy.copy(self)
+        view.summary = summary
+        return view
+
+    def iter_chunks(self, lines_per_chunk: int = STREAM_LINES) -> Iterator[bytes]:
+        for start in range(0, len(self), lines_per_chunk):
+            yield self.lines(start, lines_per_chunk)
+
+
+class _Open:
+    __slots__ = ("snapshot", "etag", "checked_at")
+
+    def __init__(self, snapshot: MappedSnapshot, etag: str | None, checked_at: float):
+        self.snapshot = snapshot
+        self.etag = etag
+        self.checked_at = checked_at
+
+
+class NdjsonSnapshotStore:
+    def __init__(self, directory: str | None = None, clock=time.monotonic,
+                 revalidate_seconds: float = REVALIDATE_SECONDS):
+        self.directory = directory
+        self._clock = clock
+        self._revalidate = revalidate_seconds
+        # Guards the dicts below; never held across R2 or disk I/O.
+        self._lock = threading.Lock()
+        self._open: dict[str, _Open] = {}
+        self._missing: dict[str, float] = {}
+        # One per file_key: serialises that retailer's cold opens,
+        # revalidations and publishes, so concurrent reads download once
+        # while other retailers' reads go ahead.
+        self._key_locks: dict[str, threading.Lock] = {}
+        if directory:
+            self.attach_disk(directory)
+
+    def attach_disk(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def _paths(self, file_key: str) -> tuple[str, str, str]:
+        stem = os.path.join(self.directory, hashlib.sha1(file_key.encode("utf-8")).hexdigest())
+        return stem + ".ndjson", stem + ".ndjson.idx", stem + ".meta"
+
+    # ------------------------------------------------------------------
+    # Publish
+    # ------------------------------------------------------------------
+
+    def publish(self, s3_client, bucket: str, file_key: str, data: dict, digest: str | None = None):
+        """Write the snapshot pair to R2, then to the local mirror. `digest`
+        is the content hash of data's products, when the caller has it."""
+        body, offsets = encode_snapshot(data)
+        index = offsets.tobytes()
+        ndjson_key, index_key = snapshot_keys(file_key)
+        # Index first: a reader that sees the new body and the old index is
+        # caught by MappedSnapshot's length check and simply re-downloads.
+        s3_client.put_object(Bucket=bucket, Key=index_key, Body=index)
+        metadata = envelope_metadata(data)
+        if digest:
+            metadata["content-hash"] = digest
+        response = s3_client.put_object(Bucket=bucket, Key=ndjson_key, Body=body, Metadata=metadata)
+        logger.info(f"NDJSON snapshot saved to R2: {ndjson_key} ({len(offsets) - 1} products)")
+        if self.directory:
+            summary = {"synced_at": data.get("synced_at"), "crawl_status": data.get("crawl_status"),
+                       "count": len(offsets) - 1, "hash": digest}
+            with self._key_lock(file_key):
+                self._install(file_key, body, index, response.get("ETag"), summary)
+        with self._lock:
+            self._missing.pop(file_key, None)
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def get(self, s3_client, bucket: str, file_key: str) -> MappedSnapshot | None:
+        """The mapped snapshot for `file_key`, or None when there's no local
+        directory or no snapshot has been published yet."""
+        if not self.directory:
+            return None
+        snapshot = self._current(file_key)
+        if snapshot is not None:
+            return snapshot
+        with self._key_lock(file_key):
+            # another reader may have opened or revalidated it meanwhile
+            snapshot = self._current(file_key)
+            if snapshot is not None:
+                return snapshot
+            with self._lock:
+                entry = self._open.get(file_key)
+                missing_since = self._missing.get(file_key)
+            if entry is not None:
+                return self._revalidate_open(s3_client, bucket, file_key, entry)
+            if missing_since is not None and self._clock() - missing_since < NEGATIVE_TTL_SECONDS:
+                return None
+            snapshot = self._open_cold(s3_client, bucket, file_key)
+            if snapshot is None:
+                with self._lock:
+                    self._missing[file_key] = self._clock()
+            return snapshot
+
+    def _current(self, file_key: str) -> MappedSnapshot | None:
+        """The open mapping, while it is within its revalidation window."""
+        with self._lock:
+            entry = self._open.get(file_key)
+        if entry is not None and self._clock() - entry.checked_at < self._revalidate:
+            return entry.snapshot
+        return None
+
+    def _key_lock(self, file_key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(file_key, threading.Lock())
+
+    def _revalidate_open(self, s3_client, bucket: str, file_key: str, entry: _Open) -> MappedSnapshot | None:
+        try:
+            head = s3_client.head_object(Bucket=bucket, Key=snapshot_keys(file_key)[0])
+        except (ClientError, BotoCoreError) as e:
+            if isinstance(e, ClientError) and is_missing(e):
+                with self._lock:
+                    self._open.pop(file_key, None)
+                    self._missing[file_key] = self._clock()
+                return None
+            logger.warning(f"Revalidating NDJSON snapshot of {file_key} failed ({e}); serving the open mapping")
+            entry.checked_at = self._clock()
+            return entry.snapshot
+        if head.get("ETag") == entry.etag:
+            entry.checked_at = self._clock()
+            return entry.snapshot
+        logger.info(f"NDJSON snapshot of {file_key} changed in R2; downloading it")
+        with self._lock:
+            self._open.pop(file_key, None)
+        return self._download(s3_client, bucket, file_key)
+
+    def _open_cold(self, s3_client, bucket: str, file_key: str) -> MappedSnapshot | None:
+        meta = self._read_meta(file_key)
+        if meta is not None:
+            try:
+                head = s3_client.head_object(Bucket=bucket, Key=snapshot_keys(file_key)[0])
+            except ClientError as e:
+                if not is_missing(e):
+                    raise
+                return None
+            if head.get("ETag") == meta["etag"]:
+                snapshot = self._map(file_key, meta["summary"], meta["etag"])
+                if snapshot is not None:
+                    return snapshot
+        return self._download(s3_client, bucket, file_key)
+
+    def _download(self, s3_client, bucket: str, file_key: str) -> MappedSnapshot | None:
+        ndjson_key, index_key = snapshot_keys(file_key)
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=ndjson_key)
+            index = s3_client.get_object(Bucket=bucket, Key=index_key)["Body"].read()
+        except ClientError as e:
+            if is_missing(e):
+                return None
+            raise
+        metadata = response.get("Metadata") or {}
+        body = response["Body"].read()
+        summary = {
+            "synced_at": metadata.get("synced-at") or None,
+            "crawl_status": metadata.get("crawl-status"),
+            "count": len(index) // OFFSET_SIZE - 1,
+            "hash": metadata.get("content-hash"),
+        }
+        return self._install(file_key, body, index, response.get("ETag"), summary)
+
+    # ------------------------------------------------------------------
+    # Local mirror
+    # ------------------------------------------------------------------
+
+    def _install(self, file_key: str, body: bytes, index: bytes, etag: str | None,
+                 summary: dict) -> MappedSnapshot | None:
+        ndjson_path, index_path, meta_path = self._paths(file_key)
+        # The meta file goes last and marks the pair complete.
+        self._replace(ndjson_path, body)
+        self._replace(index_path, index)
+        self._replace(meta_path, json.dumps({"etag": etag, "summary": summary}).encode("utf-8"))
+        return self._map(file_key, summary, etag)
+
+    def _map(self, file_key: str, summary: dict, etag: str | None) -> MappedSnapshot | None:
+        ndjson_path, index_path, _ = self._paths(file_key)
+        try:
+            snapshot = MappedSnapshot(ndjson_path, index_path, summary)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable NDJSON snapshot for {file_key}: {e}")
+            return None
+        # Earlier mappings stay valid for readers still using them and are
+        # unmapped when the last reference goes.
+        with self._lock:
+            self._open[file_key] = _Open(snapshot, etag, self._clock())
+        return snapshot
+
+    def _read_meta(self, file_key: str) -> dict | None:
+        try:
+            with open(self._paths(file_key)[2], "rb") as f:
+                meta = json.load(f)
+            return meta if meta.get("etag") and isinstance(meta.get("summary"), dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _replace(self, path: str, content: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._open.clear()
+            self._missing.clear()
+
+
+ndjson_snapshots = NdjsonSnapshotStore()
@@ -0,0 +1,45 @@
+"""
+Newline-delimited JSON streaming of retailer products.
+
+The frozen endpoints send one JSON document, so the whole body exists in
+memory before the first byte goes out and a client can't render anything
+until the last byte arrives. The NDJSON routes instead encode products one
+at a time from a generator — one product per line, flushed in small batches —
+so the response never holds more than a batch and the first products reach
+the client while the rest are still being encoded.
+
+Envelope metadata (synced_at, count) travels in response headers rather than
+as a line of its own, so every line is a product in the frozen shape.
+"""
+
+from collections.abc import Iterable, Iterator
+
+import msgspec
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Products per chunk handed to the server: small enough that the first chunk
+# goes out almost immediately, large enough not to pay a send per product.
+STREAM_BATCH = 64
+
+
+def iter_ndjson(products: Iterable[dict], batch: int = STREAM_BATCH) -> Iterator[bytes]:
+    encoder = msgspec.json.Encoder()
+    buffer = bytearray()
+    pending = 0
+    for product in products:
+        encoder.encode_into(product, buffer, -1)
+        buffer.extend(b"\n")
+        pending += 1
+        if pending == batch:
+            yield bytes(buffer)
+            buffer.clear()
+            pending = 0
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_headers(data: dict) -> dict[str, str]:
+    return {
+        "X-Synced-At": str(data.get("synced_at") or ""),
+        "X-Product-Count": str(data.get("count", len(data.get("data") or []))),
+    }
@@ -0,0 +1,174 @@
+"""
+Columnar product table for server-side filtering, sorting and pagination.
+
+Clients used to download every retailer's full feed just to filter it down
+(e.g. half-price items under $10). ProductTable flattens all retailers'
+products into NumPy columns once per data version — price, was-price,
+saving, fraction off, retailer and discount_type codes — so a query is a
+handful of vectorised mask operations instead of a Python loop over dicts.
+
+Each sortable column's argsort (both directions) is computed once at build
+time; a query then only has to keep the presorted indices that pass its
+mask, which is linear in the table size.
+
+A product with no price (or no was-price) holds NaN in that column rather
+than 0.0, so it fails every price filter and sorts after all priced products
+in either direction instead of ranking as the cheapest. Building a table
+takes a few hundred milliseconds at catalogue scale, so ProductTableCache.fetch
+builds it on the storage pool, off the event loop.
+
+Pagination uses opaque cursors bound to the table version, so a page fetched
+after a re-crawl can't silently mix two data versions.
+"""
+
+import base64
+import hashlib
+import json
+
+import numpy as np
+
+from services.special_crawler.discounts import discount_fraction
+from services.storage_io import run_storage_io_coalesced
+
+SORT_KEYS = ("price", "saving", "fraction")
+# Code 0 is "no discount_type" (null in the feed).
+DISCOUNT_TYPES = ("half_price", "beyond_half", "discount")
+
+
+def _column(products: list[dict], field: str) -> np.ndarray:
+    """`field` of every product as floats, NaN where it is missing."""
+    return np.fromiter(
+        (np.nan if p.get(field) is None else p[field] for p in products), dtype=np.float64, count=len(products),
+    )
+
+
+class CursorError(ValueError):
+    """The cursor is malformed or belongs to an older data version."""
+
+
+class ProductTable:
+    def __init__(self, envelopes: dict[str, dict | None]):
+        self.sources = dict(envelopes)
+        self.retailers = tuple(envelopes)
+        self.products: list[dict] = []
+        retailer_codes: list[int] = []
+        for code, data in enumerate(envelopes.values()):
+            items = (data or {}).get("data") or []
+            self.products.extend(items)
+            retailer_codes.extend([code] * len(items))
+
+        n = len(self.products)
+        self.retailer = np.array(retailer_codes, dtype=np.int8)
+        self.price = _column(self.products, "price")
+        self.price_was = _column(self.products, "price_was")
+        # NaN when either price is missing
+        self.saving = np.clip(self.price_was - self.price, 0.0, None)
+        self.fraction = np.fromiter(
+            (discount_fraction(p.get("price") or 0.0, p.get("price_was") or 0.0) or 0.0 for p in self.products),
+            dtype=np.float64, count=n,
+        )
+        type_codes = {name: i + 1 for i, name in enumerate(DISCOUNT_TYPES)}
+        self.discount_type = np.fromiter(
+            (type_codes.get(p.get("discount_type"), 0) for p in self.products), dtype=np.int8, count=n,
+        )
+        # Stable sorts both ways, so ties keep feed order whichever the
+        # direction. argsort puts NaN last, and negating keeps it last.
+        self._orders = {}
+        for key in SORT_KEYS:
+            column = getattr(self, key)
+            self._orders[key, False] = np.argsort(column, kind="stable")
+            self._orders[key, True] = np.argsort(-column, kind="stable")
+        stamp = "|".join(f"{name}:{(data or {}).get('synced_at')}:{len((data or {}).get('data') or [])}"
+                         for name, data in envelopes.items())
+        self.version = hashlib.sha256(stamp.encode("utf-8")).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def is_current(self, envelopes: dict[str, dict | None]) -> bool:
+        return tuple(envelopes) == self.retailers and all(
+            envelopes[name] is self.sources[name] for name in self.retailers
+        )
+
+    def query(
+        self,
+        retailers: list[str] | None = None,
+        discount_types: list[str] | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        min_fraction: float | None = None,
+        max_fraction: float | None = None,
+        sort: str = "price",
+        descending: bool = False,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> tuple[np.ndarray, int]:
+        """(row indices for the requested page, total matching rows)."""
+        mask = np.ones(len(self.products), dtype=bool)
+        if retailers is not None:
+            codes = [self.retailers.index(name) for name in retailers]
+            mask &= np.isin(self.retailer, codes)
+        if discount_types is not None:
+            codes = [DISCOUNT_TYPES.index(name) + 1 for name in discount_types]
+            mask &= np.isin(self.discount_type, codes)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if min_fraction is not None:
+            mask &= self.fraction >= min_fraction
+        if max_fraction is not None:
+            mask &= self.fraction <= max_fraction
+
+        order = self._orders[sort, descending]
+        matching = order[mask[order]]
+        return matching[offset:offset + limit], len(matching)
+
+    def rows(self, indices: np.ndarray) -> list[dict]:
+        return [self.products[i] for i in indices.tolist()]
+
+    # ------------------------------------------------------------------
+    # Cursors
+    # ------------------------------------------------------------------
+
+    def encode_cursor(self, offset: int) -> str:
+        raw = json.dumps({"v": self.version, "o": offset}, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> int:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            version, offset = payload["v"], int(payload["o"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise CursorError("Malformed cursor") from e
+        if version != self.version:
+            raise CursorError("Cursor is from an older data version — restart from the first page")
+        if offset < 0:
+            raise CursorError("Malformed cursor")
+        return offset
+
+
+class ProductTableCache:
+    """The ProductTable for the current envelopes, rebuilt only when one changes."""
+
+    def __init__(self):
+        self._table: ProductTable | None = None
+
+    def get(self, envelopes: dict[str, dict | None]) -> ProductTable:
+        table = self._table
+        if table is None or not table.is_current(envelopes):
+            table = ProductTable(envelopes)
+            self._table = table
+        return table
+
+    async def fetch(self, envelopes: dict[str, dict | None]) -> ProductTable:
+        """get(), with any rebuild run on the storage pool so it doesn't
+        block the event loop. Concurrent rebuilds share one build."""
+        table = self._table
+        if table is not None and table.is_current(envelopes):
+            return table
+        return await run_storage_io_coalesced("product-table", self.get, envelopes)
+
+
+product_tables = ProductTableCache()
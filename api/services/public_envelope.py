@@ -0,0 +1,326 @@
+"""
+Pre-encoded public views of stored envelopes for the frozen data endpoints.
+
+The stored envelope carries internal crawl metadata that must never reach
+callers, and the data only changes once a week. Rather than stripping those
+fields and having FastAPI run jsonable_encoder + json.dumps over every product
+on every request, the public envelope is encoded once per data version with
+msgspec and the bytes are reused until the underlying envelope changes.
+
+"Data version" is the envelope object itself: the envelope cache hands out
+the same dict until the stored object changes, so an identity check is all
+it takes to know whether the bytes are still current.
+
+Each version also carries a strong ETag (a hash of the encoded bytes, so it
+changes whenever synced_at or any product does); a poll that presents it in
+If-None-Match gets a bodyless 304.
+
+msgspec's compact output matches FastAPI's JSONResponse rendering
+(ensure_ascii=False, separators=(",", ":")) byte for byte for every value the
+crawlers produce.
+
+Native consumers can ask for MessagePack instead (Accept: application/msgpack,
+see wants_msgpack). The MessagePack body of a version is encoded the first
+time it is asked for and then cached alongside the JSON one, with its own
+ETag; JSON stays the default for everything else.
+
+Building an encoding records "strip" (public_view / projection) and
+"encode" phases in the request's Server-Timing (services/timing.py), so a
+slow first request after a publish shows where its time went.
+
+Clients that send Accept-Encoding: gzip (every browser) get the JSON body
+gzip-compressed. Like MessagePack, it is compressed once per version on first
+use, with its own ETag, so nothing is compressed per request. The stored
+envelope can't be passed through as it is: it carries the internal fields
+and is formatted differently from the frozen body.
+
+Field projections (/<retailer>-data/fields?fields=...) are encoded the same
+way — once per data version and field list — and kept in a small LRU, since
+each distinct field list is its own set of bytes.
+"""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+
+import msgspec
+
+from services.timing import phase
+
+# Internal metadata fields added by the V2.5-generation crawlers that must be
+# stripped before returning to callers — the frozen API shape must not change.
+INTERNAL_FIELDS = frozenset({"crawl_status", "pages_attempted", "pages_succeeded", "pages_blocked", "crawler_version"})
+
+
+# The frozen Product fields (design/api-spec.md), selectable in projections.
+PRODUCT_FIELDS = (
+    "name", "price", "price_was", "discount", "discount_type",
+    "price_per_unit", "product_link", "image", "retailer",
+)
+PROJECTION_CACHE_SIZE = 32
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+GZIP_LEVEL = 6
+_MSGPACK_ALIASES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def public_view(data: dict) -> dict:
+    return {k: v for k, v in data.items() if k not in INTERNAL_FIELDS}
+
+
+def projected_view(data: dict, fields: tuple[str, ...]) -> dict:
+    """The public envelope with each product cut down to `fields` (in that
+    order; a field a product doesn't carry is left out)."""
+    view = public_view(data)
+    view["data"] = [
+        {field: product[field] for field in fields if field in product}
+        for product in data.get("data") or []
+    ]
+    return view
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def wants_msgpack(accept: str | None) -> bool:
+    """True when the Accept header names MessagePack and ranks it above JSON.
+    Wildcards never select it, so browsers and plain fetch() keep getting JSON."""
+    if not accept:
+        return False
+    msgpack_q = json_q = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if media_type in _MSGPACK_ALIASES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == JSON_MEDIA_TYPE:
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q > json_q
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """True when Accept-Encoding allows gzip with a non-zero q, by name or
+    (when gzip isn't named) through `*`."""
+    if not accept_encoding:
+        return False
+    gzip_q = wildcard_q = None
+    for coding in accept_encoding.split(","):
+        name, *params = (part.strip() for part in coding.split(";"))
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        name = name.lower()
+        if name in ("gzip", "x-gzip"):
+            gzip_q = max(gzip_q or 0.0, q)
+        elif name == "*":
+            wildcard_q = q
+    q = gzip_q if gzip_q is not None else wildcard_q
+    return q is not None and q > 0
+
+
+def _gzip(body: bytes) -> tuple[bytes, str]:
+    with phase("encode"):
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        return compressed, _etag(compressed)
+
+
+def _msgpack_map_header(size: int) -> bytes:
+    if size < 16:
+        return bytes([0x80 | size])
+    return b"\xde" + size.to_bytes(2, "big")
+
+
+class EncodedEnvelope:
+    """The public JSON encoding of one envelope version (and, on demand, its
+    MessagePack encoding), optionally projected to a subset of product fields."""
+
+    __slots__ = ("source", "fields", "body", "etag", "_msgpack", "_gzip")
+
+    def __init__(self, source: dict, fields: tuple[str, ...] | None = None):
+        self.source = source
+        self.fields = fields
+        view = self._view()
+        with phase("encode"):
+            self.body = msgspec.json.encode(view)
+            self.etag = _etag(self.body)
+        self._msgpack: tuple[bytes, str] | None = None
+        self._gzip: tuple[bytes, str] | None = None
+
+    def gzip(self) -> tuple[bytes, str]:
+        """(gzip-compressed JSON body, ETag), compressed on first use."""
+        if self._gzip is None:
+            self._gzip = _gzip(self.body)
+        return self._gzip
+
+    def _view(self) -> dict:
+        with phase("strip"):
+            return public_view(self.source) if self.fields is None else projected_view(self.source, self.fields)
+
+    def msgpack(self) -> tuple[bytes, str]:
+        """(MessagePack body, ETag), encoded on first use."""
+        if self._msgpack is None:
+            view = self._view()
+            with phase("encode"):
+                body = msgspec.msgpack.encode(view)
+                self._msgpack = (body, _etag(body))
+        return self._msgpack
+
+
+class PublicBody:
+    """A public envelope as stored by services/public_object.py: the JSON
+    body and its ETags were produced at publish time. It is served like an
+    EncodedEnvelope without ever being decoded. The gzip form is what R2
+    holds, and the plain and MessagePack forms are derived on first use."""
+
+    __slots__ = ("summary", "etag", "_body", "_gzip", "_msgpack")
+
+    def __init__(self, summary: dict, stored: bytes, etag: str | None = None, gzip_etag: str | None = None):
+        self.summary = summary
+        self._msgpack: tuple[bytes, str] | None = None
+        if stored[:2] == b"\x1f\x8b":
+            self._body: bytes | None = None
+            self._gzip: tuple[bytes, str] | None = (stored, gzip_etag or _etag(stored))
+        else:
+            # already decompressed somewhere along the way
+            self._body, self._gzip = stored, None
+        self.etag = etag or _etag(self.body)
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            with phase("decode"):
+                self._body = gzip.decompress(self._gzip[0])
+        return self._body
+
+    def gzip(self) -> tuple[bytes, str]:
+        if self._gzip is None:
+            self._gzip = _gzip(self.body)
+        return self._gzip
+
+    def msgpack(self) -> tuple[bytes, str]:
+        if self._msgpack is None:
+            view = msgspec.json.decode(self.body)
+            with phase("encode"):
+                body = msgspec.msgpack.encode(view)
+                self._msgpack = (body, _etag(body))
+        return self._msgpack
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match uses the weak comparison (RFC 9110 13.1.2): a W/ prefix
+    on either side is ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class CombinedEncoding:
+    """Several retailers' public envelopes in one body:
+    {"retailers": {"<name>": <public envelope> | null, ...}}.
+
+    Built by splicing the per-retailer encoded bodies, so nothing is
+    re-encoded — the combined view costs one bytes join per data version.
+    The MessagePack form is spliced the same way from the retailers'
+    MessagePack bodies."""
+
+    __slots__ = ("parts", "body", "etag", "_msgpack", "_gzip")
+
+    def __init__(self, parts: tuple[tuple[str, EncodedEnvelope | None], ...]):
+        self.parts = parts
+        chunks = []
+        for name, encoded in parts:
+            chunks.append(msgspec.json.encode(name) + b":" + (encoded.body if encoded is not None else b"null"))
+        self.body = b'{"retailers":{' + b",".join(chunks) + b"}}"
+        self.etag = _etag(self.body)
+        self._msgpack: tuple[bytes, str] | None = None
+        self._gzip: tuple[bytes, str] | None = None
+
+    def gzip(self) -> tuple[bytes, str]:
+        if self._gzip is None:
+            self._gzip = _gzip(self.body)
+        return self._gzip
+
+    def msgpack(self) -> tuple[bytes, str]:
+        if self._msgpack is None:
+            chunks = [b"\x81" + msgspec.msgpack.encode("retailers"), _msgpack_map_header(len(self.parts))]
+            for name, encoded in self.parts:
+                chunks.append(msgspec.msgpack.encode(name))
+                chunks.append(encoded.msgpack()[0] if encoded is not None else msgspec.msgpack.encode(None))
+            body = b"".join(chunks)
+            self._msgpack = (body, _etag(body))
+        return self._msgpack
+
+    def is_current(self, parts: tuple[tuple[str, EncodedEnvelope | None], ...]) -> bool:
+        return len(parts) == len(self.parts) and all(
+            name == own_name and encoded is own_encoded
+            for (name, encoded), (own_name, own_encoded) in zip(parts, self.parts)
+        )
+
+
+class PublicEnvelopeCache:
+    """Latest EncodedEnvelope per endpoint, rebuilt only when the envelope changes."""
+
+    def __init__(self, projection_cache_size: int = PROJECTION_CACHE_SIZE):
+        self._encoded: dict[str, EncodedEnvelope] = {}
+        self._combined: dict[tuple[str, ...], CombinedEncoding] = {}
+        self._projections: OrderedDict[tuple[str, tuple[str, ...]], EncodedEnvelope] = OrderedDict()
+        self._projection_cache_size = projection_cache_size
+
+    def get(self, name: str, data: dict) -> EncodedEnvelope:
+        encoded = self._encoded.get(name)
+        if encoded is None or encoded.source is not data:
+            encoded = EncodedEnvelope(data)
+            self._encoded[name] = encoded
+        return encoded
+
+    def combined(self, envelopes: dict[str, dict | None]) -> CombinedEncoding:
+        """CombinedEncoding of the named envelopes (None for a retailer with
+        no data), reusing each retailer's cached encoding."""
+        parts = tuple(
+            (name, self.get(name, data) if data else None) for name, data in envelopes.items()
+        )
+        selector = tuple(name for name, _ in parts)
+        combined = self._combined.get(selector)
+        if combined is None or not combined.is_current(parts):
+            combined = CombinedEncoding(parts)
+            self._combined[selector] = combined
+        return combined
+
+    def projected(self, name: str, data: dict, fields: tuple[str, ...]) -> EncodedEnvelope:
+        """The envelope projected to `fields`, from a bounded LRU of recent
+        (endpoint, field list) encodings."""
+        key = (name, fields)
+        encoded = self._projections.get(key)
+        if encoded is None or encoded.source is not data:
+            encoded = EncodedEnvelope(data, fields)
+            self._projections[key] = encoded
+            if len(self._projections) > self._projection_cache_size:
+                self._projections.popitem(last=False)
+        self._projections.move_to_end(key)
+        return encoded
+
+    def clear(self):
+        self._encoded.clear()
+        self._combined.clear()
+        self._projections.clear()
+
+
+public_envelopes = PublicEnvelopeCache()
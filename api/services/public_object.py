@@ -0,0 +1,111 @@
+"""
+Publish-time public projections of envelopes, served without decoding.
+
+The stored envelope is the crawl's diagnostic record: it includes
+crawl_status, pages_attempted, crawler_version and so on. Serving it means
+downloading and parsing the whole document, dropping those fields and
+re-encoding, which costs time per product. So each publish also writes the
+frozen public body next to the envelope, already gzip-compressed, with its
+ETags and the freshness fields as object metadata:
+
+    priceline_specials.json          the internal envelope (diagnostics, /health, diffs)
+    priceline_specials.public.json   the public body /priceline-data returns, gzip
+
+The data endpoints serve that object's bytes as they are. A client that
+accepts gzip (every browser) gets the stored bytes unchanged. Other clients
+get a decompressed copy made once per version. Staleness and Cache-Control
+come from the metadata, so the read path never decodes JSON, and a request
+costs the same whatever the product count. The ETags are the ones
+EncodedEnvelope would compute, so a client's conditional request keeps
+matching whichever path served it.
+
+PublicObjectCache keeps the latest body per key in an EnvelopeCache whose
+decoder wraps the stored bytes in a PublicBody instead of parsing them, so
+it behaves exactly as envelope reads do: a publish invalidates the key
+locally, other machines pick it up within REVALIDATE_SECONDS, a missing
+object is cached negatively, and an R2 error keeps serving the last copy.
+Until a retailer's first projection is published, callers fall back to the
+parsed envelope.
+
+If the projection can't be written, publish() deletes the old one, so reads
+fall back to the new envelope rather than serving outdated data.
+"""
+
+import logging
+
+from services.envelope_cache import EnvelopeCache, envelope_metadata
+from services.public_envelope import EncodedEnvelope, PublicBody, JSON_MEDIA_TYPE
+
+logger = logging.getLogger(__name__)
+
+
+def public_key(file_key: str) -> str:
+    """The public projection stored next to the envelope at `file_key`."""
+    return file_key.removesuffix(".json") + ".public.json"
+
+
+def _summary(metadata: dict) -> dict:
+    count = metadata.get("count")
+    return {
+        "synced_at": metadata.get("synced-at") or None,
+        "crawl_status": metadata.get("crawl-status"),
+        "count": int(count) if count and count.isdigit() else None,
+    }
+
+
+def decode_public_body(stored: bytes, response: dict) -> PublicBody:
+    """The EnvelopeCache decoder for public projections: the stored bytes
+    as they are, with the summary and ETags from the object's metadata."""
+    metadata = response.get("Metadata") or {}
+    return PublicBody(_summary(metadata), stored, metadata.get("json-etag"), metadata.get("gzip-etag"))
+
+
+class PublicObjectCache:
+    def __init__(self, cache: EnvelopeCache | None = None):
+        self._cache = cache if cache is not None else EnvelopeCache(decode=decode_public_body)
+
+    # ------------------------------------------------------------------
+    # Publish
+    # ------------------------------------------------------------------
+
+    def publish(self, s3_client, bucket: str, file_key: str, data: dict):
+        """Write the public projection of `data` next to its envelope."""
+        key = public_key(file_key)
+        encoded = EncodedEnvelope(data)
+        body, gzip_etag = encoded.gzip()
+        try:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=body,
+                ContentEncoding="gzip",
+                ContentType=JSON_MEDIA_TYPE,
+                Metadata={**envelope_metadata(data), "json-etag": encoded.etag, "gzip-etag": gzip_etag},
+            )
+            logger.info(f"Public projection saved to R2: {key}")
+        except Exception:
+            try:
+                s3_client.delete_object(Bucket=bucket, Key=key)
+            except Exception as e:
+                logger.error(f"Could not remove outdated public projection {key}: {e}")
+            raise
+        finally:
+            self.invalidate(file_key)
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def get(self, s3_client, bucket: str, file_key: str) -> PublicBody | None:
+        """The stored public body for `file_key`'s envelope, or None when no
+        projection has been published."""
+        return self._cache.load(s3_client, bucket, public_key(file_key))
+
+    def invalidate(self, file_key: str):
+        self._cache.invalidate(public_key(file_key))
+
+    def clear(self):
+        self._cache.clear()
+
+
+public_objects = PublicObjectCache()
@@ -0,0 +1,80 @@
+"""
+Server-Sent Events for background refresh completion.
+
+While a retailer's data is stale the frontend used to poll every data
+endpoint every 90 seconds until the background crawl landed (ADR-007). With
+GET /events it can instead hold one idle SSE connection and refetch exactly
+once, when RefreshManager publishes a "refresh" event carrying the retailer
+and its new synced_at.
+
+Each connection is one asyncio.Queue and one suspended generator on the event
+loop — no thread, no polling — so hundreds of idle subscribers cost next to
+nothing. A comment line goes out every HEARTBEAT_SECONDS so proxies don't
+reap the idle connection, and a stream ends after MAX_STREAM_SECONDS: an open
+connection keeps the Fly machine from auto-stopping, so clients should only
+subscribe while they are waiting for a refresh (EventSource reconnects on
+its own if they are still waiting).
+"""
+
+import asyncio
+import itertools
+import logging
+from collections.abc import AsyncIterator
+
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 20
+MAX_STREAM_SECONDS = 15 * 60
+RECONNECT_MILLISECONDS = 5000
+# Events buffered per subscriber; a client that falls this far behind loses
+# the oldest ones (it only needs the latest per retailer anyway).
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+def format_event(event_id: int, event: str, data: dict) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode("ascii"), msgspec.json.encode(data))
+
+
+class RefreshEvents:
+    def __init__(self):
+        self._subscribers: set[asyncio.Queue] = set()
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, retailer: str, synced_at: str | None):
+        """Tell every subscriber that `retailer` has new data. Must be called
+        on the event loop."""
+        message = format_event(next(self._ids), "refresh", {"retailer": retailer, "synced_at": synced_at})
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+        if self._subscribers:
+            logger.info(f"Notified {len(self._subscribers)} event subscriber(s) of new {retailer} data")
+
+    async def stream(
+        self,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+        max_seconds: float = MAX_STREAM_SECONDS,
+    ) -> AsyncIterator[bytes]:
+        """One subscriber's event stream, unsubscribed when the client goes away."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_seconds
+        try:
+            yield b"retry: %d\n\n" % RECONNECT_MILLISECONDS
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=min(heartbeat_seconds, remaining))
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self._subscribers.discard(queue)
+
+
+refresh_events = RefreshEvents()
@@ -17,13 +17,37 @@ Guard rails:
     each crawl have the machine to itself.
   - cooldown between attempts so a blocked/failing crawler isn't hammered
     on every fetch
+
+Callers that know several retailers are stale at once (the startup prefetch)
+can trigger with queue=True: a refresh refused only because another
+retailer's crawl holds the global slot is queued, and queued refreshes start
+one after another as each crawl finishes instead of waiting for the next
+poll to re-trigger them.
+
+A refresh that lands new data is announced on services.refresh_events, so
+clients subscribed to GET /events can refetch once instead of polling.
+
+Starts, refusals (by reason) and finished crawls (outcome, duration, pages,
+products) are counted in services.metrics for /metrics.
 """
 
 import asyncio
+import contextvars
 import logging
 import time
 from collections.abc import Awaitable, Callable
 
+from services.metrics import (
+    CRAWL_DURATION,
+    CRAWL_PAGES,
+    CRAWL_PRODUCTS,
+    CRAWL_RUNS,
+    REFRESH_REJECTED,
+    REFRESH_TRIGGERS,
+)
+from services.refresh_events import refresh_events
+from services.timing import phase
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_COOLDOWN_SECONDS = 30 * 60
@@ -33,6 +57,8 @@ class RefreshManager:
     # The manager whose crawl is currently running, app-wide. Only one crawl
     # runs at a time across all retailers (see module docstring).
     _global_active: "RefreshManager | None" = None
+    # Managers waiting for the global slot, in trigger order (queue=True only).
+    _queued: "list[RefreshManager]" = []
 
     def __init__(
         self,
@@ -64,49 +90,108 @@ class RefreshManager:
             "refresh_in_progress": self.is_running,
             "last_attempt_age_seconds": round(time.monotonic() - self._last_attempt) if self._last_attempt else None,
             "cooldown_seconds": self._cooldown,
+            "refresh_queued": self in RefreshManager._queued,
         }
 
-    def trigger_if_needed(self, stale: bool) -> bool:
+    def cooldown_remaining(self) -> float:
+        """Seconds until a stale trigger may start another refresh (0 when not cooling down)."""
+        if not self._last_attempt:
+            return 0.0
+        return max(0.0, self._cooldown - (time.monotonic() - self._last_attempt))
+
+    def trigger_if_needed(self, stale: bool, queue: bool = False) -> bool:
         """Start a background refresh when data is stale. Returns True if a
-        refresh was started by this call."""
+        refresh was started by this call. With queue=True, a refresh blocked
+        only by another retailer's crawl is queued to start after it."""
+        with phase("refresh"):
+            return self._trigger(stale, queue)
+
+    def _trigger(self, stale: bool, queue: bool) -> bool:
         if not stale:
             return False
         if self.is_running:
             logger.info(f"[{self.name}] refresh already in progress — not triggering another")
+            REFRESH_REJECTED.inc(retailer=self.name, reason="running")
             return False
         active = self._global_crawl_running()
         if active is not None:
-            logger.info(f"[{self.name}] another crawl ([{active.name}]) is running — not starting a concurrent one")
+            if queue and self not in RefreshManager._queued and not self._cooling_down():
+                RefreshManager._queued.append(self)
+                logger.info(f"[{self.name}] another crawl ([{active.name}]) is running — queued behind it")
+            else:
+                logger.info(f"[{self.name}] another crawl ([{active.name}]) is running — not starting a concurrent one")
+            REFRESH_REJECTED.inc(retailer=self.name, reason="global_slot")
             return False
-        if self._last_attempt and (time.monotonic() - self._last_attempt) < self._cooldown:
+        if self._cooling_down():
             logger.info(f"[{self.name}] refresh attempted recently — cooling down")
+            REFRESH_REJECTED.inc(retailer=self.name, reason="cooldown")
             return False
 
         self._last_attempt = time.monotonic()
+        if self in RefreshManager._queued:
+            RefreshManager._queued.remove(self)
         # Claim the global slot synchronously (no await before this) so two
         # triggers in the same tick can't both start.
         RefreshManager._global_active = self
-        self._task = asyncio.create_task(self._run(), name=f"refresh-{self.name}")
+        # A fresh context: the crawl outlives the request that triggered it and
+        # must not record into that request's timings.
+        self._task = asyncio.create_task(self._run(), name=f"refresh-{self.name}", context=contextvars.Context())
+        REFRESH_TRIGGERS.inc(retailer=self.name)
         logger.info(f"[{self.name}] stale data detected — background refresh started")
         return True
 
     async def _run(self):
+        cancelled = False
+        started = time.monotonic()
         try:
             result = await self._sync_fn()
             if result:
                 logger.info(f"[{self.name}] background refresh completed successfully")
+                refresh_events.publish(self.name, result.get("synced_at") if isinstance(result, dict) else None)
             else:
                 logger.warning(f"[{self.name}] background refresh finished without new data (crawl failed/blocked)")
+            self._record_crawl("success" if result else "no_data", started, result)
         except asyncio.CancelledError:
+            cancelled = True
             logger.warning(f"[{self.name}] background refresh cancelled (likely machine shutdown)")
             raise
         except Exception:
             logger.exception(f"[{self.name}] background refresh raised")
+            self._record_crawl("error", started, None)
         finally:
             if RefreshManager._global_active is self:
                 RefreshManager._global_active = None
+                if cancelled:
+                    # shutting down — don't launch the next browser crawl
+                    RefreshManager._queued.clear()
+                else:
+                    RefreshManager._start_next_queued()
+
+    def _record_crawl(self, outcome: str, started: float, result):
+        CRAWL_RUNS.inc(retailer=self.name, outcome=outcome)
+        CRAWL_DURATION.observe(time.monotonic() - started, retailer=self.name)
+        if not isinstance(result, dict):
+            return
+        for result_name in ("attempted", "succeeded", "blocked"):
+            pages = result.get(f"pages_{result_name}")
+            if isinstance(pages, int):
+                CRAWL_PAGES.inc(pages, retailer=self.name, result=result_name)
+        if isinstance(result.get("count"), int):
+            CRAWL_PRODUCTS.inc(result["count"], retailer=self.name)
+
+    def _cooling_down(self) -> bool:
+        return bool(self._last_attempt) and (time.monotonic() - self._last_attempt) < self._cooldown
+
+    @classmethod
+    def _start_next_queued(cls):
+        """Hand the freed global slot to the first queued manager that can run."""
+        while cls._queued:
+            if cls._queued.pop(0).trigger_if_needed(stale=True):
+                return
 
     async def shutdown(self):
+        if self in RefreshManager._queued:
+            RefreshManager._queued.remove(self)
         if self.is_running:
             self._task.cancel()
             try:
@@ -6,25 +6,55 @@ Instantiated once here so both main.py (request path) and scheduler.py
 a fetch-triggered refresh and a cron-triggered refresh can never run
 concurrently for the same retailer.
 
-All Coles sync paths route to the V2.5 crawler; it mirrors its output to the
-legacy R2 key, so /coles-data and /coles-data-v2 stay fresh from one crawl.
+All Coles sync paths route to the V2.5 crawler, and /coles-data and
+/coles-data-v2 serve its stored object too, so the legacy V1/V2 crawlers are
+no longer instantiated. One crawl, one stored object and one cached copy
+serve all three Coles endpoints. The crawler keeps the legacy R2 key as a
+server-side copy.
+
+The shared envelope cache's local-disk tier is attached here as well, from
+LOCAL_SNAPSHOT_DIR, along with the local mirror of the NDJSON page snapshots
+(in its ndjson/ subdirectory), and the public CDN copies are pointed at
+R2_PUBLIC_BUCKET_NAME when one is configured.
+
+Every crawler's R2 client is instrumented for /metrics here, so R2 latency
+and errors are measured no matter which code path makes the call.
 """
 
-from services.special_crawler.coles_crawler import ColesCrawler
-from services.special_crawler.coles_crawler_v2 import ColesV2Crawler
+import os
+
 from services.special_crawler.coles_crawler_v2_5 import ColesV25Crawler
 from services.special_crawler.woolies_crawler import WooliesCrawler
 from services.special_crawler.chemist_warehouse_crawler import ChemistWarehouseCrawler
 from services.special_crawler.priceline_crawler import PricelineCrawler
 from services.refresh_manager import RefreshManager
+from services.envelope_cache import envelope_cache
+from services.snapshot_store import LocalSnapshotStore
+from services.ndjson_snapshot import ndjson_snapshots
+from services.cdn_publish import cdn_publisher
+from services.metrics import instrument_s3_client
+from core.settings import get_settings
+
+_settings = get_settings()
+if _settings.LOCAL_SNAPSHOT_DIR:
+    envelope_cache.attach_disk(LocalSnapshotStore(_settings.LOCAL_SNAPSHOT_DIR, _settings.LOCAL_SNAPSHOT_MAX_BYTES))
+    ndjson_snapshots.attach_disk(os.path.join(_settings.LOCAL_SNAPSHOT_DIR, "ndjson"))
+if _settings.R2_PUBLIC_BUCKET_NAME:
+    cdn_publisher.configure(_settings.R2_PUBLIC_BUCKET_NAME, _settings.R2_PUBLIC_PREFIX)
 
-coles_crawler_service = ColesCrawler()
-coles_v2_crawler_service = ColesV2Crawler()
 coles_v2_5_crawler_service = ColesV25Crawler()
 woolies_crawler_service = WooliesCrawler()
 chemist_warehouse_crawler_service = ChemistWarehouseCrawler()
 priceline_crawler_service = PricelineCrawler()
 
+for _crawler in (
+    coles_v2_5_crawler_service,
+    woolies_crawler_service,
+    chemist_warehouse_crawler_service,
+    priceline_crawler_service,
+):
+    instrument_s3_client(_crawler.s3_client)
+
 coles_refresh = RefreshManager("coles", coles_v2_5_crawler_service.force_sync)
 woolies_refresh = RefreshManager("woolies", woolies_crawler_service.force_sync)
 chemist_warehouse_refresh = RefreshManager("chemist_warehouse", chemist_warehouse_crawler_service.force_sync)
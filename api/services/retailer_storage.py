@@ -0,0 +1,273 @@
+"""
+R2 storage shared by the V2.5-generation crawlers.
+
+Coles V2.5, Woolies, Chemist Warehouse and Priceline store their feeds the
+same way, so publishing and reading live here once rather than in each
+crawler. A crawler mixes in RetailerStorage and provides:
+
+    retailer         its name, as in main._RETAILERS and /health
+    s3_client        the boto3 R2 client
+    bucket_name      the private bucket
+    file_key         the envelope's fixed key
+    legacy_file_key  optional key kept for direct readers in the frozen
+                     plain-JSON shape {synced_at, count, data} (Coles)
+
+The publish is save_to_file(). Everything derived from an envelope (the
+snapshot and its manifest entry, the public projection, the NDJSON snapshot,
+the diff and the CDN copy) is written from there. The load_* methods are the
+blocking reads, and each has an async fetch_* twin that runs it on the
+storage pool (services/storage_io.py).
+
+rollback_snapshot() flips the manifest back to an earlier snapshot, then
+rewrites every copy that serves the feed outside the manifest from it: the
+fixed key, the legacy key, the public projection, the NDJSON snapshot and
+the CDN copy with its beacon. Otherwise the frontend, which reads the CDN
+copy, would keep the data being rolled back. It is an ops action
+(services/rollback_snapshot.py), not an HTTP route.
+"""
+
+import json
+import logging
+
+from services.cdn_publish import cdn_publisher
+from services.envelope_cache import (
+    ENVELOPE_CONTENT_ENCODING, compress_envelope, envelope_cache, envelope_metadata,
+)
+from services.envelope_diff import diff_key, publish_diff
+from services.ndjson_snapshot import MappedSnapshot, ndjson_snapshots, snapshot_keys
+from services.public_envelope import PublicBody
+from services.public_object import public_key, public_objects
+from services.snapshot_manifest import content_hash, snapshot_key, snapshot_manifest
+from services.storage_io import run_storage_io, run_storage_io_coalesced
+
+logger = logging.getLogger(__name__)
+
+
+class RetailerStorage:
+    retailer: str
+    s3_client = None
+    bucket_name: str
+    file_key: str
+    legacy_file_key: str | None = None
+
+    # ------------------------------------------------------------------
+    # Publish
+    # ------------------------------------------------------------------
+
+    def save_to_file(self, data: dict):
+        digest = content_hash(data)
+        if snapshot_manifest.unchanged(self.s3_client, self.bucket_name, self.retailer, digest):
+            # The current snapshot already holds these products: no envelope,
+            # NDJSON or diff to upload, only the crawl to record. The public
+            # body carries synced_at, so it is the one derived copy rewritten.
+            logger.info(f"[{self.retailer}] products unchanged (snapshot {digest}); recording the crawl in the manifest")
+            snapshot_manifest.record_crawl(self.s3_client, self.bucket_name, self.retailer, data)
+            self._publish_public(data)
+            self._publish_legacy(data)
+        else:
+            self.save_snapshot(data, digest)
+
+        self._publish_cdn(data)
+
+    def save_snapshot(self, data: dict, digest: str):
+        """Write `data` as snapshot `digest` with everything derived from it,
+        then point the manifest at it."""
+        # The envelope being replaced, for the ?since= diff.
+        previous = self.load_from_file()
+        snapshot = snapshot_key(self.file_key, digest)
+        logger.info(f"[{self.retailer}] saving data to Cloudflare R2")
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=snapshot,
+                Body=compress_envelope(data),
+                ContentEncoding=ENVELOPE_CONTENT_ENCODING,
+                ContentType="application/json",
+                Metadata=envelope_metadata(data),
+            )
+            # the fixed key keeps the latest publish for direct R2 readers
+            # and for reads before the manifest has an entry
+            self.s3_client.copy_object(
+                Bucket=self.bucket_name,
+                Key=self.file_key,
+                CopySource={"Bucket": self.bucket_name, "Key": snapshot},
+            )
+            logger.info(f"[{self.retailer}] data saved to R2: {snapshot} (copied to {self.file_key})")
+            envelope_cache.invalidate(self.file_key)
+            envelope_cache.invalidate(snapshot)
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error saving to R2: {e}")
+            raise
+
+        self._publish_legacy(data)
+        self._publish_public(data)
+        self._publish_ndjson(data, digest)
+
+        try:
+            publish_diff(self.s3_client, self.bucket_name, self.file_key, previous, data)
+            envelope_cache.invalidate(diff_key(self.file_key))
+        except Exception as e:
+            # Non-fatal: ?since= readers fall back to the full feed.
+            logger.error(f"[{self.retailer}] error saving diff to R2: {e}")
+
+        try:
+            snapshot_manifest.point(self.s3_client, self.bucket_name, self.retailer, digest, snapshot, data)
+        except Exception as e:
+            # Readers keep resolving the previous snapshot.
+            logger.error(f"[{self.retailer}] error updating the snapshot manifest: {e}")
+            raise
+
+    def rollback_snapshot(self, digest: str | None = None) -> dict:
+        """Point the manifest back at an earlier snapshot (by default the
+        previous one) and restore every copy of the feed from it. Raises
+        LookupError when it isn't in the history."""
+        entry = snapshot_manifest.rollback(self.s3_client, self.bucket_name, self.retailer, digest)
+        data = snapshot_manifest.resolve(self.s3_client, self.bucket_name, self.retailer, self.file_key)
+        if data is None:
+            logger.error(f"[{self.retailer}] snapshot {entry['snapshot']} is missing; copies not restored")
+            return entry
+        self._copy_key(entry["snapshot"], self.file_key)
+        self._publish_legacy(data)
+        self._publish_public(data)
+        self._publish_ndjson(data, entry["hash"])
+        self._publish_cdn(data)
+        return entry
+
+    # Each derived copy is non-fatal: readers fall back to the envelope.
+
+    def _copy_key(self, source: str, key: str):
+        # Server-side copy: no second serialisation or upload.
+        try:
+            self.s3_client.copy_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                CopySource={"Bucket": self.bucket_name, "Key": source},
+            )
+            envelope_cache.invalidate(key)
+            logger.info(f"[{self.retailer}] copy saved to R2: {key}")
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error saving copy {key} to R2: {e}")
+
+    def _publish_legacy(self, data: dict):
+        # Direct readers of the legacy key expect plain JSON in the frozen
+        # shape, so this is written on its own rather than copied from the
+        # (gzip, full) snapshot.
+        if self.legacy_file_key is None:
+            return
+        try:
+            legacy = {
+                "synced_at": data["synced_at"],
+                "count": data.get("count", len(data.get("data") or [])),
+                "data": data["data"],
+            }
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.legacy_file_key,
+                Body=json.dumps(legacy),
+            )
+            envelope_cache.invalidate(self.legacy_file_key)
+            logger.info(f"[{self.retailer}] legacy copy saved to R2: {self.legacy_file_key}")
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error saving legacy copy to R2: {e}")
+
+    def _publish_public(self, data: dict):
+        try:
+            public_objects.publish(self.s3_client, self.bucket_name, self.file_key, data)
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error saving public projection to R2: {e}")
+
+    def _publish_ndjson(self, data: dict, digest: str):
+        try:
+            ndjson_snapshots.publish(self.s3_client, self.bucket_name, self.file_key, data, digest)
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error saving NDJSON snapshot to R2: {e}")
+
+    def _publish_cdn(self, data: dict):
+        try:
+            cdn_publisher.publish(self.s3_client, self.retailer, data)
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error publishing public copy to R2: {e}")
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def load_from_file(self) -> dict | None:
+        logger.info(f"[{self.retailer}] loading data from Cloudflare R2")
+        try:
+            data = snapshot_manifest.resolve(self.s3_client, self.bucket_name, self.retailer, self.file_key)
+            if data is None:
+                logger.warning(f"[{self.retailer}] file not found in R2")
+                return None
+            logger.info(f"[{self.retailer}] loaded {len(data.get('data', []))} products from R2")
+            return data
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error loading from R2: {e}")
+            return None
+
+    def load_summary(self) -> dict | None:
+        """synced_at / crawl_status / count without downloading the envelope:
+        from the manifest, or the envelope's metadata before its first entry."""
+        try:
+            return (snapshot_manifest.summary(self.s3_client, self.bucket_name, self.retailer)
+                    or envelope_cache.summary(self.s3_client, self.bucket_name, self.file_key))
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error reading R2 metadata: {e}")
+            return None
+
+    def load_public(self) -> PublicBody | None:
+        """The stored public projection, served without decoding, if one exists."""
+        try:
+            public = public_objects.get(self.s3_client, self.bucket_name, self.file_key)
+            if public is None or snapshot_manifest.derived_summary(
+                self.s3_client, self.bucket_name, self.retailer, public.summary
+            ) is None:
+                return None
+            return public
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error loading public projection from R2: {e}")
+            return None
+
+    def load_diff(self) -> dict | None:
+        """The delta from the previous sync to this one, if one was published."""
+        try:
+            return envelope_cache.load(self.s3_client, self.bucket_name, diff_key(self.file_key))
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error loading diff from R2: {e}")
+            return None
+
+    def load_snapshot(self) -> MappedSnapshot | None:
+        """The mmap-backed NDJSON snapshot for paginated reads, if one exists."""
+        try:
+            snapshot = ndjson_snapshots.get(self.s3_client, self.bucket_name, self.file_key)
+            if snapshot is None:
+                return None
+            summary = snapshot_manifest.derived_summary(self.s3_client, self.bucket_name, self.retailer, snapshot.summary)
+            if summary is None:
+                return None
+            return snapshot if summary is snapshot.summary else snapshot.with_summary(summary)
+        except Exception as e:
+            logger.error(f"[{self.retailer}] error opening NDJSON snapshot: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Async interface
+    # ------------------------------------------------------------------
+
+    async def fetch_data(self) -> dict | None:
+        return await run_storage_io_coalesced(self.file_key, self.load_from_file)
+
+    async def fetch_summary(self) -> dict | None:
+        return await run_storage_io(self.load_summary)
+
+    async def fetch_snapshot(self) -> MappedSnapshot | None:
+        return await run_storage_io_coalesced(snapshot_keys(self.file_key)[0], self.load_snapshot)
+
+    async def fetch_diff(self) -> dict | None:
+        return await run_storage_io(self.load_diff)
+
+    async def fetch_public(self) -> PublicBody | None:
+        return await run_storage_io_coalesced(public_key(self.file_key), self.load_public)
+
+    async def rollback(self, digest: str | None = None) -> dict:
+        return await run_storage_io(self.rollback_snapshot, digest)
@@ -0,0 +1,64 @@
+"""
+Roll a retailer's feed back to an earlier snapshot (ops only).
+
+Points the manifest at a snapshot from the retailer's history and restores
+every served copy from it (see RetailerStorage.rollback_snapshot). There is
+deliberately no HTTP route for this.
+
+Run:
+    cd api
+    python -m services.rollback_snapshot <retailer>            # show current + history
+    python -m services.rollback_snapshot <retailer> --previous # back one snapshot
+    python -m services.rollback_snapshot <retailer> <hash>     # to a given snapshot
+"""
+
+import logging
+import sys
+
+from services.registry import (
+    coles_v2_5_crawler_service,
+    woolies_crawler_service,
+    chemist_warehouse_crawler_service,
+    priceline_crawler_service,
+)
+from services.snapshot_manifest import snapshot_manifest
+
+CRAWLERS = {
+    crawler.retailer: crawler
+    for crawler in (
+        coles_v2_5_crawler_service,
+        woolies_crawler_service,
+        chemist_warehouse_crawler_service,
+        priceline_crawler_service,
+    )
+}
+
+
+def main(argv: list[str]) -> int:
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)-8s %(name)s — %(message)s', datefmt='%H:%M:%S')
+    if not argv or argv[0] not in CRAWLERS:
+        print(f"usage: python -m services.rollback_snapshot <{'|'.join(CRAWLERS)}> [--previous | <hash>]")
+        return 2
+    crawler = CRAWLERS[argv[0]]
+    if len(argv) == 1:
+        entry = snapshot_manifest.entry(crawler.s3_client, crawler.bucket_name, crawler.retailer)
+        if entry is None:
+            print(f"{crawler.retailer}: no manifest entry")
+            return 1
+        print(f"current  {entry['hash']}  synced {entry['synced_at']}  ({entry['count']} products)")
+        for old in entry.get("history") or []:
+            print(f"history  {old['hash']}  synced {old['synced_at']}  ({old['count']} products)")
+        return 0
+    digest = None if argv[1] == "--previous" else argv[1]
+    try:
+        entry = crawler.rollback_snapshot(digest)
+    except LookupError as e:
+        print(e)
+        return 1
+    print(f"{crawler.retailer} now serves snapshot {entry['hash']} (synced {entry['synced_at']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
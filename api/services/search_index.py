@@ -0,0 +1,146 @@
+"""
+In-memory inverted index over product names for /specials/search.
+
+The index is split into one segment per retailer. A segment is built from
+that retailer's envelope (the ProductExtractor.extract_all output the crawler
+published) and tagged with the envelope object it came from; the envelope
+cache hands out a new object only after save_to_file publishes, so a publish
+rebuilds just that retailer's segment and the others are reused untouched.
+
+Names are tokenised to casefolded Unicode words with accents stripped, so
+"Café" and "cafe" are the same token and non-ASCII letters are kept rather
+than split on. Each query term matches a token exactly or, when at least
+MIN_PREFIX_CHARS long, as a prefix (so "choc" finds "chocolate"). Results
+rank by how well the terms matched — an exact token scores 1, a prefix-only
+match PREFIX_WEIGHT — then by fraction off.
+
+A segment keeps its postings end to end in one NumPy array, in the order of
+its sorted vocabulary. A prefix's tokens are a bisected range of that
+vocabulary, so their rows are one contiguous slice, and scoring a term is a
+single scatter into a small-integer score vector. Picking the page is an
+argpartition, not a Python sort over every hit. Over 40k products
+(benchmarks/bench_specials_search.py) a query takes about 0.3ms at p50 and
+0.4-0.7ms at p99.
+
+Building a segment takes a couple of hundred milliseconds for a large feed,
+so fetch() runs a rebuild on the storage pool rather than on the event loop,
+and the startup prefetch warms the index. A rebuild swaps in a new segment
+map in one assignment, so a search running alongside it sees either the old
+segments or the new ones.
+"""
+
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+from services.special_crawler.discounts import discount_fraction
+from services.storage_io import run_storage_io_coalesced
+
+MIN_PREFIX_CHARS = 2
+PREFIX_WEIGHT = 0.5
+_EXACT = round(1 / PREFIX_WEIGHT)
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return _TOKEN.findall("".join(c for c in folded if not unicodedata.combining(c)))
+
+
+class RetailerSegment:
+    def __init__(self, source: dict | None):
+        self.source = source
+        self.products: list[dict] = (source or {}).get("data") or []
+        self.fractions = np.fromiter(
+            (discount_fraction(p.get("price") or 0.0, p.get("price_was") or 0.0) or 0.0 for p in self.products),
+            dtype=np.float64, count=len(self.products),
+        )
+        postings: dict[str, list[int]] = {}
+        for row, product in enumerate(self.products):
+            for token in set(tokenize(product.get("name") or "")):
+                postings.setdefault(token, []).append(row)
+        self.vocabulary = sorted(postings)
+        # Postings laid end to end in vocabulary order: token i's rows are
+        # rows[offsets[i]:offsets[i + 1]], and so are the rows of every
+        # token in a prefix's vocabulary range [start, end).
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum([len(postings[token]) for token in self.vocabulary], out=self.offsets[1:])
+        self.rows = np.fromiter((row for token in self.vocabulary for row in postings[token]),
+                                dtype=np.int32, count=int(self.offsets[-1]))
+
+    def scores(self, terms: list[str]) -> np.ndarray:
+        """Per-row match score summed over the query terms (0 = no match),
+        in units of PREFIX_WEIGHT so the vectors stay small integers."""
+        total = np.zeros(len(self.products), dtype=np.uint16)
+        term_scores = np.empty(len(self.products), dtype=np.uint16)
+        for term in terms:
+            term_scores.fill(0)
+            start = bisect.bisect_left(self.vocabulary, term)
+            if len(term) >= MIN_PREFIX_CHARS:
+                end = bisect.bisect_left(self.vocabulary, term + "\uffff", start)
+                term_scores[self.rows[self.offsets[start]:self.offsets[end]]] = 1
+            if start < len(self.vocabulary) and self.vocabulary[start] == term:
+                term_scores[self.rows[self.offsets[start]:self.offsets[start + 1]]] = _EXACT
+            total += term_scores
+        return total
+
+
+class SearchIndex:
+    def __init__(self):
+        self._segments: dict[str, RetailerSegment] = {}
+
+    def is_current(self, envelopes: dict[str, dict | None]) -> bool:
+        segments = self._segments
+        return all(name in segments and segments[name].source is data for name, data in envelopes.items())
+
+    def sync(self, envelopes: dict[str, dict | None]):
+        """Rebuild the segment of every retailer whose envelope changed."""
+        segments = dict(self._segments)
+        for name, data in envelopes.items():
+            segment = segments.get(name)
+            if segment is None or segment.source is not data:
+                segments[name] = RetailerSegment(data)
+        self._segments = segments
+
+    async def fetch(self, envelopes: dict[str, dict | None]):
+        """sync(), on the storage pool when a segment needs rebuilding.
+        Concurrent rebuilds share one call."""
+        if not self.is_current(envelopes):
+            await run_storage_io_coalesced("search-index", self.sync, envelopes)
+
+    def search(self, query: str, retailers: list[str] | None = None, limit: int = 20) -> tuple[list[dict], int]:
+        """(best `limit` products, total matching products)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+        current = self._segments
+        segments = [current[name] for name in (retailers if retailers is not None else current)
+                    if name in current]
+        keys, owners, rows = [], [], []
+        for i, segment in enumerate(segments):
+            scores = segment.scores(terms)
+            matched = (scores > 0).nonzero()[0]
+            # Scores are whole units and fractions are < 1, so one float key
+            # orders by score first and fraction off second.
+            keys.append(scores[matched] + segment.fractions[matched])
+            owners.append(np.full(len(matched), i, dtype=np.int32))
+            rows.append(matched)
+        if not keys:
+            return [], 0
+        keys, owners, rows = np.concatenate(keys), np.concatenate(owners), np.concatenate(rows)
+        total = len(keys)
+        if total > limit:
+            top = np.argpartition(-keys, limit - 1)[:limit]
+        else:
+            top = np.arange(total)
+        top = top[np.argsort(-keys[top], kind="stable")]
+        return [segments[owners[i]].products[rows[i]] for i in top.tolist()], total
+
+    def clear(self):
+        self._segments = {}
+
+
+search_index = SearchIndex()
@@ -0,0 +1,290 @@
+"""
+Content-addressed envelope snapshots behind one small manifest object.
+
+Each publish used to overwrite the retailer's envelope key in place. Readers
+could only find out whether it had changed by revalidating the whole object,
+an identical re-crawl re-uploaded every product, and undoing a bad crawl
+meant re-running the previous one. So envelopes are now written once, under
+a name derived from their products, and a single manifest says which one is
+current:
+
+    priceline_specials.3f9a0c1be27d4e55.json   an immutable snapshot
+    priceline_specials.json                    server-side copy of the latest publish
+    manifest.json                              {"updated_at", "retailers": {name: entry}}
+
+    entry = {"hash", "snapshot", "synced_at", "snapshot_synced_at",
+             "crawl_status", "count", "history": [{"hash", "snapshot",
+             "synced_at", "crawl_status", "count"}, ...]}
+
+content_hash() covers the products only. synced_at changes with every crawl,
+so hashing the whole envelope would never find two crawls alike. If a crawl's
+products hash the same as the current snapshot, nothing is uploaded.
+record_crawl() just moves the entry's synced_at and crawl_status forward.
+Readers then see the snapshot with those two fields replaced (resolve()),
+and the patched copy is memoised while the manifest and the snapshot stay
+the same. `snapshot_synced_at` keeps the synced_at stored inside the
+snapshot. The other envelope fields (pages_attempted, crawler_version, ...)
+stay as the snapshot's crawl recorded them.
+
+The manifest is a few hundred bytes. Reads go through the shared
+EnvelopeCache, so a steady-state check is a dict lookup plus a conditional
+GET every REVALIDATE_SECONDS. Snapshot keys never change content, so they
+are loaded as immutable and never revalidated: readers only find out about a
+new snapshot through the manifest. Once the manifest stops pointing at a
+snapshot, its parsed envelope is dropped from the cache, both when this
+process moves the entry (_update) and when resolve() sees another machine
+did. Snapshots that remain in the history are re-read only on a rollback.
+summary() answers /health and staleness from the manifest alone.
+
+Objects derived from an envelope are checked with derived_summary(). The
+NDJSON snapshot holds only products, so it records the content hash it was
+built from: while that matches the entry it stays valid, and it is served
+with the entry's synced_at and crawl_status. The public projection has
+synced_at baked into its bytes, so an unchanged re-crawl republishes it, and
+it is used while its synced_at matches. Anything else falls back to the
+resolved envelope.
+
+Writing the manifest is the publish's commit point. A single PUT replaces it
+atomically, and until then readers keep resolving the previous snapshot.
+rollback() points an entry back at one of its last HISTORY_LENGTH snapshots;
+RetailerStorage.rollback_snapshot then restores the copies served outside
+the manifest from it. Snapshots that drop out of the history are deleted.
+
+The read-modify-write is a conditional PUT: IfMatch on the ETag it read, or
+IfNoneMatch="*" when there was no manifest yet. A writer on another machine
+that got in between makes R2 answer 412, and the update is re-read and
+re-applied (up to WRITE_ATTEMPTS times), so no entry is lost to a concurrent
+publish. Within a process the writes are also serialised by a lock, which
+saves the retries.
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+
+import msgspec
+from botocore.exceptions import ClientError
+
+from services.envelope_cache import envelope_cache, is_missing, is_precondition_failed
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_KEY = "/home/crawlers/manifest.json"
+HISTORY_LENGTH = 4
+WRITE_ATTEMPTS = 5
+
+_HISTORY_FIELDS = ("hash", "snapshot", "synced_at", "crawl_status", "count")
+
+
+def content_hash(data: dict) -> str:
+    """Digest of the envelope's products. Crawls that found the same
+    products hash alike whatever their synced_at."""
+    return hashlib.sha256(msgspec.json.encode(data.get("data") or [])).hexdigest()[:16]
+
+
+def snapshot_key(file_key: str, digest: str) -> str:
+    """The immutable snapshot of `file_key`'s envelope with products `digest`."""
+    return file_key.removesuffix(".json") + f".{digest}.json"
+
+
+class SnapshotManifest:
+    def __init__(self, key: str = MANIFEST_KEY, cache=envelope_cache, history_length: int = HISTORY_LENGTH):
+        self.key = key
+        self._cache = cache
+        self._history_length = history_length
+        self._write_lock = threading.Lock()
+        # retailer -> (entry, snapshot data, data with the entry's crawl fields)
+        self._overlays: dict[str, tuple[dict, dict, dict]] = {}
+        # retailer -> the snapshot key resolve() last served
+        self._serving: dict[str, str] = {}
+        self._overlay_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def load(self, s3_client, bucket: str) -> dict:
+        """The manifest, or an empty one before the first publish. Shared
+        between requests like any cached envelope; callers must not mutate it."""
+        return self._cache.load(s3_client, bucket, self.key) or {"retailers": {}}
+
+    def entry(self, s3_client, bucket: str, retailer: str) -> dict | None:
+        return self.load(s3_client, bucket).get("retailers", {}).get(retailer)
+
+    def summary(self, s3_client, bucket: str, retailer: str) -> dict | None:
+        """synced_at / crawl_status / count from the manifest, or None when
+        the retailer has no entry yet."""
+        entry = self.entry(s3_client, bucket, retailer)
+        if entry is None:
+            return None
+        return {
+            "synced_at": entry.get("synced_at"),
+            "crawl_status": entry.get("crawl_status"),
+            "count": entry.get("count"),
+            "snapshot_synced_at": entry.get("snapshot_synced_at"),
+            "hash": entry.get("hash"),
+        }
+
+    def derived_summary(self, s3_client, bucket: str, retailer: str, summary: dict) -> dict | None:
+        """The summary to serve an object derived from an envelope with, or
+        None when it no longer matches what the manifest serves. `summary`
+        is the object's own; one carrying a "hash" matches on the products
+        and takes the entry's crawl fields."""
+        entry = self.entry(s3_client, bucket, retailer)
+        if entry is None:
+            return summary
+        if summary.get("hash"):
+            if summary["hash"] != entry.get("hash"):
+                return None
+            if summary.get("synced_at") == entry.get("synced_at") and summary.get("crawl_status") == entry.get("crawl_status"):
+                return summary
+            return {**summary, "synced_at": entry.get("synced_at"), "crawl_status": entry.get("crawl_status")}
+        return summary if summary.get("synced_at") == entry.get("synced_at") else None
+
+    def resolve(self, s3_client, bucket: str, retailer: str, file_key: str) -> dict | None:
+        """The envelope the manifest points at, carrying the latest crawl's
+        synced_at and crawl_status. Before the retailer's first manifest
+        entry this is just the envelope at `file_key`."""
+        entry = self.entry(s3_client, bucket, retailer)
+        if entry is None:
+            return self._cache.load(s3_client, bucket, file_key)
+        self._retire_superseded(retailer, entry["snapshot"])
+        data = self._cache.load(s3_client, bucket, entry["snapshot"], immutable=True)
+        if data is None:
+            logger.warning(f"Snapshot {entry['snapshot']} is missing; reading {file_key}")
+            return self._cache.load(s3_client, bucket, file_key)
+        return self._overlay(retailer, entry, data)
+
+    def _overlay(self, retailer: str, entry: dict, data: dict) -> dict:
+        if data.get("synced_at") == entry.get("synced_at") and data.get("crawl_status") == entry.get("crawl_status"):
+            return data
+        with self._overlay_lock:
+            cached = self._overlays.get(retailer)
+            if cached is not None and cached[0] is entry and cached[1] is data:
+                return cached[2]
+            # a new dict only when the manifest or snapshot changes, so
+            # identity-keyed encodings downstream stay cached
+            patched = {**data, "synced_at": entry.get("synced_at"), "crawl_status": entry.get("crawl_status")}
+            self._overlays[retailer] = (entry, data, patched)
+            return patched
+
+    def _retire_superseded(self, retailer: str, snapshot: str, superseded: tuple[str, ...] = ()):
+        # Snapshot entries are never revalidated, so one the manifest has
+        # moved off would otherwise stay resident for good.
+        with self._overlay_lock:
+            previous = self._serving.get(retailer)
+            self._serving[retailer] = snapshot
+            retired = [key for key in dict.fromkeys((previous, *superseded)) if key and key != snapshot]
+            if retired:
+                self._overlays.pop(retailer, None)
+        for key in retired:
+            self._cache.invalidate(key)
+
+    # ------------------------------------------------------------------
+    # Write
+    # ------------------------------------------------------------------
+
+    def unchanged(self, s3_client, bucket: str, retailer: str, digest: str) -> bool:
+        """Whether the current snapshot already holds products `digest`."""
+        entry = self.entry(s3_client, bucket, retailer)
+        return entry is not None and entry.get("hash") == digest
+
+    def point(self, s3_client, bucket: str, retailer: str, digest: str, snapshot: str, data: dict) -> dict:
+        """Make `snapshot` (just written from `data`) the retailer's current
+        envelope. The previous one moves into the history."""
+        entry = {
+            "hash": digest,
+            "snapshot": snapshot,
+            "synced_at": data.get("synced_at"),
+            "snapshot_synced_at": data.get("synced_at"),
+            "crawl_status": data.get("crawl_status"),
+            "count": len(data.get("data") or []),
+        }
+        return self._update(s3_client, bucket, retailer, lambda current: self._replace(current, entry))
+
+    def record_crawl(self, s3_client, bucket: str, retailer: str, data: dict) -> dict:
+        """Record a crawl whose products match the current snapshot, without
+        writing any envelope."""
+        def touch(current):
+            if current is None:
+                raise LookupError(f"No manifest entry for {retailer}")
+            return {**current, "synced_at": data.get("synced_at"), "crawl_status": data.get("crawl_status")}
+        return self._update(s3_client, bucket, retailer, touch)
+
+    def rollback(self, s3_client, bucket: str, retailer: str, digest: str | None = None) -> dict:
+        """Point the retailer back at snapshot `digest` from its history (by
+        default the one before the current). Raises LookupError when there
+        is no such snapshot."""
+        def flip(current):
+            history = (current or {}).get("history") or []
+            target = next((h for h in history if digest is None or h["hash"] == digest), None)
+            if target is None:
+                raise LookupError(f"No snapshot {digest or '(previous)'} in {retailer}'s history")
+            entry = {**target, "snapshot_synced_at": target.get("synced_at")}
+            return self._replace(current, entry)
+        entry = self._update(s3_client, bucket, retailer, flip)
+        logger.info(f"Rolled {retailer} back to snapshot {entry['hash']} ({entry['synced_at']})")
+        return entry
+
+    def _replace(self, current: dict | None, entry: dict) -> dict:
+        history = list((current or {}).get("history") or [])
+        if current is not None:
+            # the history records each snapshot as it was published
+            history.insert(0, {
+                **{field: current.get(field) for field in _HISTORY_FIELDS},
+                "synced_at": current.get("snapshot_synced_at", current.get("synced_at")),
+            })
+        history = [h for h in history if h["hash"] != entry["hash"]]
+        return {**entry, "history": history}
+
+    def _update(self, s3_client, bucket: str, retailer: str, change) -> dict:
+        with self._write_lock:
+            for attempt in range(1, WRITE_ATTEMPTS + 1):
+                manifest, etag = self._read(s3_client, bucket)
+                retailers = dict(manifest.get("retailers") or {})
+                current = retailers.get(retailer)
+                entry = change(current)
+                evicted = entry["history"][self._history_length:]
+                entry["history"] = entry["history"][:self._history_length]
+                retailers[retailer] = entry
+                manifest = {"updated_at": datetime.now(timezone.utc).isoformat(), "retailers": retailers}
+                condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+                try:
+                    s3_client.put_object(
+                        Bucket=bucket,
+                        Key=self.key,
+                        Body=msgspec.json.encode(manifest),
+                        ContentType="application/json",
+                        **condition,
+                    )
+                    break
+                except ClientError as e:
+                    if not is_precondition_failed(e) or attempt == WRITE_ATTEMPTS:
+                        raise
+                    logger.info(f"Manifest changed while updating {retailer}; retrying ({attempt}/{WRITE_ATTEMPTS})")
+            self._cache.invalidate(self.key)
+        logger.info(f"Manifest now points {retailer} at snapshot {entry['hash']}")
+        self._retire_superseded(retailer, entry["snapshot"], (current["snapshot"],) if current else ())
+        for old in evicted:
+            self._cache.invalidate(old["snapshot"])
+            try:
+                s3_client.delete_object(Bucket=bucket, Key=old["snapshot"])
+            except Exception as e:
+                logger.warning(f"Could not delete old snapshot {old['snapshot']}: {e}")
+        return entry
+
+    def _read(self, s3_client, bucket: str) -> tuple[dict, str | None]:
+        """(manifest, ETag) straight from R2 rather than the cache: a write
+        must start from the latest manifest, not one up to REVALIDATE_SECONDS
+        old. The ETag is None when there is no manifest yet."""
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=self.key)
+            return msgspec.json.decode(response["Body"].read()), response.get("ETag")
+        except ClientError as e:
+            if not is_missing(e):
+                raise
+            return {"retailers": {}}, None
+
+
+snapshot_manifest = SnapshotManifest()
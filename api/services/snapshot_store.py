@@ -0,0 +1,106 @@
+"""
+Local-disk tier under the in-memory envelope cache.
+
+R2 is the only durable store, so a freshly started process (and every
+request during an R2 brownout) pays a network round trip for data that
+changes weekly. LocalSnapshotStore keeps the last body seen for each R2 key
+in a local directory — point LOCAL_SNAPSHOT_DIR at a Fly volume to survive
+machine restarts — together with its R2 ETag, so EnvelopeCache can serve it
+immediately and revalidate against R2 in the background.
+
+File layout: one file per key, `<sha1(key)>.snap`, holding the ETag on the
+first line followed by the raw JSON body. Writes go to a temp file in the
+same directory and are os.replace()d into place, so a reader never sees a
+half-written snapshot. Reads mmap the file and decode the body straight from
+the mapping, without copying it into a Python bytes object first. The
+directory is bounded by max_bytes; least recently used snapshots are evicted
+first.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SNAPSHOT_SUFFIX = ".snap"
+
+
+class LocalSnapshotStore:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + SNAPSHOT_SUFFIX)
+
+    def read(self, key: str) -> tuple[dict, str] | None:
+        """(parsed envelope, etag) for `key`, or None when there's no usable
+        snapshot. A corrupt snapshot is discarded rather than raised."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                newline = mm.find(b"\n")
+                if newline <= 0:
+                    raise ValueError("missing etag header")
+                etag = mm[:newline].decode("ascii")
+                with memoryview(mm) as view, view[newline + 1:] as body:
+                    data = msgspec.json.decode(body)
+            os.utime(path)  # recency for LRU eviction
+            return data, etag
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, msgspec.DecodeError) as e:
+            logger.warning(f"Discarding unreadable local snapshot for {key}: {e}")
+            self.remove(key)
+            return None
+
+    def write(self, key: str, body: bytes, etag: str):
+        path = self.path_for(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(etag.encode("ascii") + b"\n")
+                f.write(body)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self._evict(keep=path)
+
+    def remove(self, key: str):
+        try:
+            os.unlink(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep: str):
+        snapshots = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SNAPSHOT_SUFFIX):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshots.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in snapshots)
+        for _, size, path in sorted(snapshots):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+                total -= size
+                logger.info(f"Evicted local snapshot {os.path.basename(path)} ({size} bytes)")
+            except FileNotFoundError:
+                pass
@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 from scrapling.fetchers import AsyncStealthySession
 from urllib.parse import urljoin
 from core.settings import get_settings
+from services.retailer_storage import RetailerStorage
+from services.storage_io import run_storage_io
 from services.special_crawler.discounts import classify_discount
 
 COLES_BASE_URL = "https://www.coles.com.au"
@@ -225,7 +227,9 @@ class ProductExtractor:
 # Production crawler
 # ---------------------------------------------------------------------------
 
-class ColesV25Crawler:
+class ColesV25Crawler(RetailerStorage):
+    retailer = "coles"
+
     def __init__(self):
         logger.info("Initializing ColesV25Crawler (scrapling 0.4 / persistent session)")
         self.max_pages = 50
@@ -418,58 +422,6 @@ class ColesV25Crawler:
             "data": all_products,
         }
 
-    # ------------------------------------------------------------------
-    # Storage
-    # ------------------------------------------------------------------
-
-    def save_to_file(self, data: dict):
-        logger.info("Saving data to Cloudflare R2")
-        try:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=self.file_key,
-                Body=json.dumps(data)
-            )
-            logger.info(f"Data saved to R2: {self.file_key}")
-        except Exception as e:
-            logger.error(f"Error saving to R2: {e}")
-            raise
-
-        # Mirror to the legacy key in the frozen envelope (synced_at/count/data
-        # only) so /coles-data and /coles-data-v2 also serve this crawl.
-        try:
-            legacy = {
-                "synced_at": data["synced_at"],
-                "count": data["count"],
-                "data": data["data"],
-            }
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=self.legacy_file_key,
-                Body=json.dumps(legacy)
-            )
-            logger.info(f"Legacy copy saved to R2: {self.legacy_file_key}")
-        except Exception as e:
-            # Non-fatal: the primary V2.5 file already saved.
-            logger.error(f"Error saving legacy copy to R2: {e}")
-
-    def load_from_file(self) -> dict | None:
-        logger.info("Loading data from Cloudflare R2")
-        try:
-            response = self.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=self.file_key
-            )
-            data = json.loads(response['Body'].read().decode('utf-8'))
-            logger.info(f"Loaded {len(data.get('data', []))} products from R2")
-            return data
-        except self.s3_client.exceptions.NoSuchKey:
-            logger.warning("File not found in R2")
-            return None
-        except Exception as e:
-            logger.error(f"Error loading from R2: {e}")
-            return None
-
     # ------------------------------------------------------------------
     # Public interface (matches V2 contract)
     # ------------------------------------------------------------------
@@ -481,12 +433,9 @@ class ColesV25Crawler:
             if data.get('crawl_status') == 'failed':
                 logger.error("Crawl status=failed; not saving to R2 to preserve existing data")
                 return None
-            self.save_to_file(data)
+            await run_storage_io(self.save_to_file, data)
             logger.info("force_sync completed successfully")
             return data
         except Exception as e:
             logger.error(f"Error in force_sync: {e}")
             raise
-
-    async def fetch_data(self) -> dict | None:
-        return self.load_from_file()
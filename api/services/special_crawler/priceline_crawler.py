@@ -5,6 +5,8 @@ import asyncio
 from datetime import datetime, timezone
 from scrapling.fetchers import AsyncStealthySession
 from core.settings import get_settings
+from services.retailer_storage import RetailerStorage
+from services.storage_io import run_storage_io
 from services.special_crawler.discounts import classify_discount
 
 PRICELINE_BASE_URL = "https://www.priceline.com.au"
@@ -139,7 +141,9 @@ class ProductExtractor:
 # Production crawler
 # ---------------------------------------------------------------------------
 
-class PricelineCrawler:
+class PricelineCrawler(RetailerStorage):
+    retailer = "priceline"
+
     def __init__(self):
         logger.info("Initializing PricelineCrawler (scrapling 0.4 / in-page OCC API fetch)")
         self.max_pages = MAX_PAGES
@@ -252,33 +256,6 @@ class PricelineCrawler:
             "data": all_products,
         }
 
-    # ------------------------------------------------------------------
-    # Storage
-    # ------------------------------------------------------------------
-
-    def save_to_file(self, data: dict):
-        logger.info("Saving data to Cloudflare R2")
-        try:
-            self.s3_client.put_object(Bucket=self.bucket_name, Key=self.file_key, Body=json.dumps(data))
-            logger.info(f"Data saved to R2: {self.file_key}")
-        except Exception as e:
-            logger.error(f"Error saving to R2: {e}")
-            raise
-
-    def load_from_file(self) -> dict | None:
-        logger.info("Loading data from Cloudflare R2")
-        try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.file_key)
-            data = json.loads(response['Body'].read().decode('utf-8'))
-            logger.info(f"Loaded {len(data.get('data', []))} products from R2")
-            return data
-        except self.s3_client.exceptions.NoSuchKey:
-            logger.warning("File not found in R2")
-            return None
-        except Exception as e:
-            logger.error(f"Error loading from R2: {e}")
-            return None
-
     # ------------------------------------------------------------------
     # Public interface
     # ------------------------------------------------------------------
@@ -290,12 +267,9 @@ class PricelineCrawler:
             if data.get('crawl_status') == 'failed':
                 logger.error("Crawl status=failed; not saving to R2 to preserve existing data")
                 return None
-            self.save_to_file(data)
+            await run_storage_io(self.save_to_file, data)
             logger.info("force_sync completed successfully")
             return data
         except Exception as e:
             logger.error(f"Error in force_sync: {e}")
             raise
-
-    async def fetch_data(self) -> dict | None:
-        return self.load_from_file()
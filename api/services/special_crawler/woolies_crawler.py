@@ -6,6 +6,8 @@ import random
 from datetime import datetime, timezone
 from scrapling.fetchers import AsyncStealthySession
 from core.settings import get_settings
+from services.retailer_storage import RetailerStorage
+from services.storage_io import run_storage_io
 from services.special_crawler.discounts import classify_discount
 
 WOOLIES_BASE_URL = "https://www.woolworths.com.au"
@@ -121,7 +123,9 @@ class ProductExtractor:
 # Production crawler
 # ---------------------------------------------------------------------------
 
-class WooliesCrawler:
+class WooliesCrawler(RetailerStorage):
+    retailer = "woolies"
+
     def __init__(self):
         logger.info("Initializing WooliesCrawler (scrapling 0.4 / stealth XHR capture)")
         self.max_pages = 30
@@ -330,40 +334,6 @@ class WooliesCrawler:
             "data": all_products,
         }
 
-    # ------------------------------------------------------------------
-    # Storage
-    # ------------------------------------------------------------------
-
-    def save_to_file(self, data: dict):
-        logger.info("Saving data to Cloudflare R2")
-        try:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=self.file_key,
-                Body=json.dumps(data)
-            )
-            logger.info(f"Data saved to R2: {self.file_key}")
-        except Exception as e:
-            logger.error(f"Error saving to R2: {e}")
-            raise
-
-    def load_from_file(self) -> dict | None:
-        logger.info("Loading data from Cloudflare R2")
-        try:
-            response = self.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=self.file_key
-            )
-            data = json.loads(response['Body'].read().decode('utf-8'))
-            logger.info(f"Loaded {len(data.get('data', []))} products from R2")
-            return data
-        except self.s3_client.exceptions.NoSuchKey:
-            logger.warning("File not found in R2")
-            return None
-        except Exception as e:
-            logger.error(f"Error loading from R2: {e}")
-            return None
-
     # ------------------------------------------------------------------
     # Public interface (matches the Coles V2.5 contract)
     # ------------------------------------------------------------------
@@ -375,12 +345,9 @@ class WooliesCrawler:
             if data.get('crawl_status') == 'failed':
                 logger.error("Crawl status=failed; not saving to R2 to preserve existing data")
                 return None
-            self.save_to_file(data)
+            await run_storage_io(self.save_to_file, data)
             logger.info("force_sync completed successfully")
             return data
         except Exception as e:
             logger.error(f"Error in force_sync: {e}")
             raise
-
-    async def fetch_data(self) -> dict | None:
-        return self.load_from_file()
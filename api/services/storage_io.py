@@ -0,0 +1,75 @@
+"""
+Off-loop execution for blocking R2 storage calls.
+
+boto3 is synchronous, so calling get_object/put_object (and json.dumps of a
+multi-megabyte envelope) directly from an async handler stalls the event loop
+— every other request, and the in-flight crawl's browser I/O, waits on the
+R2 round trip. Storage work runs on a small dedicated thread pool instead.
+
+Reads are also coalesced per R2 key (run_storage_io_coalesced): when the
+machine wakes, the four data endpoints, /health and the scheduler's retry can
+all ask for the same object at once, and without coalescing each of them
+would download and parse its own copy before the first one had populated the
+envelope cache.
+
+The pool is bounded and separate from the loop's default executor so a slow
+R2 can't starve anything else that uses run_in_executor, and a burst of reads
+can't open an unbounded number of connections.
+
+run_storage_io runs the call in a copy of the caller's context, so request-
+scoped state such as services.timing's phase recorder follows it onto the
+pool thread. run_in_executor doesn't do that on its own.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_STORAGE_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=MAX_STORAGE_WORKERS, thread_name_prefix="r2-io")
+
+
+async def run_storage_io(fn, *args, **kwargs):
+    """Run a blocking storage call on the storage pool and await its result."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, fn, *args, **kwargs))
+
+
+def submit_storage_io(fn, *args, **kwargs):
+    """Fire-and-forget a blocking storage call on the storage pool (callable
+    from any thread, including the pool's own workers)."""
+    _executor.submit(fn, *args, **kwargs)
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight call's result."""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = self._inflight.get(key)
+        # A future left behind by a loop that has since closed (test clients,
+        # restarts) can never complete — start afresh rather than wait on it.
+        if future is None or future.get_loop() is not loop:
+            future = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        # shield: one waiter being cancelled must not cancel the shared call
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+
+_reads = SingleFlight()
+
+
+async def run_storage_io_coalesced(key: str, fn, *args, **kwargs):
+    """run_storage_io, with concurrent calls for the same key sharing one call."""
+    return await _reads.do(key, run_storage_io, fn, *args, **kwargs)
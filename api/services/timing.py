@@ -0,0 +1,159 @@
+"""
+Per-request phase timing, reported as a Server-Timing header and summarised
+per route for /health.
+
+When a data request is slow, the question is which step was slow: the R2
+round trip, the JSON parse, the internal-field strip, the encode, or the
+refresh trigger. The request middleware in main.py starts a RequestTiming
+and stores it in a ContextVar. Storage and serving code then records into it
+with `with phase("r2"):` and `mark("cache", "hit")`, without any request
+object being passed down.
+
+run_storage_io copies the caller's context into the storage pool, so phases
+recorded on an r2-io thread are attributed to the request that awaited them.
+A phase reports wall-clock time: its spans are merged where they overlap, so
+/specials reading four retailers at once reports how long it waited on R2,
+not the sum of four concurrent round trips.
+Background work (disk-snapshot revalidation, crawls) runs outside any
+request context and records nothing. Outside a request, phase() and mark()
+are no-ops.
+
+Each finished request's total and phase durations also go into a rolling
+window per route (the last ROLLING_SAMPLES requests), which /health reports
+as p50/p95.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ROLLING_SAMPLES = 512
+
+# Server-Timing metric names, in header order.
+PHASES = ("r2", "decode", "strip", "encode", "refresh")
+
+
+def _covered_ms(spans: list[tuple[float, float]]) -> float:
+    """Wall-clock milliseconds covered by (start, end) spans in seconds."""
+    total, reached = 0.0, float("-inf")
+    for start, end in sorted(spans):
+        if end > reached:
+            total += end - max(start, reached)
+            reached = end
+    return total * 1000
+
+
+class RequestTiming:
+    __slots__ = ("started", "marks", "_spans", "_lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: dict[str, str] = {}
+        self._spans: dict[str, list[tuple[float, float]]] = {}
+        # concurrent storage reads of one request record from several threads
+        self._lock = threading.Lock()
+
+    def add(self, name: str, started: float, ended: float):
+        """Record that phase `name` ran from `started` to `ended`
+        (time.perf_counter() values)."""
+        with self._lock:
+            self._spans.setdefault(name, []).append((started, ended))
+
+    @property
+    def phases(self) -> dict[str, float]:
+        """Each phase's wall-clock duration in milliseconds."""
+        with self._lock:
+            spans = {name: list(recorded) for name, recorded in self._spans.items()}
+        return {name: _covered_ms(recorded) for name, recorded in spans.items()}
+
+    def mark(self, name: str, description: str):
+        with self._lock:
+            existing = self.marks.get(name)
+            self.marks[name] = description if existing in (None, description) else f"{existing},{description}"
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self, total_ms: float) -> str:
+        phases = self.phases
+        metrics = [f"{name};dur={phases[name]:.1f}" for name in PHASES if name in phases]
+        metrics += [f'{name};desc="{description}"' for name, description in self.marks.items()]
+        metrics.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def begin_request() -> RequestTiming:
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+@contextmanager
+def phase(name: str):
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, started, time.perf_counter())
+
+
+def mark(name: str, description: str):
+    timing = _current.get()
+    if timing is not None:
+        timing.mark(name, description)
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class RouteTimings:
+    """Rolling per-route windows of request totals and phase durations."""
+
+    def __init__(self, samples: int = ROLLING_SAMPLES):
+        self._samples = samples
+        self._routes: dict[str, dict[str, deque]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, total_ms: float, timing: RequestTiming):
+        with self._lock:
+            windows = self._routes.setdefault(route, {})
+            for name, ms in (("total", total_ms), *timing.phases.items()):
+                window = windows.get(name)
+                if window is None:
+                    window = windows[name] = deque(maxlen=self._samples)
+                window.append(ms)
+
+    def summary(self) -> dict:
+        with self._lock:
+            snapshot = {route: {name: sorted(window) for name, window in windows.items()}
+                        for route, windows in self._routes.items()}
+        report = {}
+        for route, windows in sorted(snapshot.items()):
+            total = windows.pop("total")
+            report[route] = {
+                "count": len(total),
+                "p50_ms": round(_percentile(total, 50), 1),
+                "p95_ms": round(_percentile(total, 95), 1),
+                "phases": {
+                    name: {"p50_ms": round(_percentile(window, 50), 1), "p95_ms": round(_percentile(window, 95), 1)}
+                    for name, window in windows.items()
+                },
+            }
+        return report
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_timings = RouteTimings()
@@ -0,0 +1,35 @@
+"""
+Helpers shared by the storage-layer tests.
+
+    envelope()  a crawl envelope as save_to_file() receives it
+    clock       a FakeClock the caches take instead of time.monotonic
+    gets(s3)    the get_object calls a FakeS3Client has seen
+"""
+
+import pytest
+
+SYNCED_AT = "2026-10-14T00:00:00+00:00"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def envelope(synced_at: str = SYNCED_AT, products: list[dict] | None = None,
+             crawl_status: str = "success", **fields) -> dict:
+    products = [{"name": "Milk", "price": 2.0}] if products is None else products
+    return {"synced_at": synced_at, "crawl_status": crawl_status, "pages_attempted": 3,
+            "count": len(products), "data": products, **fields}
+
+
+def gets(s3) -> list[tuple[str, str]]:
+    return [c for c in s3.calls if c[0] == "get_object"]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,93 @@
+"""
+In-memory stand-in for the boto3 S3 client used against Cloudflare R2.
+
+Implements just the calls the crawlers and storage layers make, with R2's
+observable behaviour: quoted MD5 ETags, NoSuchKey on missing objects, a
+conditional GET that answers a matching IfNoneMatch with a 304 ClientError,
+and conditional puts (IfMatch / IfNoneMatch="*") that fail with a 412.
+"""
+
+import hashlib
+import io
+
+from botocore.exceptions import ClientError
+
+
+class _NoSuchKey(ClientError):
+    def __init__(self, key: str = ""):
+        super().__init__(
+            {"Error": {"Code": "NoSuchKey", "Message": f"No such key: {key}"},
+             "ResponseMetadata": {"HTTPStatusCode": 404}},
+            "GetObject",
+        )
+
+
+class _Exceptions:
+    NoSuchKey = _NoSuchKey
+
+
+class FakeS3Client:
+    exceptions = _Exceptions
+
+    def __init__(self):
+        self.objects: dict[str, dict] = {}
+        self.calls: list[tuple[str, str]] = []
+
+    def put_object(self, Bucket: str, Key: str, Body, IfMatch: str | None = None,
+                   IfNoneMatch: str | None = None, **kwargs) -> dict:
+        self.calls.append(("put_object", Key))
+        existing = self.objects.get(Key)
+        if ((IfMatch is not None and (existing is None or existing["ETag"] != IfMatch))
+                or (IfNoneMatch == "*" and existing is not None)):
+            raise ClientError(
+                {"Error": {"Code": "PreconditionFailed", "Message": "At least one of the pre-conditions you specified did not hold"},
+                 "ResponseMetadata": {"HTTPStatusCode": 412}},
+                "PutObject",
+            )
+        body = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        self.objects[Key] = {"Body": body, "ETag": etag, **kwargs}
+        return {"ETag": etag}
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: dict, **kwargs) -> dict:
+        self.calls.append(("copy_object", Key))
+        source = self.objects.get(CopySource["Key"])
+        if source is None:
+            raise _NoSuchKey(CopySource["Key"])
+        self.objects[Key] = dict(source)
+        return {"CopyObjectResult": {"ETag": source["ETag"]}}
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        self.calls.append(("delete_object", Key))
+        self.objects.pop(Key, None)
+        return {}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        self.calls.append(("head_object", Key))
+        obj = self.objects.get(Key)
+        if obj is None:
+            # HEAD has no body, so R2 reports a bare 404 rather than NoSuchKey
+            raise ClientError(
+                {"Error": {"Code": "404", "Message": "Not Found"},
+                 "ResponseMetadata": {"HTTPStatusCode": 404}},
+                "HeadObject",
+            )
+        response = {k: v for k, v in obj.items() if k != "Body"}
+        response["ContentLength"] = len(obj["Body"])
+        return response
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: str | None = None) -> dict:
+        self.calls.append(("get_object", Key))
+        obj = self.objects.get(Key)
+        if obj is None:
+            raise _NoSuchKey(Key)
+        if IfNoneMatch is not None and IfNoneMatch == obj["ETag"]:
+            raise ClientError(
+                {"Error": {"Code": "304", "Message": "Not Modified"},
+                 "ResponseMetadata": {"HTTPStatusCode": 304}},
+                "GetObject",
+            )
+        response = {k: v for k, v in obj.items() if k != "Body"}
+        response["Body"] = io.BytesIO(obj["Body"])
+        response["ContentLength"] = len(obj["Body"])
+        return response
@@ -7,6 +7,7 @@ is touched.
 """
 
 import os
+import json
 import asyncio
 from datetime import datetime, timedelta, timezone
 
@@ -14,12 +15,14 @@ os.environ.setdefault("R2_ENDPOINT_URL", "https://example.invalid")
 os.environ.setdefault("R2_ACCESS_KEY_ID", "test")
 os.environ.setdefault("R2_SECRET_ACCESS_KEY", "test")
 os.environ.setdefault("R2_BUCKET_NAME", "test")
+os.environ.setdefault("LOCAL_SNAPSHOT_DIR", "")
 
 import pytest
 from fastapi.testclient import TestClient
 
 import main as main_module
 from services import registry
+from services.public_envelope import public_envelopes
 
 PRODUCT = {
     "name": "Test Crackers",
@@ -63,10 +66,26 @@ def stale_envelope():
 @pytest.fixture
 def client(monkeypatch):
     # Never let tests start real crawls or the scheduler
-    monkeypatch.setattr(registry.coles_refresh, "_task", None)
-    monkeypatch.setattr(registry.coles_refresh, "_last_attempt", 0.0)
-    monkeypatch.setattr(registry.woolies_refresh, "_task", None)
-    monkeypatch.setattr(registry.woolies_refresh, "_last_attempt", 0.0)
+    async def no_crawl():
+        return None
+    for refresh in (registry.coles_refresh, registry.woolies_refresh,
+                    registry.chemist_warehouse_refresh, registry.priceline_refresh):
+        monkeypatch.setattr(refresh, "_task", None)
+        monkeypatch.setattr(refresh, "_last_attempt", 0.0)
+        monkeypatch.setattr(refresh, "_sync_fn", no_crawl)
+    monkeypatch.setattr(registry.RefreshManager, "_global_active", None)
+    monkeypatch.setitem(main_module._health_memo, "reports", None)
+    monkeypatch.setattr(registry.RefreshManager, "_queued", [])
+    # Serve from the stubbed envelopes; tests of the stored public projection
+    # patch fetch_public themselves
+    async def no_public():
+        return None
+    for service in ("coles_v2_5", "woolies", "chemist_warehouse", "priceline"):
+        monkeypatch.setattr(getattr(registry, f"{service}_crawler_service"), "fetch_public", no_public)
+
+    async def no_prefetch():
+        pass
+    monkeypatch.setattr(main_module, "prefetch_envelopes", no_prefetch)
     with TestClient(main_module.app) as c:
         yield c
 
@@ -143,12 +162,21 @@ def test_repeated_stale_fetches_trigger_only_once(client, monkeypatch):
     assert len(sync_calls) <= 1
 
 
-def test_health_reports_freshness(client, monkeypatch):
-    set_coles_data(monkeypatch, stale_envelope())
+def set_summaries(monkeypatch, **envelopes):
+    """Stub fetch_summary (what /health reads) per crawler service."""
+    calls = []
+    for service in ("coles_v2_5", "woolies", "chemist_warehouse", "priceline"):
+        def make(env, name=service):
+            async def fetch_summary():
+                calls.append(name)
+                return env
+            return fetch_summary
+        monkeypatch.setattr(getattr(registry, f"{service}_crawler_service"), "fetch_summary", make(envelopes.get(service)))
+    return calls
 
-    async def woolies_fetch():
-        return fresh_envelope()
-    monkeypatch.setattr(registry.woolies_crawler_service, "fetch_data", woolies_fetch)
+
+def test_health_reports_freshness(client, monkeypatch):
+    set_summaries(monkeypatch, coles_v2_5=stale_envelope(), woolies=fresh_envelope())
 
     res = client.get("/health")
     assert res.status_code == 200
@@ -156,9 +184,26 @@ def test_health_reports_freshness(client, monkeypatch):
     assert body["status"] == "ok"
     assert body["data_freshness"]["coles"]["is_stale"] is True
     assert body["data_freshness"]["woolies"]["is_stale"] is False
+    assert body["data_freshness"]["priceline"]["synced_at"] is None
     assert "refresh_in_progress" in body["data_freshness"]["coles"]
 
 
+def test_health_memoises_storage_reads(client, monkeypatch):
+    calls = set_summaries(monkeypatch, coles_v2_5=fresh_envelope())
+    client.get("/health")
+    client.get("/health")
+    assert len(calls) == 4  # one read per retailer, then served from the memo
+
+
+def test_liveness_probe_touches_no_storage(client, monkeypatch):
+    calls = set_summaries(monkeypatch)
+    set_coles_data(monkeypatch, None)
+    res = client.get("/livez")
+    assert res.status_code == 200
+    assert res.json() == {"status": "ok"}
+    assert calls == []
+
+
 def test_woolies_endpoint_strips_internal_fields(client, monkeypatch):
     async def woolies_fetch():
         env = fresh_envelope()
@@ -172,12 +217,659 @@ def test_woolies_endpoint_strips_internal_fields(client, monkeypatch):
 
 
 def test_legacy_coles_endpoints_strip_internal_fields(client, monkeypatch):
-    async def legacy_fetch():
-        return stale_envelope()
-    monkeypatch.setattr(registry.coles_crawler_service, "fetch_data", legacy_fetch)
-    monkeypatch.setattr(registry.coles_v2_crawler_service, "fetch_data", legacy_fetch)
+    set_coles_data(monkeypatch, stale_envelope())
 
     for ep in ("/coles-data", "/coles-data-v2"):
         res = client.get(ep)
         assert res.status_code == 200
         assert set(res.json().keys()) == {"synced_at", "count", "data"}
+
+
+def test_coles_endpoints_share_one_object_and_encoding(client, monkeypatch):
+    data = fresh_envelope()
+    set_coles_data(monkeypatch, data)
+
+    responses = [client.get(ep) for ep in ("/coles-data", "/coles-data-v2", "/coles-data-v2-5")]
+    assert len({res.content for res in responses}) == 1
+    assert len({res.headers["etag"] for res in responses}) == 1
+    assert responses[0].content == public_envelopes.get("coles", data).body
+    assert client.get("/coles-data/fields?fields=name").json()["data"] == [{"name": PRODUCT["name"]}]
+
+
+def test_coles_publish_keeps_the_legacy_key_in_its_frozen_shape(monkeypatch):
+    from tests.fake_s3 import FakeS3Client
+
+    crawler = registry.coles_v2_5_crawler_service
+    s3 = FakeS3Client()
+    monkeypatch.setattr(crawler, "s3_client", s3)
+    data = fresh_envelope()
+    crawler.save_to_file(data)
+
+    legacy = s3.objects[crawler.legacy_file_key]
+    assert json.loads(legacy["Body"]) == {"synced_at": data["synced_at"], "count": data["count"], "data": data["data"]}
+    assert "ContentEncoding" not in legacy
+
+
+def test_body_bytes_match_previous_json_rendering(client, monkeypatch):
+    env = fresh_envelope()
+    env["data"] = [dict(PRODUCT, name="Café Crème ½ Price", discount_type="half_price")]
+    set_coles_data(monkeypatch, env)
+
+    res = client.get("/coles-data-v2-5")
+    public = {k: v for k, v in env.items() if k in {"synced_at", "count", "data"}}
+    # exactly what FastAPI's JSONResponse used to render
+    expected = json.dumps(public, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    assert res.content == expected
+    assert res.headers["content-type"] == "application/json"
+
+
+def test_body_encoded_once_per_data_version(client, monkeypatch):
+    env = fresh_envelope()
+    set_coles_data(monkeypatch, env)
+
+    client.get("/coles-data-v2-5")
+    first = public_envelopes.get("coles", env)
+    client.get("/coles-data-v2-5")
+    assert public_envelopes.get("coles", env) is first
+
+    newer = fresh_envelope()
+    set_coles_data(monkeypatch, newer)
+    client.get("/coles-data-v2-5")
+    assert public_envelopes.get("coles", newer) is not first
+
+
+def test_data_endpoints_emit_strong_etag(client, monkeypatch):
+    set_coles_data(monkeypatch, fresh_envelope())
+    res = client.get("/coles-data-v2-5")
+    etag = res.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert client.get("/coles-data-v2-5").headers["etag"] == etag
+
+
+def test_matching_if_none_match_returns_304_without_body(client, monkeypatch):
+    set_coles_data(monkeypatch, fresh_envelope())
+    etag = client.get("/coles-data-v2-5").headers["etag"]
+
+    res = client.get("/coles-data-v2-5", headers={"If-None-Match": f'"other", {etag}'})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["etag"] == etag
+
+
+def test_changed_data_invalidates_etag(client, monkeypatch):
+    set_coles_data(monkeypatch, fresh_envelope())
+    etag = client.get("/coles-data-v2-5").headers["etag"]
+
+    changed = fresh_envelope()
+    changed["data"] = [dict(PRODUCT, price=1.5)]
+    set_coles_data(monkeypatch, changed)
+    res = client.get("/coles-data-v2-5", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["etag"] != etag
+
+
+def test_304_still_triggers_stale_refresh(client, monkeypatch):
+    set_coles_data(monkeypatch, stale_envelope())
+
+    async def fake_sync():
+        return None
+    monkeypatch.setattr(registry.coles_refresh, "_sync_fn", fake_sync)
+    etag = client.get("/coles-data-v2-5").headers["etag"]
+    registry.coles_refresh._task = None
+    registry.coles_refresh._last_attempt = 0.0
+
+    res = client.get("/coles-data-v2-5", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert registry.coles_refresh._last_attempt > 0
+
+
+def test_fresh_data_cacheable_until_reset(client, monkeypatch):
+    set_coles_data(monkeypatch, fresh_envelope())
+    header = client.get("/coles-data-v2-5").headers["cache-control"]
+    max_age = int(header.split("max-age=")[1].split(",")[0])
+    assert 0 < max_age <= 7 * 24 * 3600
+    assert "stale-while-revalidate" not in header
+
+
+def test_stale_data_sent_with_stale_while_revalidate(client, monkeypatch):
+    set_coles_data(monkeypatch, stale_envelope())
+
+    async def fake_sync():
+        return None
+    monkeypatch.setattr(registry.coles_refresh, "_sync_fn", fake_sync)
+    assert "stale-while-revalidate" in client.get("/coles-data-v2-5").headers["cache-control"]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_warms_all_retailers_and_queues_stale_refreshes(monkeypatch):
+    fetched, synced = [], []
+    envelopes = {
+        "coles_v2_5": stale_envelope(), "woolies": fresh_envelope(),
+        "chemist_warehouse": stale_envelope(), "priceline": None,
+    }
+    release = asyncio.Event()
+    for service, env in envelopes.items():
+        def make_fetch(env=env, name=service):
+            async def fetch_data():
+                fetched.append(name)
+                return env
+            return fetch_data
+        monkeypatch.setattr(getattr(registry, f"{service}_crawler_service"), "fetch_data", make_fetch())
+
+        async def no_public():
+            return None
+        monkeypatch.setattr(getattr(registry, f"{service}_crawler_service"), "fetch_public", no_public)
+    for refresh in (registry.coles_refresh, registry.woolies_refresh,
+                    registry.chemist_warehouse_refresh, registry.priceline_refresh):
+        def make_sync(name=refresh.name):
+            async def sync():
+                synced.append(name)
+                await release.wait()
+                return fresh_envelope()
+            return sync
+        monkeypatch.setattr(refresh, "_sync_fn", make_sync())
+        monkeypatch.setattr(refresh, "_task", None)
+        monkeypatch.setattr(refresh, "_last_attempt", 0.0)
+    monkeypatch.setattr(registry.RefreshManager, "_global_active", None)
+    monkeypatch.setattr(registry.RefreshManager, "_queued", [])
+
+    await main_module.prefetch_envelopes()
+    assert sorted(fetched) == sorted(envelopes)
+    assert main_module._wake_metrics["prefetch_ms"] is not None
+    # one crawl at a time: coles runs, the other stale retailers wait their turn
+    await asyncio.sleep(0)
+    assert synced == ["coles"]
+    assert [m.name for m in registry.RefreshManager._queued] == ["chemist_warehouse", "priceline"]
+    release.set()
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+    assert synced == ["coles", "chemist_warehouse", "priceline"]
+
+
+@pytest.mark.asyncio
+async def test_first_data_request_after_prefetch_makes_no_r2_read(monkeypatch):
+    import httpx
+
+    from services import retailer_storage
+    from services.envelope_cache import EnvelopeCache
+    from services.public_object import PublicObjectCache
+    from services.search_index import SearchIndex
+    from services.snapshot_manifest import SnapshotManifest
+    from tests.fake_s3 import FakeS3Client
+
+    s3 = FakeS3Client()
+    monkeypatch.setattr(retailer_storage, "snapshot_manifest", SnapshotManifest(cache=EnvelopeCache()))
+    monkeypatch.setattr(retailer_storage, "public_objects", PublicObjectCache())
+    monkeypatch.setattr(main_module, "search_index", SearchIndex())
+    monkeypatch.setattr(main_module, "_wake_metrics", dict(main_module._wake_metrics))
+    for crawler, refresh in main_module._RETAILERS.values():
+        monkeypatch.setattr(crawler, "s3_client", s3)
+        monkeypatch.setattr(refresh, "_task", None)
+        crawler.save_to_file(fresh_envelope())
+
+    await main_module.prefetch_envelopes()
+    s3.calls.clear()
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        for path in ("/coles-data-v2-5", "/woolies-data", "/chemist-warehouse-data", "/priceline-data"):
+            assert (await http.get(path)).status_code == 200
+    assert [c for c in s3.calls if c[0] == "get_object"] == []
+
+
+def test_health_reports_first_data_response_time(client, monkeypatch):
+    set_summaries(monkeypatch)
+    set_coles_data(monkeypatch, fresh_envelope())
+    monkeypatch.setitem(main_module._wake_metrics, "first_data_response_ms", None)
+    client.get("/coles-data-v2-5")
+    wake = client.get("/health").json()["wake"]
+    assert wake["first_data_path"] == "/coles-data-v2-5"
+    assert wake["first_data_response_ms"] is not None
+
+
+def set_all_data(monkeypatch, **envelopes):
+    for service in ("coles_v2_5", "woolies", "chemist_warehouse", "priceline"):
+        def make(env):
+            async def fetch_data():
+                return env
+            return fetch_data
+        monkeypatch.setattr(getattr(registry, f"{service}_crawler_service"), "fetch_data", make(envelopes.get(service)))
+
+
+def test_specials_combines_all_retailers(client, monkeypatch):
+    coles, woolies = fresh_envelope(), fresh_envelope()
+    woolies["data"] = [dict(PRODUCT, retailer="Woolworths")]
+    set_all_data(monkeypatch, coles_v2_5=coles, woolies=woolies,
+                 chemist_warehouse=fresh_envelope(), priceline=fresh_envelope())
+
+    res = client.get("/specials")
+    assert res.status_code == 200
+    body = res.json()["retailers"]
+    assert list(body) == ["coles", "woolies", "chemist_warehouse", "priceline"]
+    assert body["woolies"]["data"][0]["retailer"] == "Woolworths"
+    # each retailer is exactly its frozen endpoint's body
+    assert body["coles"] == client.get("/coles-data-v2-5").json()
+    assert body["coles"]["synced_at"] == coles["synced_at"]
+
+
+def test_specials_retailer_selector(client, monkeypatch):
+    set_all_data(monkeypatch, coles_v2_5=fresh_envelope(), priceline=fresh_envelope())
+    res = client.get("/specials?retailers=priceline,coles")
+    assert list(res.json()["retailers"]) == ["priceline", "coles"]
+    assert client.get("/specials?retailers=aldi").status_code == 400
+
+
+def test_specials_missing_retailer_is_null_and_etag_works(client, monkeypatch):
+    set_all_data(monkeypatch, coles_v2_5=fresh_envelope())
+    res = client.get("/specials?retailers=coles,woolies")
+    assert res.json()["retailers"]["woolies"] is None
+    assert "stale-while-revalidate" in res.headers["cache-control"]
+    again = client.get("/specials?retailers=coles,woolies", headers={"If-None-Match": res.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_specials_encoding_reused_per_data_version():
+    coles, woolies = fresh_envelope(), fresh_envelope()
+    first = public_envelopes.combined({"coles": coles, "woolies": woolies})
+    assert public_envelopes.combined({"coles": coles, "woolies": woolies}) is first
+    assert public_envelopes.combined({"coles": fresh_envelope(), "woolies": woolies}) is not first
+
+
+def test_specials_query_filters_sorts_and_pages(client, monkeypatch):
+    coles, woolies = fresh_envelope(), fresh_envelope()
+    coles["data"] = [dict(PRODUCT, name="A", price=1.0, price_was=4.0, discount_type="beyond_half"),
+                     dict(PRODUCT, name="B", price=5.0, price_was=10.0, discount_type="half_price")]
+    woolies["data"] = [dict(PRODUCT, name="C", price=3.0, price_was=6.0, discount_type="half_price",
+                            retailer="Woolworths")]
+    set_all_data(monkeypatch, coles_v2_5=coles, woolies=woolies)
+
+    res = client.get("/specials/query?discount_type=half_price&sort=price&order=desc&limit=1")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["count"] == 2
+    assert [p["name"] for p in body["data"]] == ["B"]
+    assert "max-age" in res.headers["cache-control"]
+
+    rest = client.get(f"/specials/query?discount_type=half_price&sort=price&order=desc&limit=1"
+                      f"&cursor={body['next_cursor']}").json()
+    assert [p["name"] for p in rest["data"]] == ["C"]
+    assert rest["next_cursor"] is None
+
+    res = client.get("/specials/query?retailers=coles&max_price=2")
+    assert [p["name"] for p in res.json()["data"]] == ["A"]
+
+
+def test_specials_query_rejects_bad_parameters(client, monkeypatch):
+    set_all_data(monkeypatch, coles_v2_5=fresh_envelope())
+    assert client.get("/specials/query?sort=name").status_code == 400
+    assert client.get("/specials/query?discount_type=bogof").status_code == 400
+    assert client.get("/specials/query?retailers=aldi").status_code == 400
+    assert client.get("/specials/query?cursor=garbage").status_code == 400
+    assert client.get("/specials/query?min_fraction=2").status_code == 422
+
+
+def test_specials_search_across_retailers(client, monkeypatch):
+    coles, woolies = fresh_envelope(), fresh_envelope()
+    coles["data"] = [dict(PRODUCT, name="Arnott's Shapes Crackers")]
+    woolies["data"] = [dict(PRODUCT, name="Jatz Crackers", retailer="Woolworths")]
+    set_all_data(monkeypatch, coles_v2_5=coles, woolies=woolies)
+
+    body = client.get("/specials/search?q=crack").json()
+    assert body["count"] == 2
+    assert {p["retailer"] for p in body["data"]} == {"Coles", "Woolworths"}
+    assert client.get("/specials/search?q=shapes&retailers=woolies").json()["count"] == 0
+    assert client.get("/specials/search").status_code == 422
+
+
+def test_ndjson_route_streams_frozen_products(client, monkeypatch):
+    data = fresh_envelope()
+    data["data"] = [dict(PRODUCT, name=f"Item {i}") for i in range(150)]
+    data["count"] = 150
+    set_all_data(monkeypatch, priceline=data)
+
+    res = client.get("/priceline-data/ndjson")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    assert res.headers["x-synced-at"] == data["synced_at"]
+    assert res.headers["x-product-count"] == "150"
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert lines == client.get("/priceline-data").json()["data"]
+
+
+def test_ndjson_route_404_without_data(client, monkeypatch):
+    set_all_data(monkeypatch)
+    assert client.get("/woolies-data/ndjson").status_code == 404
+
+
+def set_snapshot(monkeypatch, tmp_path, service, envelope):
+    from services.ndjson_snapshot import NdjsonSnapshotStore
+    from tests.fake_s3 import FakeS3Client
+
+    s3, store = FakeS3Client(), NdjsonSnapshotStore(str(tmp_path))
+    store.publish(s3, "b", "/feed.json", envelope)
+    snapshot = store.get(s3, "b", "/feed.json")
+
+    async def fetch_snapshot():
+        return snapshot
+    monkeypatch.setattr(getattr(registry, f"{service}_crawler_service"), "fetch_snapshot", fetch_snapshot)
+
+
+def test_page_route_slices_the_mapped_snapshot(client, monkeypatch, tmp_path):
+    data = fresh_envelope()
+    data["data"] = [dict(PRODUCT, name=f"Item {i}") for i in range(30)]
+    data["count"] = 30
+    set_snapshot(monkeypatch, tmp_path, "priceline", data)
+
+    async def no_envelope():
+        raise AssertionError("page reads must not load the envelope")
+    monkeypatch.setattr(registry.priceline_crawler_service, "fetch_data", no_envelope)
+
+    res = client.get("/priceline-data/page?offset=10&limit=5")
+    assert res.status_code == 200
+    body = res.json()
+    assert body == {"synced_at": data["synced_at"], "count": 30, "offset": 10, "data": data["data"][10:15]}
+    assert "max-age" in res.headers["cache-control"]
+
+    lines = client.get("/priceline-data/ndjson").text.splitlines()
+    assert [json.loads(line) for line in lines] == data["data"]
+
+
+def test_page_route_falls_back_to_the_envelope(client, monkeypatch):
+    data = fresh_envelope()
+    data["data"] = [dict(PRODUCT, name=f"Item {i}") for i in range(3)]
+    set_all_data(monkeypatch, woolies=data)
+    body = client.get("/woolies-data/page?offset=2").json()
+    assert body["count"] == 3 and [p["name"] for p in body["data"]] == ["Item 2"]
+    assert client.get("/chemist-warehouse-data/page").status_code == 404
+    assert client.get("/woolies-data/page?limit=0").status_code == 422
+
+
+def test_msgpack_is_negotiated_by_accept(client, monkeypatch):
+    import msgspec
+
+    set_coles_data(monkeypatch, fresh_envelope())
+    as_json = client.get("/coles-data-v2-5")
+    res = client.get("/coles-data-v2-5", headers={"Accept": "application/msgpack"})
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/msgpack"
+    assert res.headers["vary"] == "Accept, Accept-Encoding"
+    assert msgspec.msgpack.decode(res.content) == as_json.json()
+    assert res.headers["etag"] != as_json.headers["etag"]
+
+    again = client.get("/coles-data-v2-5", headers={"Accept": "application/msgpack",
+                                                   "If-None-Match": res.headers["etag"]})
+    assert again.status_code == 304
+    # browsers and plain fetch() keep getting JSON
+    assert client.get("/coles-data-v2-5", headers={"Accept": "*/*"}).headers["content-type"] == "application/json"
+
+
+def test_msgpack_combined_view(client, monkeypatch):
+    import msgspec
+
+    set_all_data(monkeypatch, coles_v2_5=fresh_envelope(), priceline=fresh_envelope())
+    res = client.get("/specials?retailers=coles,woolies", headers={"Accept": "application/msgpack"})
+    assert msgspec.msgpack.decode(res.content) == client.get("/specials?retailers=coles,woolies").json()
+
+
+def test_wants_msgpack_ranks_against_json():
+    from services.public_envelope import wants_msgpack
+
+    assert wants_msgpack("application/msgpack")
+    assert wants_msgpack("application/x-msgpack, application/json;q=0.5")
+    assert not wants_msgpack("application/json, application/msgpack")
+    assert not wants_msgpack("application/msgpack;q=0")
+    assert not wants_msgpack("*/*")
+    assert not wants_msgpack(None)
+
+
+def test_fields_route_projects_products(client, monkeypatch):
+    data = fresh_envelope()
+    data["data"] = [dict(PRODUCT, discount_type="half_price")]
+    set_all_data(monkeypatch, woolies=data)
+
+    res = client.get("/woolies-data/fields?fields=name,price,price_was,discount_type")
+    assert res.status_code == 200
+    assert res.json() == {
+        "synced_at": data["synced_at"], "count": 1,
+        "data": [{"name": "Test Crackers", "price": 2.0, "price_was": 4.0, "discount_type": "half_price"}],
+    }
+    full = client.get("/woolies-data")
+    assert len(res.content) * 2 < len(full.content)
+    assert res.headers["etag"] != full.headers["etag"]
+    assert client.get("/woolies-data/fields?fields=name,secret").status_code == 400
+    assert client.get("/woolies-data/fields").status_code == 422
+
+
+def test_projection_encodings_are_memoised_in_a_bounded_lru():
+    from services.public_envelope import PublicEnvelopeCache
+
+    cache = PublicEnvelopeCache(projection_cache_size=2)
+    data = fresh_envelope()
+    first = cache.projected("coles", data, ("name",))
+    assert cache.projected("coles", data, ("name",)) is first
+    cache.projected("coles", data, ("price",))
+    cache.projected("coles", data, ("name", "price"))
+    assert cache.projected("coles", data, ("name",)) is not first  # evicted
+    # a new data version re-encodes
+    assert cache.projected("coles", fresh_envelope(), ("name",)).source is not data
+
+
+def test_events_route_is_an_sse_stream(client, monkeypatch):
+    from services.refresh_events import refresh_events
+
+    stream = refresh_events.stream
+    monkeypatch.setattr(refresh_events, "stream", lambda: stream(heartbeat_seconds=0.01, max_seconds=0.03))
+    res = client.get("/events")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert res.headers["cache-control"] == "no-cache"
+    assert res.text.startswith("retry: ")
+    assert len(refresh_events) == 0  # unsubscribed once the stream ended
+
+
+def test_server_timing_header_and_health_summary(client, monkeypatch):
+    from services.timing import route_timings
+
+    route_timings.clear()
+    set_coles_data(monkeypatch, stale_envelope())
+    res = client.get("/coles-data-v2-5")
+    header = res.headers["server-timing"]
+    assert "refresh;dur=" in header and "encode;dur=" in header and "strip;dur=" in header
+    assert "total;dur=" in header
+    client.get("/coles-data-v2-5")
+
+    set_summaries(monkeypatch)
+    timings = client.get("/health").json()["timings"]
+    assert timings["/coles-data-v2-5"]["count"] == 2
+    assert "refresh" in timings["/coles-data-v2-5"]["phases"]
+
+
+def test_metrics_exposes_request_and_cache_counters(client, monkeypatch):
+    set_coles_data(monkeypatch, fresh_envelope())
+    client.get("/coles-data-v2-5")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/coles-data-v2-5",status="200"}' in res.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/coles-data-v2-5",le="+Inf"}' in res.text
+    assert 'refresh_in_progress{retailer="coles"}' in res.text
+
+
+def test_diff_since_returns_only_the_delta(client, monkeypatch):
+    current = fresh_envelope()
+    set_summaries(monkeypatch, woolies=current)
+    diff = {"since": "2026-10-07T00:00:00+00:00", "synced_at": current["synced_at"],
+            "added": [PRODUCT], "removed": ["https://example.com/gone"], "changed": []}
+
+    async def fetch_diff():
+        return diff
+    monkeypatch.setattr(registry.woolies_crawler_service, "fetch_diff", fetch_diff)
+
+    res = client.get("/woolies-data/diff", params={"since": "2026-10-07T00:00:00+00:00"})
+    assert res.status_code == 200
+    assert res.json() == diff
+
+    same = client.get("/woolies-data/diff", params={"since": current["synced_at"]}).json()
+    assert same["added"] == same["removed"] == same["changed"] == []
+
+    older = client.get("/woolies-data/diff", params={"since": "2026-09-30T00:00:00+00:00"})
+    assert older.status_code == 410
+
+
+def test_gzip_body_is_compressed_once_and_reused(client, monkeypatch):
+    import gzip
+
+    from services.public_envelope import public_envelopes
+
+    data = fresh_envelope()
+    set_coles_data(monkeypatch, data)
+    res = client.get("/coles-data-v2-5", headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["vary"]
+    encoded = public_envelopes.get("coles", data)
+    body, etag = encoded.gzip()
+    assert res.headers["etag"] == etag
+    assert gzip.decompress(body) == encoded.body == res.content
+
+    plain = client.get("/coles-data-v2-5", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == encoded.body
+    assert plain.headers["etag"] == encoded.etag
+
+
+def test_accepts_gzip_honours_q_values():
+    from services.public_envelope import accepts_gzip
+
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, *;q=0.1")
+    assert not accepts_gzip("gzip;q=0, br")
+    assert not accepts_gzip("gzip;q=0, *")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip(None)
+
+
+def test_stored_public_projection_is_served_without_decoding(client, monkeypatch):
+    from services.public_object import PublicObjectCache
+    from tests.fake_s3 import FakeS3Client
+
+    data = fresh_envelope()
+    s3, cache = FakeS3Client(), PublicObjectCache()
+    cache.publish(s3, "b", "/woolies.json", data)
+
+    async def fetch_public():
+        return cache.get(s3, "b", "/woolies.json")
+
+    async def fetch_data():
+        raise AssertionError("the envelope must not be read")
+    monkeypatch.setattr(registry.woolies_crawler_service, "fetch_public", fetch_public)
+    monkeypatch.setattr(registry.woolies_crawler_service, "fetch_data", fetch_data)
+
+    expected = public_envelopes.get("woolies", data)
+    res = client.get("/woolies-data", headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.content == expected.body
+    assert res.headers["etag"] == expected.gzip()[1]
+    assert res.headers["cache-control"].startswith("public, max-age=")
+
+    plain = client.get("/woolies-data", headers={"Accept-Encoding": "identity"})
+    assert plain.headers["etag"] == expected.etag
+    assert client.get("/woolies-data", headers={"Accept-Encoding": "identity",
+                                                "If-None-Match": expected.etag}).status_code == 304
+
+
+def test_identical_recrawl_writes_no_envelope(monkeypatch, tmp_path):
+    from services.envelope_cache import EnvelopeCache
+    from services.ndjson_snapshot import ndjson_snapshots
+    from services.public_object import public_key, public_objects
+    from services.snapshot_manifest import SnapshotManifest
+    from services import retailer_storage
+    from tests.fake_s3 import FakeS3Client
+
+    crawler = registry.priceline_crawler_service
+    s3 = FakeS3Client()
+    manifest = SnapshotManifest(cache=EnvelopeCache())
+    monkeypatch.setattr(crawler, "s3_client", s3)
+    monkeypatch.setattr(retailer_storage, "snapshot_manifest", manifest)
+    monkeypatch.setattr(ndjson_snapshots, "directory", str(tmp_path))
+    first = fresh_envelope()
+    crawler.save_to_file(first)
+    assert s3.objects[crawler.file_key]["Body"] == s3.objects[manifest.entry(s3, crawler.bucket_name, "priceline")["snapshot"]]["Body"]
+
+    again = {**first, "synced_at": datetime.now(timezone.utc).isoformat(), "crawl_status": "partial"}
+    calls = len(s3.calls)
+    crawler.save_to_file(again)
+    writes = [c for c in s3.calls[calls:] if c[0] in ("put_object", "copy_object")]
+    # the public body carries synced_at, so it is the one copy rewritten
+    assert writes == [("put_object", manifest.key), ("put_object", public_key(crawler.file_key))]
+
+    assert crawler.load_from_file()["synced_at"] == again["synced_at"]
+    assert crawler.load_summary()["synced_at"] == again["synced_at"]
+    assert crawler.load_public().summary["synced_at"] == again["synced_at"]
+    # the NDJSON snapshot is keyed by the products and takes the new sync
+    snapshot = crawler.load_snapshot()
+    assert snapshot.summary["synced_at"] == again["synced_at"]
+    assert snapshot.summary["crawl_status"] == "partial"
+    assert len(snapshot) == len(first["data"])
+    public_objects.invalidate(crawler.file_key)
+    ndjson_snapshots.clear()
+
+
+def test_diff_after_an_unchanged_recrawl(client, monkeypatch):
+    current = {**fresh_envelope(), "snapshot_synced_at": "2026-10-14T00:00:00+00:00"}
+    set_summaries(monkeypatch, woolies=current)
+    diff = {"since": "2026-10-07T00:00:00+00:00", "synced_at": "2026-10-14T00:00:00+00:00",
+            "added": [PRODUCT], "removed": [], "changed": []}
+
+    async def fetch_diff():
+        return diff
+    monkeypatch.setattr(registry.woolies_crawler_service, "fetch_diff", fetch_diff)
+
+    res = client.get("/woolies-data/diff", params={"since": "2026-10-07T00:00:00+00:00"}).json()
+    assert res["added"] == [PRODUCT]
+    assert res["synced_at"] == current["synced_at"]
+
+    same = client.get("/woolies-data/diff", params={"since": "2026-10-14T00:00:00+00:00"}).json()
+    assert same["added"] == same["removed"] == same["changed"] == []
+
+
+def test_rollback_is_not_exposed_over_http(client):
+    assert client.post("/snapshots/woolies/rollback").status_code in (404, 405)
+
+
+def test_rollback_restores_every_served_copy(monkeypatch):
+    import gzip
+
+    from services import retailer_storage
+    from services.cdn_publish import cdn_publisher
+    from services.envelope_cache import EnvelopeCache
+    from services.public_object import public_key, public_objects
+    from services.snapshot_manifest import SnapshotManifest
+    from tests.fake_s3 import FakeS3Client
+
+    crawler = registry.coles_v2_5_crawler_service
+    s3 = FakeS3Client()
+    manifest = SnapshotManifest(cache=EnvelopeCache())
+    monkeypatch.setattr(crawler, "s3_client", s3)
+    monkeypatch.setattr(retailer_storage, "snapshot_manifest", manifest)
+    monkeypatch.setattr(cdn_publisher, "bucket", "public")
+    monkeypatch.setattr(cdn_publisher, "prefix", "")
+
+    good = fresh_envelope()
+    bad = {**fresh_envelope(), "data": [{**PRODUCT, "price": 999.0}]}
+    crawler.save_to_file(good)
+    good_copy = s3.objects["coles.json"]["Body"]
+    good_envelope = s3.objects[crawler.file_key]["Body"]
+    crawler.save_to_file(bad)
+    assert s3.objects["coles.json"]["Body"] != good_copy
+
+    entry = crawler.rollback_snapshot()
+    assert entry["hash"] == manifest.entry(s3, crawler.bucket_name, "coles")["hash"]
+    assert s3.objects["coles.json"]["Body"] == good_copy
+    beacon = json.loads(s3.objects["freshness.json"]["Body"])
+    assert beacon["retailers"]["coles"]["synced_at"] == good["synced_at"]
+    assert s3.objects[crawler.file_key]["Body"] == good_envelope
+    assert json.loads(s3.objects[crawler.legacy_file_key]["Body"])["data"] == good["data"]
+    public = json.loads(gzip.decompress(s3.objects[public_key(crawler.file_key)]["Body"]))
+    assert public["data"][0]["price"] == PRODUCT["price"]
+    assert crawler.load_public() is not None
+    public_objects.invalidate(crawler.file_key)
@@ -0,0 +1,80 @@
+import gzip
+import json
+
+from services.cdn_publish import CdnPublisher, fresh_until
+from services.public_envelope import EncodedEnvelope
+from tests.conftest import envelope
+from tests.fake_s3 import FakeS3Client
+
+
+def publisher():
+    cdn = CdnPublisher()
+    cdn.configure("public", "specials/")
+    return cdn
+
+
+def test_fresh_until_is_the_reset_after_the_sync():
+    # Wednesday 14 Oct 2026 12:00 Sydney -> next Wednesday 00:00 Sydney (AEDT, UTC+11)
+    assert fresh_until("2026-10-14T01:00:00+00:00").isoformat() == "2026-10-20T13:00:00+00:00"
+    assert fresh_until(None) is None
+
+
+def test_public_copy_is_the_frozen_body_with_caching_headers():
+    s3 = FakeS3Client()
+    data = envelope()
+    publisher().publish(s3, "woolies", data)
+
+    obj = s3.objects["specials/woolies.json"]
+    body = gzip.decompress(obj["Body"])
+    assert body == EncodedEnvelope(data).body
+    assert "crawl_status" not in json.loads(body)
+    assert obj["ContentEncoding"] == "gzip"
+    assert obj["ContentType"] == "application/json"
+    assert obj["CacheControl"] == "public, must-revalidate"
+    assert obj["Expires"] == fresh_until(data["synced_at"])
+    assert obj["ETag"]
+
+
+def test_beacon_accumulates_every_retailer():
+    s3 = FakeS3Client()
+    publisher().publish(s3, "woolies", envelope())
+    # a fresh process (empty memory) must keep the entries already in R2
+    publisher().publish(s3, "priceline", envelope("2026-10-15T01:00:00+00:00"))
+
+    beacon = s3.objects["specials/freshness.json"]
+    assert beacon["CacheControl"] == "public, max-age=60"
+    retailers = json.loads(beacon["Body"])["retailers"]
+    assert set(retailers) == {"woolies", "priceline"}
+    assert retailers["priceline"] == {
+        "path": "priceline.json",
+        "synced_at": "2026-10-15T01:00:00+00:00",
+        "fresh_until": "2026-10-20T13:00:00+00:00",
+        "count": 1,
+    }
+
+
+def test_unconfigured_publisher_writes_nothing():
+    s3 = FakeS3Client()
+    CdnPublisher().publish(s3, "woolies", envelope())
+    assert s3.objects == {}
+
+
+def test_concurrent_beacon_update_from_another_machine_is_kept():
+    s3 = FakeS3Client()
+    publisher().publish(s3, "woolies", envelope())
+    read = s3.get_object
+    raced = []
+
+    def get_object(**kwargs):
+        response = read(**kwargs)
+        if kwargs["Key"] == "specials/freshness.json" and not raced:
+            # another machine publishes chemist_warehouse between this read and the put
+            raced.append(True)
+            publisher().publish(s3, "chemist_warehouse", envelope())
+        return response
+
+    s3.get_object = get_object
+    publisher().publish(s3, "priceline", envelope())
+
+    retailers = json.loads(s3.objects["specials/freshness.json"]["Body"])["retailers"]
+    assert set(retailers) == {"woolies", "chemist_warehouse", "priceline"}
@@ -0,0 +1,147 @@
+import json
+
+import pytest
+
+from services.envelope_cache import EnvelopeCache, compress_envelope, envelope_metadata
+from tests.conftest import envelope, gets
+from tests.fake_s3 import FakeS3Client
+
+KEY = "/home/crawlers/test_specials.json"
+
+
+@pytest.fixture
+def s3():
+    client = FakeS3Client()
+    client.put_object(Bucket="b", Key=KEY, Body=json.dumps(envelope("t1", [])))
+    client.calls.clear()
+    return client
+
+
+def test_repeat_reads_within_window_are_served_from_memory(s3, clock):
+    cache = EnvelopeCache(revalidate_seconds=60, clock=clock)
+    first = cache.load(s3, "b", KEY)
+    second = cache.load(s3, "b", KEY)
+    assert first["synced_at"] == "t1"
+    assert second is first
+    assert len(gets(s3)) == 1
+
+
+def test_revalidation_304_keeps_parsed_envelope(s3, clock):
+    cache = EnvelopeCache(revalidate_seconds=60, clock=clock)
+    first = cache.load(s3, "b", KEY)
+    clock.now += 61
+    again = cache.load(s3, "b", KEY)
+    assert again is first  # not re-parsed
+    assert len(gets(s3)) == 2
+
+
+def test_revalidation_picks_up_changed_object(s3, clock):
+    cache = EnvelopeCache(revalidate_seconds=60, clock=clock)
+    cache.load(s3, "b", KEY)
+    # another machine publishes
+    s3.put_object(Bucket="b", Key=KEY, Body=json.dumps(envelope("t2", [])))
+    clock.now += 61
+    assert cache.load(s3, "b", KEY)["synced_at"] == "t2"
+
+
+def test_missing_key_is_cached_negatively(s3, clock):
+    cache = EnvelopeCache(negative_ttl_seconds=30, clock=clock)
+    assert cache.load(s3, "b", "/missing.json") is None
+    assert cache.load(s3, "b", "/missing.json") is None
+    assert len(gets(s3)) == 1
+    clock.now += 31
+    assert cache.load(s3, "b", "/missing.json") is None
+    assert len(gets(s3)) == 2
+
+
+def test_immutable_keys_are_not_revalidated(s3, clock):
+    cache = EnvelopeCache(revalidate_seconds=60, clock=clock)
+    first = cache.load(s3, "b", KEY, immutable=True)
+    clock.now += 3600
+    assert cache.load(s3, "b", KEY, immutable=True) is first
+    assert len(gets(s3)) == 1
+    cache.invalidate(KEY)
+    cache.load(s3, "b", KEY, immutable=True)
+    assert len(gets(s3)) == 2
+
+
+def test_invalidate_forces_fresh_read(s3, clock):
+    cache = EnvelopeCache(revalidate_seconds=60, clock=clock)
+    cache.load(s3, "b", KEY)
+    s3.put_object(Bucket="b", Key=KEY, Body=json.dumps(envelope("t2", [])))
+    cache.invalidate(KEY)
+    assert cache.load(s3, "b", KEY)["synced_at"] == "t2"
+
+
+def test_fetch_racing_an_invalidation_is_not_cached(s3, clock):
+    cache = EnvelopeCache(revalidate_seconds=60, clock=clock)
+    original_get = s3.get_object
+
+    def get_then_publish(**kwargs):
+        response = original_get(**kwargs)
+        # a publish lands while this (old) body is still in flight
+        cache.invalidate(KEY)
+        return response
+    s3.get_object = get_then_publish
+    assert cache.load(s3, "b", KEY)["synced_at"] == "t1"
+    s3.get_object = original_get
+    cache.load(s3, "b", KEY)
+    assert len(gets(s3)) == 2  # the raced result was dropped, so this re-fetched
+
+
+def test_summary_reads_metadata_without_downloading(clock):
+    s3 = FakeS3Client()
+    env = envelope("2026-06-10T01:00:00+10:00", [{}, {}], crawl_status="partial")
+    s3.put_object(Bucket="b", Key=KEY, Body=json.dumps(env), Metadata=envelope_metadata(env))
+    cache = EnvelopeCache(clock=clock)
+    assert cache.summary(s3, "b", KEY) == {
+        "synced_at": "2026-06-10T01:00:00+10:00", "crawl_status": "partial", "count": 2,
+    }
+    assert gets(s3) == []
+
+
+def test_summary_prefers_cached_envelope(s3, clock):
+    cache = EnvelopeCache(clock=clock)
+    cache.load(s3, "b", KEY)
+    s3.calls.clear()
+    assert cache.summary(s3, "b", KEY)["synced_at"] == "t1"
+    assert s3.calls == []
+
+
+def test_summary_falls_back_to_full_load_for_old_objects(s3, clock):
+    # fixture object was written without metadata
+    cache = EnvelopeCache(clock=clock)
+    assert cache.summary(s3, "b", KEY)["synced_at"] == "t1"
+    assert len(gets(s3)) == 1
+
+
+def test_summary_of_missing_object_is_none(clock):
+    assert EnvelopeCache(clock=clock).summary(FakeS3Client(), "b", "/missing.json") is None
+
+
+def test_loads_report_phases_to_the_request_timing(s3, clock):
+    import contextvars
+    from services import timing
+
+    def two_loads():
+        request = timing.begin_request()
+        cache = EnvelopeCache(revalidate_seconds=60, clock=clock)
+        cache.load(s3, "b", KEY)
+        cache.load(s3, "b", KEY)
+        return request
+
+    request = contextvars.Context().run(two_loads)
+    assert {"r2", "decode"} <= set(request.phases)
+    assert request.marks == {"cache": "miss,hit"}
+
+
+def test_gzip_stored_envelopes_are_decompressed(clock):
+    s3 = FakeS3Client()
+    data = envelope("t2")
+    s3.put_object(Bucket="b", Key=KEY, Body=compress_envelope(data), ContentEncoding="gzip")
+    assert EnvelopeCache(clock=clock).load(s3, "b", KEY) == data
+
+
+def test_compression_is_deterministic():
+    data = envelope("t2", [])
+    assert compress_envelope(data) == compress_envelope(dict(data))
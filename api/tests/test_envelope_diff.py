@@ -0,0 +1,61 @@
+import json
+
+from services.envelope_diff import compute_diff, diff_key, empty_diff, product_key, publish_diff
+from tests.conftest import envelope
+from tests.fake_s3 import FakeS3Client
+
+KEY = "/priceline_specials.json"
+
+
+def product(n, price=5.0, **extra):
+    return {"name": f"Item {n}", "price": price, "price_was": 10.0, "discount": "50%",
+            "discount_type": "half_price", "price_per_unit": None,
+            "product_link": f"https://example.com/p/{n}", "retailer": "priceline", **extra}
+
+
+def test_diff_key_sits_next_to_the_envelope():
+    assert diff_key(KEY) == "/priceline_specials.diff.json"
+
+
+def test_product_key_falls_back_to_the_name_without_a_link():
+    assert product_key({"name": "Milk", "retailer": "woolies", "product_link": ""}) == "woolies:Milk"
+
+
+def test_added_removed_and_repriced():
+    previous = envelope("2026-10-07T00:00:00+00:00", [product(1), product(2), product(3)])
+    current = envelope("2026-10-14T00:00:00+00:00", [product(1), product(2, price=4.0), product(4)])
+
+    diff = compute_diff(previous, current)
+    assert diff["since"] == "2026-10-07T00:00:00+00:00"
+    assert diff["synced_at"] == "2026-10-14T00:00:00+00:00"
+    assert diff["added"] == [product(4)]
+    assert diff["removed"] == ["https://example.com/p/3"]
+    assert diff["changed"] == [{
+        "key": "https://example.com/p/2", "price": 4.0, "price_was": 10.0, "discount": "50%",
+        "discount_type": "half_price", "price_per_unit": None,
+    }]
+
+
+def test_edits_outside_the_price_fields_are_not_changes():
+    previous = envelope("a", [product(1)])
+    current = envelope("b", [product(1, image="new.png")])
+    assert compute_diff(previous, current)["changed"] == []
+
+
+def test_publish_stores_the_delta():
+    s3 = FakeS3Client()
+    publish_diff(s3, "b", KEY, envelope("a", [product(1)]), envelope("b", [product(2)]))
+    stored = json.loads(s3.objects["/priceline_specials.diff.json"]["Body"])
+    assert stored["since"] == "a"
+    assert stored["removed"] == ["https://example.com/p/1"]
+
+
+def test_nothing_is_stored_without_a_previous_sync():
+    s3 = FakeS3Client()
+    publish_diff(s3, "b", KEY, None, envelope("a", [product(1)]))
+    publish_diff(s3, "b", KEY, envelope("a", [product(1)]), envelope("a", [product(1)]))
+    assert s3.objects == {}
+
+
+def test_empty_diff_for_the_current_sync():
+    assert empty_diff("a") == {"since": "a", "synced_at": "a", "added": [], "removed": [], "changed": []}
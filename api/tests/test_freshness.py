@@ -1,7 +1,10 @@
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
-from services.freshness import last_specials_reset, is_stale, parse_synced_at, freshness_report
+from services.freshness import (
+    last_specials_reset, next_specials_reset, seconds_until_next_reset, is_stale,
+    parse_synced_at, freshness_report, cache_control, STALE_MAX_AGE_SECONDS,
+)
 
 SYD = ZoneInfo("Australia/Sydney")
 
@@ -70,3 +73,28 @@ def test_freshness_report_no_data():
     report = freshness_report(None)
     assert report["is_stale"] is True
     assert report["data_age_hours"] is None
+
+
+def test_next_reset_from_thursday():
+    now = datetime(2026, 6, 11, 10, 0, tzinfo=SYD)  # Thursday
+    assert next_specials_reset(now) == datetime(2026, 6, 17, 0, 0, tzinfo=SYD)
+
+
+def test_seconds_until_reset_across_dst_start():
+    # DST starts Sunday 2026-10-04 02:00 → the week is one hour short
+    now = datetime(2026, 9, 30, 0, 0, tzinfo=SYD)  # Wednesday reset, AEST
+    assert seconds_until_next_reset(now) == 7 * 24 * 3600 - 3600
+
+
+def test_fresh_data_cacheable_until_next_reset():
+    now = datetime(2026, 6, 16, 22, 0, tzinfo=SYD)  # Tuesday 22:00
+    data = {"synced_at": "2026-06-10T01:00:00+10:00"}
+    assert cache_control(data, now) == "public, max-age=7200"
+
+
+def test_stale_data_gets_short_max_age_with_swr():
+    now = datetime(2026, 6, 10, 9, 0, tzinfo=SYD)
+    data = {"synced_at": "2026-06-04T10:00:00+10:00"}
+    header = cache_control(data, now)
+    assert f"max-age={STALE_MAX_AGE_SECONDS}" in header
+    assert "stale-while-revalidate=" in header
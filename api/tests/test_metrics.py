@@ -0,0 +1,82 @@
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+
+from services.metrics import MetricsRegistry, R2_REQUEST_DURATION, R2_REQUEST_ERRORS, instrument_s3_client
+
+
+def test_counter_renders_labelled_samples():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    requests.inc(route='/b"')
+
+    text = registry.render()
+    assert "# HELP requests_total Requests.\n# TYPE requests_total counter\n" in text
+    assert 'requests_total{route="/a"} 3\n' in text
+    assert 'requests_total{route="/b\\""} 1\n' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.65" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("things_total", "Things.")
+    assert registry.counter("things_total", "Things.") is first
+
+
+def test_gauge_collector_is_read_at_scrape_time():
+    registry = MetricsRegistry()
+    state = {"running": 0}
+    registry.gauge_collector("running", "Running.", lambda: [({"retailer": "coles"}, state["running"])])
+
+    assert 'running{retailer="coles"} 0' in registry.render()
+    state["running"] = 1
+    assert 'running{retailer="coles"} 1' in registry.render()
+
+
+def test_instrumented_client_times_calls_and_counts_errors():
+    client = boto3.client(
+        "s3", region_name="auto", endpoint_url="https://r2.example.com",
+        aws_access_key_id="k", aws_secret_access_key="s", config=Config(retries={"max_attempts": 0}),
+    )
+    instrument_s3_client(client)
+    before = R2_REQUEST_DURATION.count(operation="HeadObject")
+    missing = R2_REQUEST_ERRORS.value(operation="HeadObject", code="404")
+    errors = R2_REQUEST_ERRORS.value(operation="HeadObject", code="500")
+
+    statuses = iter([200, 404, 500])
+
+    class RawBody:
+        def stream(self):
+            yield b""
+
+    # answer at the HTTP layer so the full call path (and its hooks) runs
+    client.meta.events.register(
+        "before-send.s3",
+        lambda request, **kwargs: AWSResponse(request.url, next(statuses), {"Content-Length": "0"}, RawBody()),
+    )
+    client.head_object(Bucket="b", Key="k")
+    for _ in range(2):
+        try:
+            client.head_object(Bucket="b", Key="k")
+        except client.exceptions.ClientError:
+            pass
+
+    assert R2_REQUEST_DURATION.count(operation="HeadObject") == before + 3
+    # a 404 is an expected answer (negative caching), a 500 is a failure
+    assert R2_REQUEST_ERRORS.value(operation="HeadObject", code="404") == missing
+    assert R2_REQUEST_ERRORS.value(operation="HeadObject", code="500") == errors + 1
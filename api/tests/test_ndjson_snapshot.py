@@ -0,0 +1,148 @@
+import json
+import threading
+
+from services.ndjson_snapshot import (
+    NdjsonSnapshotStore, encode_snapshot, lines_to_json_array, snapshot_keys,
+)
+from tests.conftest import envelope
+from tests.fake_s3 import FakeS3Client
+
+KEY = "/priceline_specials.json"
+
+
+def items(n):
+    return [{"name": f"Item {i}", "price": float(i), "emoji": "½ price"} for i in range(n)]
+
+
+def test_snapshot_keys_sit_next_to_the_envelope():
+    assert snapshot_keys(KEY) == ("/priceline_specials.ndjson", "/priceline_specials.ndjson.idx")
+
+
+def test_offsets_delimit_each_line():
+    body, offsets = encode_snapshot(envelope(products=items(3)))
+    assert len(offsets) == 4 and offsets[-1] == len(body)
+    second = body[offsets[1]:offsets[2]]
+    assert json.loads(second) == {"name": "Item 1", "price": 1.0, "emoji": "½ price"}
+
+
+def test_publish_then_page_from_the_mapping(tmp_path):
+    s3 = FakeS3Client()
+    store = NdjsonSnapshotStore(str(tmp_path))
+    data = envelope(products=items(10))
+    store.publish(s3, "b", KEY, data)
+    assert {"/priceline_specials.ndjson", "/priceline_specials.ndjson.idx"} <= set(s3.objects)
+
+    snapshot = store.get(s3, "b", KEY)
+    assert len(snapshot) == 10
+    assert snapshot.summary["synced_at"] == data["synced_at"]
+    assert json.loads(lines_to_json_array(snapshot.lines(3, 4))) == data["data"][3:7]
+    assert json.loads(lines_to_json_array(snapshot.lines(8, 5))) == data["data"][8:]
+    assert lines_to_json_array(snapshot.lines(50, 5)) == b"[]"
+    assert b"".join(snapshot.iter_chunks(3)).count(b"\n") == 10
+    assert s3.calls.count(("get_object", "/priceline_specials.ndjson")) == 0  # published locally
+
+
+def test_cold_process_downloads_the_mirror_once(tmp_path):
+    s3 = FakeS3Client()
+    NdjsonSnapshotStore(str(tmp_path / "publisher")).publish(s3, "b", KEY, envelope(products=items(4)))
+
+    store = NdjsonSnapshotStore(str(tmp_path / "reader"))
+    snapshot = store.get(s3, "b", KEY)
+    assert len(snapshot) == 4 and snapshot.summary["crawl_status"] == "success"
+    assert store.get(s3, "b", KEY) is snapshot
+    assert s3.calls.count(("get_object", "/priceline_specials.ndjson")) == 1
+
+
+def test_persisted_mirror_is_revalidated_by_etag(tmp_path):
+    s3 = FakeS3Client()
+    NdjsonSnapshotStore(str(tmp_path)).publish(s3, "b", KEY, envelope(products=items(4)))
+
+    # a restarted process trusts its mirror after a HEAD
+    restarted = NdjsonSnapshotStore(str(tmp_path))
+    assert len(restarted.get(s3, "b", KEY)) == 4
+    assert ("head_object", "/priceline_specials.ndjson") in s3.calls
+    assert ("get_object", "/priceline_specials.ndjson") not in s3.calls
+
+    # ...but re-downloads when R2 has moved on
+    NdjsonSnapshotStore(str(tmp_path / "elsewhere")).publish(s3, "b", KEY, envelope(products=items(6)))
+    assert len(NdjsonSnapshotStore(str(tmp_path)).get(s3, "b", KEY)) == 6
+
+
+def test_missing_snapshot_is_cached_negatively(tmp_path, clock):
+    s3 = FakeS3Client()
+    store = NdjsonSnapshotStore(str(tmp_path), clock=clock)
+    assert store.get(s3, "b", KEY) is None
+    assert store.get(s3, "b", KEY) is None
+    assert s3.calls.count(("get_object", "/priceline_specials.ndjson")) == 1
+
+    store.publish(s3, "b", KEY, envelope(products=items(2)))
+    assert len(store.get(s3, "b", KEY)) == 2
+
+
+def test_no_directory_means_no_snapshot():
+    s3 = FakeS3Client()
+    store = NdjsonSnapshotStore()
+    store.publish(s3, "b", KEY, envelope(products=items(2)))
+    assert store.get(s3, "b", KEY) is None
+
+
+def test_empty_feed(tmp_path):
+    store = NdjsonSnapshotStore(str(tmp_path))
+    s3 = FakeS3Client()
+    store.publish(s3, "b", KEY, envelope(products=items(0)))
+    snapshot = store.get(s3, "b", KEY)
+    assert len(snapshot) == 0 and lines_to_json_array(snapshot.lines(0, 10)) == b"[]"
+
+
+def test_open_mapping_is_revalidated_against_r2(tmp_path, clock):
+    s3 = FakeS3Client()
+    NdjsonSnapshotStore(str(tmp_path / "publisher")).publish(s3, "b", KEY, envelope(products=items(4)))
+    store = NdjsonSnapshotStore(str(tmp_path / "reader"), clock=clock)
+    snapshot = store.get(s3, "b", KEY)
+
+    # another machine publishes; within the window the open mapping is served
+    NdjsonSnapshotStore(str(tmp_path / "publisher")).publish(s3, "b", KEY, envelope(products=items(6)))
+    assert store.get(s3, "b", KEY) is snapshot
+
+    clock.now += 61
+    assert len(store.get(s3, "b", KEY)) == 6
+    heads = s3.calls.count(("head_object", "/priceline_specials.ndjson"))
+    # an unchanged object costs one HEAD per window and no download
+    clock.now += 61
+    assert len(store.get(s3, "b", KEY)) == 6
+    assert s3.calls.count(("head_object", "/priceline_specials.ndjson")) == heads + 1
+    assert s3.calls.count(("get_object", "/priceline_specials.ndjson")) == 2
+
+    s3.delete_object(Bucket="b", Key="/priceline_specials.ndjson")
+    clock.now += 61
+    assert store.get(s3, "b", KEY) is None
+
+
+def test_a_slow_download_does_not_hold_up_other_retailers(tmp_path):
+    s3 = FakeS3Client()
+    other_key = "/woolies_specials.json"
+    publisher = NdjsonSnapshotStore(str(tmp_path / "publisher"))
+    publisher.publish(s3, "b", KEY, envelope(products=items(4)))
+    publisher.publish(s3, "b", other_key, envelope(products=items(2)))
+
+    started, release = threading.Event(), threading.Event()
+    read = s3.get_object
+
+    def slow_get(**kwargs):
+        if kwargs["Key"] == "/priceline_specials.ndjson":
+            started.set()
+            release.wait(5)
+        return read(**kwargs)
+    s3.get_object = slow_get
+
+    store = NdjsonSnapshotStore(str(tmp_path / "reader"))
+    slow = threading.Thread(target=store.get, args=(s3, "b", KEY))
+    slow.start()
+    try:
+        assert started.wait(5)
+        assert len(store.get(s3, "b", other_key)) == 2
+        assert slow.is_alive()  # served while the other download was in flight
+    finally:
+        release.set()
+        slow.join()
+    assert len(store.get(s3, "b", KEY)) == 4
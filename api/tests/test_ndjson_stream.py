@@ -0,0 +1,35 @@
+import json
+
+from services.ndjson_stream import iter_ndjson, ndjson_headers
+
+
+def test_one_product_per_line_in_batches():
+    products = [{"name": f"p{i}", "price": float(i)} for i in range(5)]
+    chunks = list(iter_ndjson(products, batch=2))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).splitlines()
+    assert [json.loads(line) for line in lines] == products
+
+
+def test_first_batch_is_yielded_before_the_rest_is_encoded():
+    consumed = []
+
+    def products():
+        for i in range(100):
+            consumed.append(i)
+            yield {"name": f"p{i}"}
+
+    stream = iter_ndjson(products(), batch=10)
+    first = next(stream)
+    assert first.count(b"\n") == 10
+    assert len(consumed) == 10
+
+
+def test_empty_feed_streams_nothing():
+    assert list(iter_ndjson([])) == []
+
+
+def test_headers_carry_envelope_metadata():
+    assert ndjson_headers({"synced_at": "2026-10-14T00:00:00+00:00", "count": 3, "data": []}) == {
+        "X-Synced-At": "2026-10-14T00:00:00+00:00", "X-Product-Count": "3",
+    }
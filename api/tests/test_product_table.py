@@ -0,0 +1,101 @@
+import pytest
+
+from services.product_table import ProductTable, ProductTableCache, CursorError
+
+
+def product(name, price, price_was, discount_type, retailer="Coles"):
+    return {"name": name, "price": price, "price_was": price_was,
+            "discount_type": discount_type, "retailer": retailer}
+
+
+def envelopes():
+    return {
+        "coles": {"synced_at": "2026-10-14T00:00:00+00:00", "data": [
+            product("Crackers", 2.0, 4.0, "half_price"),
+            product("Coffee", 9.0, 30.0, "beyond_half"),
+            product("Milk", 3.0, 3.0, None),
+        ]},
+        "woolies": {"synced_at": "2026-10-14T00:00:00+00:00", "data": [
+            product("Cheese", 8.0, 10.0, "discount", "Woolworths"),
+            product("Bread", 1.5, 3.0, "half_price", "Woolworths"),
+        ]},
+        "priceline": None,
+    }
+
+
+def names(table, indices):
+    return [p["name"] for p in table.rows(indices)]
+
+
+def test_filters_combine():
+    table = ProductTable(envelopes())
+    page, total = table.query(retailers=["woolies"], discount_types=["half_price"])
+    assert names(table, page) == ["Bread"] and total == 1
+
+    page, total = table.query(min_price=2.0, max_price=8.0)
+    assert names(table, page) == ["Crackers", "Milk", "Cheese"] and total == 3
+
+    page, _ = table.query(min_fraction=0.5)
+    assert sorted(names(table, page)) == ["Bread", "Coffee", "Crackers"]
+
+
+def test_sort_keys_and_direction():
+    table = ProductTable(envelopes())
+    assert names(table, table.query(sort="saving", descending=True)[0])[:2] == ["Coffee", "Crackers"]
+    assert names(table, table.query(sort="fraction", descending=True)[0])[0] == "Coffee"
+    assert names(table, table.query(sort="price")[0]) == ["Bread", "Crackers", "Milk", "Cheese", "Coffee"]
+
+
+def test_no_discount_counts_as_zero_saving_and_fraction():
+    table = ProductTable(envelopes())
+    page, _ = table.query(max_fraction=0.0)
+    assert names(table, page) == ["Milk"]
+
+
+def test_pagination_with_cursor():
+    table = ProductTable(envelopes())
+    page, total = table.query(limit=2)
+    assert total == 5 and len(page) == 2
+    offset = table.decode_cursor(table.encode_cursor(2))
+    rest, _ = table.query(offset=offset, limit=10)
+    assert names(table, page) + names(table, rest) == names(table, table.query(limit=10)[0])
+
+
+def test_cursor_from_older_version_is_rejected():
+    old = ProductTable(envelopes())
+    changed = envelopes()
+    changed["coles"]["synced_at"] = "2026-10-21T00:00:00+00:00"
+    new = ProductTable(changed)
+    with pytest.raises(CursorError, match="older data version"):
+        new.decode_cursor(old.encode_cursor(2))
+    with pytest.raises(CursorError):
+        new.decode_cursor("not-a-cursor")
+
+
+def test_table_rebuilt_only_when_an_envelope_changes():
+    cache = ProductTableCache()
+    current = envelopes()
+    table = cache.get(current)
+    assert cache.get(dict(current)) is table
+    current["woolies"] = dict(current["woolies"])
+    assert cache.get(current) is not table
+
+
+def test_missing_price_fails_price_filters_and_sorts_last():
+    current = envelopes()
+    current["priceline"] = {"synced_at": "2026-10-14T00:00:00+00:00", "data": [
+        product("Mystery", None, 5.0, None, "Priceline"),
+    ]}
+    table = ProductTable(current)
+    assert "Mystery" not in names(table, table.query(max_price=100.0)[0])
+    assert names(table, table.query(sort="price")[0])[-1] == "Mystery"
+    assert names(table, table.query(sort="price", descending=True)[0])[-1] == "Mystery"
+    assert names(table, table.query(sort="saving", descending=True)[0])[-1] == "Mystery"
+
+
+async def test_fetch_builds_off_the_loop_and_reuses_the_table():
+    cache = ProductTableCache()
+    current = envelopes()
+    table = await cache.fetch(current)
+    assert len(table) == 5
+    assert await cache.fetch(dict(current)) is table
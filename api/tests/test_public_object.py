@@ -0,0 +1,56 @@
+import gzip
+
+import pytest
+
+from services.public_envelope import EncodedEnvelope
+from services.public_object import PublicObjectCache, public_key
+from tests.conftest import envelope, gets
+from tests.fake_s3 import FakeS3Client
+
+KEY = "/priceline_specials.json"
+
+
+def test_public_key_sits_next_to_the_envelope():
+    assert public_key(KEY) == "/priceline_specials.public.json"
+
+
+def test_publish_stores_the_gzipped_frozen_body():
+    s3 = FakeS3Client()
+    data = envelope()
+    PublicObjectCache().publish(s3, "b", KEY, data)
+
+    stored = s3.objects["/priceline_specials.public.json"]
+    encoded = EncodedEnvelope(data)
+    assert gzip.decompress(stored["Body"]) == encoded.body
+    assert stored["ContentEncoding"] == "gzip"
+    assert stored["Metadata"]["json-etag"] == encoded.etag
+    assert stored["Metadata"]["synced-at"] == data["synced_at"]
+
+
+def test_read_serves_stored_bytes_with_summary_from_metadata():
+    s3 = FakeS3Client()
+    cache = PublicObjectCache()
+    data = envelope()
+    cache.publish(s3, "b", KEY, data)
+
+    body = cache.get(s3, "b", KEY)
+    assert body.gzip()[0] is not None and body.gzip()[0] == s3.objects[public_key(KEY)]["Body"]
+    assert body.summary == {"synced_at": data["synced_at"], "crawl_status": "success", "count": 1}
+    assert body.body == EncodedEnvelope(data).body
+    assert cache.get(s3, "b", KEY) is body
+    assert len(gets(s3)) == 1
+
+
+def test_failed_publish_removes_the_outdated_projection():
+    s3 = FakeS3Client()
+    cache = PublicObjectCache()
+    cache.publish(s3, "b", KEY, envelope())
+    assert cache.get(s3, "b", KEY) is not None
+
+    def failing_put(**kwargs):
+        raise OSError("R2 unavailable")
+    s3.put_object = failing_put
+    with pytest.raises(OSError):
+        cache.publish(s3, "b", KEY, envelope("2026-10-21T00:00:00+00:00"))
+    assert public_key(KEY) not in s3.objects
+    assert cache.get(s3, "b", KEY) is None
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from services.refresh_events import RefreshEvents
+
+
+def parse(chunk: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+@pytest.mark.asyncio
+async def test_subscribers_receive_published_refreshes():
+    events = RefreshEvents()
+    first, second = events.stream(), events.stream()
+    assert (await anext(first)).startswith(b"retry: ")
+    assert (await anext(second)).startswith(b"retry: ")
+    assert len(events) == 2
+
+    events.publish("woolies", "2026-10-14T00:00:00+00:00")
+    for stream in (first, second):
+        event = parse(await anext(stream))
+        assert event["event"] == "refresh"
+        assert event["data"] == {"retailer": "woolies", "synced_at": "2026-10-14T00:00:00+00:00"}
+    await first.aclose()
+    await second.aclose()
+    assert len(events) == 0
+
+
+@pytest.mark.asyncio
+async def test_idle_stream_sends_heartbeats_and_ends():
+    events = RefreshEvents()
+    stream = events.stream(heartbeat_seconds=0.01, max_seconds=0.05)
+    chunks = [chunk async for chunk in stream]
+    assert chunks[0].startswith(b"retry: ")
+    assert b": keepalive\n\n" in chunks[1:]
+    assert len(events) == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_keeps_the_latest_events():
+    events = RefreshEvents()
+    stream = events.stream()
+    await anext(stream)
+    for i in range(40):
+        events.publish("coles", f"sync-{i}")
+    received = [parse(await anext(stream))["data"]["synced_at"] for _ in range(16)]
+    assert received[-1] == "sync-39"
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_many_idle_subscribers():
+    events = RefreshEvents()
+    streams = [events.stream() for _ in range(500)]
+    for stream in streams:
+        await anext(stream)
+    waiting = [asyncio.ensure_future(anext(stream)) for stream in streams]
+    await asyncio.sleep(0)
+    events.publish("priceline", "now")
+    results = await asyncio.gather(*waiting)
+    assert all(parse(chunk)["data"]["retailer"] == "priceline" for chunk in results)
+    for stream in streams:
+        await stream.aclose()
@@ -2,6 +2,7 @@ import asyncio
 
 import pytest
 
+from services.metrics import CRAWL_PAGES, CRAWL_PRODUCTS, CRAWL_RUNS, REFRESH_REJECTED, REFRESH_TRIGGERS
 from services.refresh_manager import RefreshManager
 
 
@@ -9,8 +10,10 @@ from services.refresh_manager import RefreshManager
 def _reset_global_active():
     # The global single-flight slot is class-level; reset it around each test.
     RefreshManager._global_active = None
+    RefreshManager._queued = []
     yield
     RefreshManager._global_active = None
+    RefreshManager._queued = []
 
 
 @pytest.mark.asyncio
@@ -136,3 +139,109 @@ async def test_shutdown_cancels_running_task():
     await asyncio.sleep(0.01)
     await mgr.shutdown()
     assert mgr.is_running is False
+
+
+@pytest.mark.asyncio
+async def test_queued_refresh_starts_when_global_slot_frees():
+    release = asyncio.Event()
+    b_calls = []
+
+    async def slow_a():
+        await release.wait()
+        return {"ok": True}
+
+    async def sync_b():
+        b_calls.append(1)
+        return {"ok": True}
+
+    a = RefreshManager("a", slow_a, cooldown_seconds=0)
+    b = RefreshManager("b", sync_b, cooldown_seconds=0)
+    assert a.trigger_if_needed(stale=True) is True
+    assert b.trigger_if_needed(stale=True, queue=True) is False
+    assert b.status()["refresh_queued"] is True
+    assert b.trigger_if_needed(stale=True, queue=True) is False  # not queued twice
+    assert RefreshManager._queued == [b]
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert b_calls == [1]
+    assert RefreshManager._queued == []
+
+
+@pytest.mark.asyncio
+async def test_unqueued_trigger_is_not_remembered():
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+
+    a = RefreshManager("a", slow, cooldown_seconds=0)
+    b = RefreshManager("b", slow, cooldown_seconds=0)
+    a.trigger_if_needed(stale=True)
+    assert b.trigger_if_needed(stale=True) is False
+    assert RefreshManager._queued == []
+    release.set()
+    await asyncio.sleep(0.01)
+    assert b.is_running is False
+
+
+@pytest.mark.asyncio
+async def test_shutdown_does_not_start_queued_crawls():
+    release = asyncio.Event()
+    b_calls = []
+
+    async def slow_a():
+        await release.wait()
+
+    async def sync_b():
+        b_calls.append(1)
+
+    a = RefreshManager("a", slow_a, cooldown_seconds=0)
+    b = RefreshManager("b", sync_b, cooldown_seconds=0)
+    a.trigger_if_needed(stale=True)
+    b.trigger_if_needed(stale=True, queue=True)
+    await asyncio.sleep(0.01)
+    await a.shutdown()
+    await asyncio.sleep(0.01)
+    assert b_calls == []
+    assert RefreshManager._queued == []
+
+
+@pytest.mark.asyncio
+async def test_completed_refresh_with_new_data_is_announced(monkeypatch):
+    from services import refresh_manager
+
+    published = []
+    monkeypatch.setattr(refresh_manager.refresh_events, "publish", lambda *args: published.append(args))
+
+    async def sync_ok():
+        return {"synced_at": "2026-10-14T00:00:00+00:00", "data": []}
+
+    async def sync_failed():
+        return None
+
+    ok = RefreshManager("woolies", sync_ok, cooldown_seconds=0)
+    ok.trigger_if_needed(stale=True)
+    await ok._task
+    failed = RefreshManager("coles", sync_failed, cooldown_seconds=0)
+    failed.trigger_if_needed(stale=True)
+    await failed._task
+    assert published == [("woolies", "2026-10-14T00:00:00+00:00")]
+
+
+@pytest.mark.asyncio
+async def test_refreshes_are_counted_in_metrics():
+    async def sync():
+        return {"count": 3, "pages_attempted": 2, "pages_succeeded": 1, "pages_blocked": 1}
+
+    mgr = RefreshManager("metrics-test", sync, cooldown_seconds=60)
+    assert mgr.trigger_if_needed(stale=True) is True
+    await asyncio.sleep(0.01)
+    assert mgr.trigger_if_needed(stale=True) is False
+
+    assert REFRESH_TRIGGERS.value(retailer="metrics-test") == 1
+    assert REFRESH_REJECTED.value(retailer="metrics-test", reason="cooldown") == 1
+    assert CRAWL_RUNS.value(retailer="metrics-test", outcome="success") == 1
+    assert CRAWL_PAGES.value(retailer="metrics-test", result="blocked") == 1
+    assert CRAWL_PRODUCTS.value(retailer="metrics-test") == 3
+    assert 0 < mgr.cooldown_remaining() <= 60
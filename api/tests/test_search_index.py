@@ -0,0 +1,75 @@
+from services.search_index import SearchIndex, tokenize
+from tests.conftest import envelope
+
+
+def product(name, price=5.0, price_was=10.0):
+    return {"name": name, "price": price, "price_was": price_was}
+
+
+def names(products):
+    return [p["name"] for p in products]
+
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("Cadbury Dairy-Milk Chocolate 180g") == ["cadbury", "dairy", "milk", "chocolate", "180g"]
+
+
+def test_prefix_and_exact_matches_rank_above_partial():
+    index = SearchIndex()
+    index.sync({"coles": envelope(products=[product("Milk Chocolate Block"), product("Full Cream Milk"),
+                                            product("Chocolate Biscuits")])})
+    results, total = index.search("milk choc")
+    assert total == 3
+    assert names(results)[0] == "Milk Chocolate Block"      # both terms
+    assert names(results)[1] == "Full Cream Milk"           # exact "milk" beats prefix "choc"
+
+
+def test_single_character_terms_match_whole_tokens_only():
+    index = SearchIndex()
+    index.sync({"coles": envelope(products=[product("Vitamin C Tablets"), product("Corn Chips")])})
+    assert names(index.search("c")[0]) == ["Vitamin C Tablets"]
+
+
+def test_ties_break_on_discount_and_retailer_filter():
+    index = SearchIndex()
+    index.sync({
+        "coles": envelope(products=[product("Coffee Beans", 8.0, 10.0)]),
+        "woolies": envelope(products=[product("Coffee Pods", 3.0, 10.0)]),
+    })
+    assert names(index.search("coffee")[0]) == ["Coffee Pods", "Coffee Beans"]
+    assert names(index.search("coffee", retailers=["coles"])[0]) == ["Coffee Beans"]
+    assert index.search("tea") == ([], 0)
+
+
+def test_publish_rebuilds_only_the_changed_retailer():
+    index = SearchIndex()
+    coles, woolies = envelope(products=[product("Bread")]), envelope(products=[product("Butter")])
+    index.sync({"coles": coles, "woolies": woolies})
+    woolies_segment = index._segments["woolies"]
+
+    index.sync({"coles": envelope(products=[product("Brioche")]), "woolies": woolies})
+    assert index._segments["woolies"] is woolies_segment
+    assert names(index.search("bri")[0]) == ["Brioche"]
+    assert index.search("bread")[1] == 0
+
+
+def test_tokenize_keeps_non_ascii_letters_and_folds_accents():
+    assert tokenize("Café Crème BRÛLÉE") == ["cafe", "creme", "brulee"]
+    assert tokenize("Straße_Brot") == ["strasse", "brot"]
+
+
+def test_accented_names_match_plain_queries():
+    index = SearchIndex()
+    index.sync({"woolies": envelope(products=[{"name": "Crème Fraîche 200ml", "price": 3.0, "price_was": 4.0}])})
+    products, total = index.search("creme fraiche")
+    assert total == 1 and products[0]["name"] == "Crème Fraîche 200ml"
+
+
+async def test_fetch_rebuilds_off_the_loop_only_when_needed():
+    index = SearchIndex()
+    envelopes = {"woolies": envelope(products=[{"name": "Milk", "price": 2.0, "price_was": 4.0}])}
+    await index.fetch(envelopes)
+    assert index.is_current(envelopes)
+    segment = index._segments["woolies"]
+    await index.fetch(dict(envelopes))
+    assert index._segments["woolies"] is segment
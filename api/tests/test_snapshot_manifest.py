@@ -0,0 +1,208 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from services.envelope_cache import EnvelopeCache, compress_envelope
+from services.snapshot_manifest import SnapshotManifest, content_hash, snapshot_key
+from tests.conftest import envelope
+from tests.fake_s3 import FakeS3Client
+
+KEY = "/priceline_specials.json"
+
+
+def publish(s3, manifest, data):
+    """What a crawler's save_snapshot does, minus the derived objects."""
+    digest = content_hash(data)
+    key = snapshot_key(KEY, digest)
+    s3.put_object(Bucket="b", Key=key, Body=compress_envelope(data))
+    manifest.point(s3, "b", "priceline", digest, key, data)
+    return digest
+
+
+class RecordingCache(EnvelopeCache):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.invalidated = []
+
+    def invalidate(self, key):
+        self.invalidated.append(key)
+        super().invalidate(key)
+
+
+@pytest.fixture
+def s3():
+    return FakeS3Client()
+
+
+@pytest.fixture
+def manifest():
+    return SnapshotManifest(cache=EnvelopeCache())
+
+
+def test_hash_covers_products_not_crawl_fields():
+    first = envelope("2026-10-14T00:00:00+00:00")
+    again = envelope("2026-10-15T00:00:00+00:00", crawl_status="partial")
+    repriced = envelope("2026-10-15T00:00:00+00:00", [{"name": "Milk", "price": 1.5}])
+
+    assert content_hash(first) == content_hash(again)
+    assert content_hash(first) != content_hash(repriced)
+    assert snapshot_key(KEY, "abc") == "/priceline_specials.abc.json"
+
+
+def test_resolve_reads_the_snapshot_the_manifest_points_at(s3, manifest):
+    data = envelope("2026-10-14T00:00:00+00:00")
+    digest = publish(s3, manifest, data)
+
+    assert manifest.resolve(s3, "b", "priceline", KEY) == data
+    assert manifest.summary(s3, "b", "priceline") == {
+        "synced_at": data["synced_at"], "crawl_status": "success", "count": 1,
+        "snapshot_synced_at": data["synced_at"], "hash": digest,
+    }
+
+
+def test_before_the_first_entry_reads_fall_back_to_the_fixed_key(s3, manifest):
+    data = envelope("2026-10-14T00:00:00+00:00")
+    s3.put_object(Bucket="b", Key=KEY, Body=compress_envelope(data))
+
+    assert manifest.summary(s3, "b", "priceline") is None
+    assert manifest.resolve(s3, "b", "priceline", KEY) == data
+    assert manifest.derived_summary(s3, "b", "priceline", {"synced_at": "anything"}) == {"synced_at": "anything"}
+
+
+def test_unchanged_recrawl_moves_synced_at_without_a_snapshot_write(s3, manifest):
+    first = envelope("2026-10-14T00:00:00+00:00")
+    digest = publish(s3, manifest, first)
+    again = envelope("2026-10-15T00:00:00+00:00", crawl_status="partial")
+    assert manifest.unchanged(s3, "b", "priceline", content_hash(again))
+
+    puts = len(s3.calls)
+    manifest.record_crawl(s3, "b", "priceline", again)
+    assert [c for c in s3.calls[puts:] if c[0] == "put_object"] == [("put_object", manifest.key)]
+
+    resolved = manifest.resolve(s3, "b", "priceline", KEY)
+    assert resolved["synced_at"] == again["synced_at"]
+    assert resolved["crawl_status"] == "partial"
+    assert resolved["data"] == first["data"]
+    # the patched copy is reused until the manifest changes
+    assert manifest.resolve(s3, "b", "priceline", KEY) is resolved
+
+    summary = manifest.summary(s3, "b", "priceline")
+    assert summary["hash"] == digest
+    assert summary["snapshot_synced_at"] == first["synced_at"]
+    # objects stamped with a sync match on synced_at...
+    assert manifest.derived_summary(s3, "b", "priceline", {"synced_at": first["synced_at"]}) is None
+    assert manifest.derived_summary(s3, "b", "priceline", {"synced_at": again["synced_at"]}) is not None
+    # ...and ones stamped with a content hash match on the products
+    derived = manifest.derived_summary(s3, "b", "priceline", {"synced_at": first["synced_at"], "hash": digest})
+    assert derived["synced_at"] == again["synced_at"] and derived["crawl_status"] == "partial"
+    assert manifest.derived_summary(s3, "b", "priceline", {"synced_at": again["synced_at"], "hash": "other"}) is None
+
+
+def test_rollback_flips_the_pointer_back(s3, manifest):
+    first = envelope("2026-10-07T00:00:00+00:00")
+    old = publish(s3, manifest, first)
+    new = publish(s3, manifest, envelope("2026-10-14T00:00:00+00:00", [{"name": "Milk", "price": 9.0}]))
+
+    puts = len(s3.calls)
+    entry = manifest.rollback(s3, "b", "priceline")
+    assert [c for c in s3.calls[puts:] if c[0] == "put_object"] == [("put_object", manifest.key)]
+    assert entry["hash"] == old
+    assert manifest.resolve(s3, "b", "priceline", KEY) == first
+    # and forward again by hash
+    assert manifest.rollback(s3, "b", "priceline", new)["hash"] == new
+
+    with pytest.raises(LookupError):
+        manifest.rollback(s3, "b", "priceline", "0000000000000000")
+
+
+def test_history_is_bounded_and_evicted_snapshots_deleted(s3):
+    manifest = SnapshotManifest(cache=EnvelopeCache(), history_length=2)
+    keys = []
+    for week in range(1, 5):
+        data = envelope(f"2026-10-0{week}T00:00:00+00:00", [{"name": "Milk", "price": float(week)}])
+        keys.append(snapshot_key(KEY, publish(s3, manifest, data)))
+
+    entry = manifest.entry(s3, "b", "priceline")
+    assert [h["snapshot"] for h in entry["history"]] == [keys[2], keys[1]]
+    assert keys[0] not in s3.objects
+    assert all(key in s3.objects for key in keys[1:])
+
+
+def test_snapshots_are_read_once_and_dropped_when_superseded(s3, clock):
+    cache = RecordingCache(clock=clock)
+    manifest = SnapshotManifest(cache=cache, history_length=1)
+    keys = []
+    for price in (1.0, 2.0):
+        data = envelope("2026-10-14T00:00:00+00:00", [{"name": "Milk", "price": price}])
+        keys.append(snapshot_key(KEY, publish(s3, manifest, data)))
+        manifest.resolve(s3, "b", "priceline", KEY)
+    assert keys[0] in cache.invalidated
+
+    # a snapshot never changes, so only the manifest is revalidated
+    clock.now += 3600
+    s3.calls.clear()
+    manifest.resolve(s3, "b", "priceline", KEY)
+    assert ("get_object", keys[1]) not in s3.calls
+
+    # another machine publishes: resolving its snapshot drops ours
+    other = SnapshotManifest(cache=EnvelopeCache(), history_length=1)
+    publish(s3, other, envelope("2026-10-15T00:00:00+00:00", [{"name": "Milk", "price": 3.0}]))
+    clock.now += 3600
+    cache.invalidated.clear()
+    manifest.resolve(s3, "b", "priceline", KEY)
+    assert cache.invalidated == [keys[1]]
+
+
+def test_evicted_snapshots_are_dropped_from_the_cache(s3):
+    cache = RecordingCache()
+    manifest = SnapshotManifest(cache=cache, history_length=1)
+    first = snapshot_key(KEY, publish(s3, manifest, envelope("2026-10-01T00:00:00+00:00")))
+    second = snapshot_key(KEY, publish(s3, manifest, envelope("2026-10-08T00:00:00+00:00", [])))
+    manifest.rollback(s3, "b", "priceline")
+    cache.invalidated.clear()
+
+    # the rolled-back snapshot is evicted from the history, not superseded
+    publish(s3, manifest, envelope("2026-10-15T00:00:00+00:00", [{"name": "Bread", "price": 3.0}]))
+    assert cache.invalidated == [manifest.key, first, second]
+    assert second not in s3.objects
+
+
+def test_a_concurrent_manifest_write_is_retried_not_overwritten(s3, manifest):
+    publish(s3, manifest, envelope("2026-10-07T00:00:00+00:00"))
+    other = SnapshotManifest(cache=EnvelopeCache())
+    read = s3.get_object
+    raced = []
+
+    def get_object(**kwargs):
+        response = read(**kwargs)
+        if kwargs["Key"] == manifest.key and not raced:
+            # another machine publishes between this read and the put
+            raced.append(True)
+            data = envelope("2026-10-14T00:00:00+00:00")
+            other.point(s3, "b", "woolies", content_hash(data), "/woolies.json", data)
+        return response
+
+    s3.get_object = get_object
+    s3.calls.clear()
+    publish(s3, manifest, envelope("2026-10-14T00:00:00+00:00", [{"name": "Milk", "price": 1.5}]))
+
+    retailers = manifest.load(s3, "b")["retailers"]
+    assert set(retailers) == {"priceline", "woolies"}
+    assert len(retailers["priceline"]["history"]) == 1
+    # woolies' put, the one it beat, and the retry
+    assert s3.calls.count(("put_object", manifest.key)) == 3
+
+
+def test_manifest_write_gives_up_after_repeated_conflicts(s3, manifest, monkeypatch):
+    monkeypatch.setattr("services.snapshot_manifest.WRITE_ATTEMPTS", 2)
+    read = s3.get_object
+
+    def get_object(**kwargs):
+        response = read(**kwargs)
+        if kwargs["Key"] == manifest.key:
+            s3.put_object(Bucket="b", Key=manifest.key, Body=response["Body"].getvalue() + b" ")
+        return response
+
+    publish(s3, manifest, envelope("2026-10-07T00:00:00+00:00"))
+    s3.get_object = get_object
+    with pytest.raises(ClientError):
+        manifest.record_crawl(s3, "b", "priceline", envelope("2026-10-14T00:00:00+00:00"))
@@ -0,0 +1,98 @@
+import json
+import os
+
+from botocore.exceptions import EndpointConnectionError
+
+from services.envelope_cache import EnvelopeCache
+from services.snapshot_store import LocalSnapshotStore
+from tests.conftest import envelope as crawl_envelope
+from tests.fake_s3 import FakeS3Client
+
+KEY = "/home/crawlers/test_specials.json"
+
+
+def envelope(synced_at: str) -> bytes:
+    return json.dumps(crawl_envelope(synced_at, [{"name": "Tea", "price": 2.5}])).encode()
+
+
+def test_round_trip(tmp_path):
+    store = LocalSnapshotStore(str(tmp_path))
+    store.write(KEY, envelope("t1"), '"abc"')
+    data, etag = store.read(KEY)
+    assert data["data"][0] == {"name": "Tea", "price": 2.5}
+    assert etag == '"abc"'
+    assert [p.suffix for p in tmp_path.iterdir()] == [".snap"]  # no temp files left
+
+
+def test_missing_and_corrupt_snapshots_read_as_none(tmp_path):
+    store = LocalSnapshotStore(str(tmp_path))
+    assert store.read(KEY) is None
+    with open(store.path_for(KEY), "wb") as f:
+        f.write(b'"abc"\n{not json')
+    assert store.read(KEY) is None
+    assert not os.path.exists(store.path_for(KEY))
+
+
+def test_eviction_keeps_footprint_bounded(tmp_path):
+    body = envelope("t1")
+    store = LocalSnapshotStore(str(tmp_path), max_bytes=len(body) * 2 + 40)
+    for i in range(4):
+        store.write(f"/k{i}.json", body, '"e"')
+        os.utime(store.path_for(f"/k{i}.json"), (1000 + i, 1000 + i))
+    assert store.read("/k3.json") is not None  # newest survives
+    assert store.read("/k0.json") is None  # oldest evicted
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= store.max_bytes
+
+
+def cache_with_disk(tmp_path, background=None):
+    cache = EnvelopeCache(background=background)
+    cache.attach_disk(LocalSnapshotStore(str(tmp_path)))
+    return cache
+
+
+def test_r2_reads_are_mirrored_to_disk(tmp_path):
+    s3 = FakeS3Client()
+    s3.put_object(Bucket="b", Key=KEY, Body=envelope("t1"))
+    cache_with_disk(tmp_path).load(s3, "b", KEY)
+    data, etag = LocalSnapshotStore(str(tmp_path)).read(KEY)
+    assert data["synced_at"] == "t1"
+    assert etag == s3.objects[KEY]["ETag"]
+
+
+def test_cold_process_serves_disk_then_revalidates(tmp_path):
+    s3 = FakeS3Client()
+    s3.put_object(Bucket="b", Key=KEY, Body=envelope("t1"))
+    cache_with_disk(tmp_path).load(s3, "b", KEY)
+
+    # "restart": new memory tier, same disk; R2 has moved on meanwhile
+    s3.put_object(Bucket="b", Key=KEY, Body=envelope("t2"))
+    pending = []
+    cold = cache_with_disk(tmp_path, background=pending.append)
+    assert cold.load(s3, "b", KEY)["synced_at"] == "t1"  # served instantly from disk
+    assert len(pending) == 1
+    pending[0]()  # the background revalidation
+    assert cold.load(s3, "b", KEY)["synced_at"] == "t2"
+
+
+def test_r2_brownout_still_serves_disk_snapshot(tmp_path):
+    s3 = FakeS3Client()
+    s3.put_object(Bucket="b", Key=KEY, Body=envelope("t1"))
+    cache_with_disk(tmp_path).load(s3, "b", KEY)
+
+    def down(**kwargs):
+        raise EndpointConnectionError(endpoint_url="https://r2.invalid")
+    s3.get_object = down
+    pending = []
+    cold = cache_with_disk(tmp_path, background=pending.append)
+    assert cold.load(s3, "b", KEY)["synced_at"] == "t1"
+    pending[0]()  # revalidation fails quietly
+    assert cold.load(s3, "b", KEY)["synced_at"] == "t1"
+
+
+def test_invalidate_drops_disk_snapshot(tmp_path):
+    s3 = FakeS3Client()
+    s3.put_object(Bucket="b", Key=KEY, Body=envelope("t1"))
+    cache = cache_with_disk(tmp_path)
+    cache.load(s3, "b", KEY)
+    cache.invalidate(KEY)
+    assert LocalSnapshotStore(str(tmp_path)).read(KEY) is None
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import storage_io
+from services.storage_io import run_storage_io, SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_storage_calls_run_off_the_event_loop():
+    loop_thread = threading.current_thread().name
+    ran_on = await run_storage_io(lambda: threading.current_thread().name)
+    assert ran_on != loop_thread
+    assert ran_on.startswith("r2-io")
+
+
+@pytest.mark.asyncio
+async def test_blocking_storage_call_does_not_stall_the_loop():
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    # a slow R2 round trip must not stop other coroutines making progress
+    await asyncio.gather(run_storage_io(time.sleep, 0.1), ticker())
+    assert len(ticks) == 5
+
+
+@pytest.mark.asyncio
+async def test_pool_is_bounded():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+
+    await asyncio.gather(*(run_storage_io(call) for _ in range(storage_io.MAX_STORAGE_WORKERS * 3)))
+    assert max(peak) <= storage_io.MAX_STORAGE_WORKERS
+
+
+@pytest.mark.asyncio
+async def test_exceptions_propagate_to_the_awaiting_coroutine():
+    def boom():
+        raise RuntimeError("r2 down")
+
+    with pytest.raises(RuntimeError, match="r2 down"):
+        await run_storage_io(boom)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_of_one_key_share_a_single_load():
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"count": 1}
+
+    flight = SingleFlight()
+    results = await asyncio.gather(*(flight.do("k", run_storage_io, load) for _ in range(10)))
+    assert calls == [1]
+    assert all(r is results[0] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_coalesced():
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    flight = SingleFlight()
+    assert await asyncio.gather(flight.do("a", load, "a"), flight.do("b", load, "b")) == ["a", "b"]
+    assert sorted(calls) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_completed_load_is_not_reused():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    flight = SingleFlight()
+    assert await flight.do("k", load) == 1
+    assert await flight.do("k", load) == 2  # coalescing, not caching
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_load():
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "ok"
+
+    flight = SingleFlight()
+    first = asyncio.create_task(flight.do("k", load))
+    second = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "ok"
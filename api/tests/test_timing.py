@@ -0,0 +1,87 @@
+import asyncio
+import contextvars
+
+import pytest
+
+from services import timing
+from services.storage_io import run_storage_io
+from services.timing import RequestTiming, RouteTimings, phase, mark
+
+
+def in_request(fn):
+    """Run fn in a fresh context with a request timing started."""
+    context = contextvars.Context()
+    return context.run(lambda: (timing.begin_request(), fn())[0])
+
+
+def test_phases_accumulate_into_the_header():
+    def work():
+        with phase("r2"):
+            pass
+        with phase("r2"):
+            pass
+        with phase("decode"):
+            pass
+        mark("cache", "miss")
+
+    request = in_request(work)
+    assert set(request.phases) == {"r2", "decode"}
+    header = request.header(12.34)
+    assert header.startswith("r2;dur=")
+    assert 'cache;desc="miss"' in header
+    assert header.endswith("total;dur=12.3")
+
+
+def test_overlapping_spans_count_once():
+    request = RequestTiming()
+    # four concurrent 100ms reads, then one sequential 50ms read
+    for offset in (0.0, 0.01, 0.02, 0.03):
+        request.add("r2", offset, offset + 0.1)
+    request.add("r2", 0.2, 0.25)
+    assert request.phases["r2"] == pytest.approx(180.0)
+
+
+def test_marks_keep_every_distinct_value():
+    request = RequestTiming()
+    request.mark("cache", "hit")
+    request.mark("cache", "hit")
+    request.mark("cache", "miss")
+    assert request.marks == {"cache": "hit,miss"}
+
+
+def test_recording_outside_a_request_is_a_noop():
+    context = contextvars.Context()
+
+    def work():
+        with phase("r2"):
+            pass
+        mark("cache", "hit")
+        return timing._current.get()
+
+    assert context.run(work) is None
+
+
+@pytest.mark.asyncio
+async def test_phases_recorded_on_the_storage_pool_reach_the_request():
+    request = timing.begin_request()
+
+    def blocking_read():
+        with phase("r2"):
+            return 1
+
+    await asyncio.gather(run_storage_io(blocking_read), run_storage_io(blocking_read))
+    assert "r2" in request.phases
+    timing._current.set(None)
+
+
+def test_route_summary_percentiles():
+    routes = RouteTimings(samples=100)
+    for ms in range(1, 201):
+        request = RequestTiming()
+        request.add("r2", 0.0, ms / 2000)
+        routes.record("/woolies-data", float(ms), request)
+    summary = routes.summary()["/woolies-data"]
+    assert summary["count"] == 100  # rolling window
+    assert summary["p50_ms"] == 151.0
+    assert summary["p95_ms"] == 196.0
+    assert summary["phases"]["r2"]["p50_ms"] == 75.5